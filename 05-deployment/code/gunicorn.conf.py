@@ -0,0 +1,29 @@
+# gunicorn settings, read automatically from the working directory
+#
+# PRELOAD=1 imports predict.py - and loads the models - once, in the master
+# process, then forks the workers from it. The workers share those memory
+# pages with the master instead of each unpickling its own copy, as long as
+# nothing writes to them. Set the number of workers with WEB_CONCURRENCY.
+
+import gc
+import os
+
+
+preload_app = os.getenv('PRELOAD', '') not in ('', '0')
+
+if preload_app:
+    # no collections in the master while the app loads: a collection frees
+    # objects and leaves holes that later allocations fill, on pages that
+    # should stay shared
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # move everything loaded so far to a generation the collector never
+        # visits: collections in the workers then do not write to these
+        # objects, so the pages they live on are never copied
+        gc.freeze()
+        # the app is loaded: collect again, in the master and in the worker
+        # it is about to fork, which inherits this setting
+        gc.enable()
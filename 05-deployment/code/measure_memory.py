@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Memory of the gunicorn workers with and without PRELOAD=1.
+#
+# Starts `gunicorn predict:app` with several workers, sends some predictions
+# so every worker has loaded and used the models, then reads
+# /proc/<pid>/smaps_rollup of the master and of each worker (linux only):
+#
+#   rss  memory the process can see, including pages shared with others
+#   pss  its fair share: each shared page divided by the processes sharing it
+#   uss  pages only this process has: what a new worker really costs
+#
+# usage: python measure_memory.py [workers] [requests]
+
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+port = 9797
+url = 'http://127.0.0.1:%d' % port
+
+customer = {
+    'gender': 'female',
+    'seniorcitizen': 0,
+    'partner': 'yes',
+    'dependents': 'no',
+    'phoneservice': 'no',
+    'multiplelines': 'no_phone_service',
+    'internetservice': 'dsl',
+    'onlinesecurity': 'no',
+    'onlinebackup': 'yes',
+    'deviceprotection': 'no',
+    'techsupport': 'no',
+    'streamingtv': 'no',
+    'streamingmovies': 'no',
+    'contract': 'month-to-month',
+    'paperlessbilling': 'yes',
+    'paymentmethod': 'electronic_check',
+    'tenure': 1,
+    'monthlycharges': 29.85,
+    'totalcharges': 29.85
+}
+
+
+def memory_kb(pid):
+    # {'rss': ..., 'pss': ..., 'uss': ...} in kB
+    fields = {}
+    with open('/proc/%d/smaps_rollup' % pid) as f_in:
+        for line in f_in:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def children(pid):
+    with open('/proc/%d/task/%d/children' % (pid, pid)) as f_in:
+        return [int(child) for child in f_in.read().split()]
+
+
+def post(path, data):
+    request = urllib.request.Request(
+        url + path, data=json.dumps(data).encode(),
+        headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def measure(preload, workers, n_requests):
+    env = dict(os.environ, PRELOAD='1' if preload else '0', WEB_CONCURRENCY=str(workers))
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', '127.0.0.1:%d' % port, 'predict:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                urllib.request.urlopen(url + '/ping').read()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.1)
+
+        # new connection every time: the requests are spread over the workers
+        for _ in range(n_requests):
+            post('/predict', customer)
+
+        pids = children(master.pid)
+        return memory_kb(master.pid), [memory_kb(pid) for pid in pids]
+    finally:
+        master.terminate()
+        master.wait()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    n_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print('%d workers, %d requests' % (workers, n_requests))
+    print('%-8s %12s %12s %12s %14s' % ('preload', 'worker rss', 'worker pss', 'worker uss', 'total pss'))
+    for preload in (False, True):
+        master, worker_memory = measure(preload, workers, n_requests)
+        mean = {key: sum(m[key] for m in worker_memory) / len(worker_memory) for key in master}
+        total_pss = master['pss'] + sum(m['pss'] for m in worker_memory)
+        print('%-8s %9.1f MB %9.1f MB %9.1f MB %11.1f MB' % (
+            'on' if preload else 'off',
+            mean['rss'] / 1024, mean['pss'] / 1024, mean['uss'] / 1024, total_pss / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# Prometheus metrics for predict.py, without prometheus_client:
+#
+#   churn_requests_total{endpoint, status}        answered requests
+#   churn_request_errors_total{endpoint, status}  the ones with status >= 400
+#   churn_request_duration_seconds{endpoint}      latency histogram
+#   churn_requests_in_flight                      requests being served now
+#   churn_stage_duration_seconds{stage}           latency of each step of /predict
+#
+# recording one value is a bisect and a few additions under a lock,
+# about a microsecond
+
+import threading
+from bisect import bisect_left
+
+
+content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+# seconds: from 100 us to 10 s for requests, from 5 us for the stages
+request_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+stage_buckets = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+                 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+
+def format_labels(names, values, extra=''):
+    pairs = ['%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels
+        self.kind = 'counter'
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + 1
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        for labels, value in values:
+            yield self.name, format_labels(self.labels, labels), value
+
+
+class Gauge:
+    def __init__(self, name, help):
+        self.name, self.help = name, help
+        self.kind = 'gauge'
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def add(self, amount):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        yield self.name, '', self.value
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets):
+        self.name, self.help, self.labels = name, help, labels
+        self.kind = 'histogram'
+        self.buckets = buckets
+        # label values -> [count per bucket..., count above the last, sum]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self.lock:
+            all_series = sorted((labels, list(series)) for labels, series in self.series.items())
+        bounds = [repr(b) for b in self.buckets] + ['+Inf']
+        for labels, series in all_series:
+            # prometheus buckets are cumulative
+            total = 0
+            for bound, count in zip(bounds, series):
+                total += count
+                yield self.name + '_bucket', format_labels(self.labels, labels, 'le="%s"' % bound), total
+            yield self.name + '_sum', format_labels(self.labels, labels), series[-1]
+            yield self.name + '_count', format_labels(self.labels, labels), total
+
+
+class Metrics:
+    def __init__(self):
+        self.requests = Counter('churn_requests_total', 'Requests answered', ('endpoint', 'status'))
+        self.errors = Counter('churn_request_errors_total', 'Requests answered with status >= 400',
+                              ('endpoint', 'status'))
+        self.latency = Histogram('churn_request_duration_seconds', 'Request latency',
+                                 ('endpoint',), request_buckets)
+        self.in_flight = Gauge('churn_requests_in_flight', 'Requests being served')
+        self.stages = Histogram('churn_stage_duration_seconds', 'Latency of each stage of a prediction',
+                                ('stage',), stage_buckets)
+
+    def observe_request(self, endpoint, status, seconds):
+        self.requests.inc(endpoint, status)
+        if status >= 400:
+            self.errors.inc(endpoint, status)
+        self.latency.observe(seconds, endpoint)
+
+    def observe_stage(self, stage, seconds):
+        self.stages.observe(seconds, stage)
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.errors, self.latency, self.in_flight, self.stages):
+            lines.append('# HELP %s %s' % (metric.name, metric.help))
+            lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+            for name, labels, value in metric.samples():
+                lines.append('%s%s %s' % (name, labels, value))
+        return '\n'.join(lines) + '\n'
@@ -1,23 +1,304 @@
+import time
+t_start = time.perf_counter()
+
+import glob
+import hashlib
+import importlib
+import json
+import mmap
+import os
 import pickle
+import sys
+import threading
+import tracemalloc
+
+
+# where the time goes between process start and the first /predict
+startup = {'imports': {}, 'stages': {}, 'first_request': None}
+
+# STARTUP_PROFILE=1 prints the startup report after the first /predict
+# (it is also served by GET /startup)
+startup_profile = os.getenv('STARTUP_PROFILE', '') not in ('', '0')
+
+
+def timed_import(label, *modules):
+    t0 = time.perf_counter()
+    for module in modules:
+        importlib.import_module(module)
+    startup['imports'][label] = time.perf_counter() - t0
+
+
+def process_age():
+    # seconds since this process started (linux only)
+    try:
+        with open('/proc/self/stat') as f_in:
+            start_ticks = int(f_in.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f_in:
+            uptime = float(f_in.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+startup['process_start_to_app_import'] = process_age()
+
+# only flask is needed to answer /ping: numpy and sklearn are imported
+# when the models are loaded, in the background
+timed_import('flask', 'flask')
 
 from flask import Flask
+from flask import Response
+from flask import g
 from flask import request
 from flask import jsonify
 
+from metrics import Metrics, content_type as metrics_content_type
+
+
+# every model_C=*.bin in model_dir is served, named after the file: clients
+# pick one with /models/<name>/predict or an X-Model header
+model_dir = os.getenv('MODEL_DIR', '.')
+model_pattern = os.getenv('MODEL_PATTERN', 'model_C=*.bin')
+default_model = os.getenv('MODEL_DEFAULT', 'model_C=1.0')
+
+# prometheus metrics on GET /metrics; METRICS=0 turns them off
+metrics = Metrics() if os.getenv('METRICS', '1') not in ('', '0') else None
+
+# PRELOAD=1 (see gunicorn.conf.py): gunicorn imports this module once in the
+# master process and forks the workers from it. the models are then loaded
+# right away, before the fork: a background thread would not exist in the
+# workers, and neither would the models it loads
+preload = os.getenv('PRELOAD', '') not in ('', '0')
+
+# if set, POST /admin/reload needs this value in the X-Admin-Token header
+admin_token = os.getenv('ADMIN_TOKEN', '')
+
+# a few valid customers to check a freshly loaded model with
+warmup_customers = [
+    {
+        'gender': gender,
+        'seniorcitizen': i % 2,
+        'partner': 'yes',
+        'dependents': 'no',
+        'phoneservice': 'yes',
+        'multiplelines': 'no',
+        'internetservice': internet,
+        'onlinesecurity': 'no',
+        'onlinebackup': 'yes',
+        'deviceprotection': 'no',
+        'techsupport': 'no',
+        'streamingtv': 'no',
+        'streamingmovies': 'no',
+        'contract': contract,
+        'paperlessbilling': 'yes',
+        'paymentmethod': 'electronic_check',
+        'tenure': 12 * i,
+        'monthlycharges': 29.85 + 10 * i,
+        'totalcharges': 12 * i * (29.85 + 10 * i),
+    }
+    for i, (gender, internet, contract) in enumerate([
+        ('female', 'dsl', 'month-to-month'),
+        ('male', 'fiber_optic', 'one_year'),
+        ('female', 'no', 'two_year'),
+    ])
+]
+
+
+def pack_arrays(model):
+    # copy coef_ and intercept_ into one read-only block of memory of its own
+    # (an anonymous mmap, page aligned). numpy keeps array data apart from
+    # the python objects, so no reference count update or gc pass ever
+    # writes to these pages, and forked workers keep sharing them
+    import numpy as np
+
+    coef, intercept = model.coef_, model.intercept_
+    block = np.frombuffer(mmap.mmap(-1, (coef.size + intercept.size) * 8), dtype=np.float64)
+    block[:coef.size] = coef.ravel()
+    block[coef.size:] = intercept
+    block.flags.writeable = False
 
-model_file = 'model_C=1.0.bin'
+    model.coef_ = block[:coef.size].reshape(coef.shape)
+    model.intercept_ = block[coef.size:]
 
-with open(model_file, 'rb') as f_in:
-    dv, model = pickle.load(f_in)
+
+def load_model(path):
+    with open(path, 'rb') as f_in:
+        data = f_in.read()
+
+    dv, model = pickle.loads(data)
+    pack_arrays(model)
+    version = hashlib.sha256(data).hexdigest()[:12]
+    return dv, model, version
+
+
+def warm_up(dv, model):
+    X = dv.transform(warmup_customers)
+    y_pred = model.predict_proba(X)[:, 1]
+    if not ((y_pred >= 0) & (y_pred <= 1)).all():
+        raise ValueError('model returned invalid probabilities: %s' % y_pred)
+
+
+def load_registry(measure=True):
+    # returns ({name: (dv, model, version)}, {name: bytes of memory used});
+    # memory is only measured when `measure` is set (at startup), else None
+    paths = sorted(glob.glob(os.path.join(model_dir, model_pattern)))
+    models = {}
+    memory = {}
+
+    # every file is loaded once: load_models() imports sklearn beforehand,
+    # so that is not counted in the first model's memory. tracing is left
+    # alone if it was already on (PYTHONTRACEMALLOC)
+    tracing = tracemalloc.is_tracing()
+    if measure and not tracing:
+        tracemalloc.start()
+    try:
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            before = tracemalloc.get_traced_memory()[0] if measure else 0
+            dv, model, version = load_model(path)
+            memory[name] = tracemalloc.get_traced_memory()[0] - before if measure else None
+            warm_up(dv, model)
+            models[name] = (dv, model, version)
+    finally:
+        if measure and not tracing:
+            tracemalloc.stop()
+
+    if default_model not in models:
+        raise ValueError('default model %s not in %s' % (default_model, sorted(models)))
+    return models, memory
+
+
+# replaced as a whole on reload, so a request that has picked its
+# (dv, model, version) keeps a consistent model until it answers
+registry = None
+load_error = None
+loaded = threading.Event()
+
+
+def load_models():
+    global registry, load_error
+
+    try:
+        timed_import('numpy', 'numpy')
+        timed_import('sklearn', 'sklearn.feature_extraction', 'sklearn.linear_model')
+
+        t0 = time.perf_counter()
+        registry = load_registry()
+        startup['stages']['model_load'] = time.perf_counter() - t0
+    except Exception as e:
+        load_error = e
+        print('loading the models failed: %r' % e)
+    finally:
+        loaded.set()
+
+
+def wait_for_models():
+    # None once the models are loaded, else the error response to return
+    loaded.wait()
+    if load_error is not None:
+        return jsonify({'error': 'models failed to load: %r' % load_error}), 503
+
+
+if preload:
+    load_models()
+else:
+    # start the service without waiting for the models: /ping answers right
+    # away, the first /predict waits until they are loaded
+    threading.Thread(target=load_models, daemon=True).start()
+
+reload_lock = threading.Lock()
 
 app = Flask('churn')
 
+startup['stages']['app'] = time.perf_counter() - t_start - sum(startup['imports'].values())
+
+
+@app.before_request
+def start_request():
+    if metrics is not None:
+        g.request_start = time.perf_counter()
+        metrics.in_flight.add(1)
+
+
+@app.after_request
+def record_status(response):
+    g.status = response.status_code
+    return response
+
+
+@app.teardown_request
+def finish_request(error=None):
+    # runs for every request, even when the view failed
+    if metrics is None or 'request_start' not in g:
+        return
+    metrics.in_flight.add(-1)
+    # the route pattern ('/models/<name>/predict'), not the url, so the
+    # number of series stays bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = g.get('status', 500)
+    metrics.observe_request(endpoint, status, time.perf_counter() - g.request_start)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if metrics is None:
+        return jsonify({'error': 'metrics are disabled (METRICS=0)'}), 404
+    return Response(metrics.render(), content_type=metrics_content_type)
+
+
+@app.route('/ping', methods=['GET'])
+def ping():
+    return 'PONG'
+
+
+@app.route('/startup', methods=['GET'])
+def startup_report():
+    return jsonify(startup)
+
+
+def record_first_request(path):
+    if startup['first_request'] is not None:
+        return
+
+    since_import = time.perf_counter() - t_start
+    before = startup['process_start_to_app_import']
+    startup['first_request'] = {
+        'path': path,
+        'since_app_import': since_import,
+        'since_process_start': before + since_import if before is not None else None,
+    }
+    startup['sklearn_imported'] = 'sklearn' in sys.modules
+
+    if startup_profile:
+        print(json.dumps({'startup_profile': startup}), flush=True)
+
+
 @app.route('/predict', methods=['POST'])
-def predict():
+@app.route('/models/<name>/predict', methods=['POST'])
+def predict(name=None):
+    t0 = time.perf_counter()
     customer = request.get_json()
+    t_parse = time.perf_counter() - t0
+
+    not_ready = wait_for_models()
+    if not_ready:
+        return not_ready
+
+    models = registry[0]
+    name = name or request.headers.get('X-Model') or default_model
+    if name == 'default':
+        name = default_model
+    if name not in models:
+        result = {'error': 'unknown model %s' % name, 'models': sorted(models)}
+        return jsonify(result), 404
+
+    dv, model, version = models[name]
 
+    t0 = time.perf_counter()
     X = dv.transform([customer])
+    t1 = time.perf_counter()
     y_pred = model.predict_proba(X)[0, 1]
+    t2 = time.perf_counter()
     churn = y_pred >= 0.5
 
     result = {
@@ -25,8 +306,87 @@ def predict():
         'churn': bool(churn)
     }
 
+    response = jsonify(result)
+    response.headers['X-Model-Name'] = name
+    response.headers['X-Model-Version'] = version
+
+    if metrics is not None:
+        # where the time of a prediction goes (waiting for the models to
+        # load is not part of it)
+        metrics.observe_stage('parse', t_parse)
+        metrics.observe_stage('transform', t1 - t0)
+        metrics.observe_stage('predict_proba', t2 - t1)
+        metrics.observe_stage('respond', time.perf_counter() - t2)
+
+    record_first_request(request.path)
+    return response
+
+
+@app.route('/models', methods=['GET'])
+def models():
+    not_ready = wait_for_models()
+    if not_ready:
+        return not_ready
+
+    models, memory = registry
+
+    result = {
+        'default': default_model,
+        'versions': {
+            name: {'version': version, 'memory_bytes': memory[name]}
+            for name, (dv, model, version) in models.items()
+        }
+    }
+
     return jsonify(result)
 
 
+@app.route('/admin/reload', methods=['POST'])
+def reload_model():
+    # reloads the model in this process only: under gunicorn, every worker
+    # has its own copy - use `kill -HUP <gunicorn pid>` to reload them all
+    global registry
+
+    if admin_token and request.headers.get('X-Admin-Token') != admin_token:
+        return jsonify({'error': 'invalid X-Admin-Token'}), 403
+
+    not_ready = wait_for_models()
+    if not_ready:
+        return not_ready
+
+    with reload_lock:
+        t0 = time.perf_counter()
+        try:
+            # no tracemalloc while serving: unchanged versions keep the
+            # figure measured at startup, new ones report None
+            new_models, new_memory = load_registry(measure=False)
+        except Exception as e:
+            # keep serving the models we have
+            result = {'error': 'reload failed: %r' % e, 'models': sorted(registry[0])}
+            return jsonify(result), 500
+
+        previous, previous_memory = registry
+        for name, (dv, model, version) in new_models.items():
+            if name in previous and previous[name][2] == version:
+                new_memory[name] = previous_memory[name]
+        registry = new_models, new_memory
+        reload_seconds = time.perf_counter() - t0
+
+    before = {name: entry[2] for name, entry in previous.items()}
+    after = {name: entry[2] for name, entry in registry[0].items()}
+
+    result = {
+        'previous': before,
+        'versions': after,
+        'changed': sorted(name for name in after if before.get(name) != after[name]),
+        'reload_seconds': reload_seconds
+    }
+
+    response = jsonify(result)
+    response.headers['X-Model-Version'] = after[default_model]
+    response.headers['X-Model-Reload-Seconds'] = '%.4f' % reload_seconds
+    return response
+
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=9696)
\ No newline at end of file
@@ -2,6 +2,7 @@
 # coding: utf-8
 
 import pickle
+import sys
 
 import pandas as pd
 import numpy as np
@@ -16,7 +17,8 @@ from sklearn.metrics import roc_auc_score
 
 # parameters
 
-C = 1.0
+# python train.py 0.1 → model_C=0.1.bin (predict.py serves every model_C=*.bin)
+C = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
 n_splits = 5
 output_file = f'model_C={C}.bin'
 
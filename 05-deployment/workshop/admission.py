@@ -0,0 +1,158 @@
+"""
+Admission Control and Load Shedding
+
+Without a limit, a burst of requests is accepted in full: they pile up in
+front of the scoring threads and every caller waits seconds. It is better to
+serve the requests the service can handle within its latency target and turn
+the rest away at once, so the client (or load balancer) retries elsewhere or
+later:
+
+- max_in_flight: prediction requests being served at the same time
+- max_queue:     requests allowed to wait for a free slot; beyond that,
+                 new requests are rejected immediately
+- max_wait:      how long a waiting request may wait for a slot before it
+                 is rejected; 0 means never wait
+
+A rejected request gets 503 Service Unavailable with a Retry-After header.
+stats() reports the current in-flight count and queue depth and how many
+requests were rejected, and why.
+
+Slots are handed over in arrival order: when a request finishes, the
+oldest waiting request takes its slot.
+
+Usage:
+    admission = AdmissionController(max_in_flight=32, max_queue=64, max_wait=0.05)
+    await admission.acquire()       # raises Overloaded
+    try:
+        ...
+    finally:
+        admission.release()
+"""
+
+import asyncio  # Futures for waiting requests
+import time  # For measuring queue wait
+from collections import deque  # Waiting requests, oldest first
+
+
+class Overloaded(Exception):
+    """
+    Raised by acquire() when a request is rejected.
+
+    Attributes:
+        reason (str): 'queue_full' or 'timeout'
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f'Rejected: {reason}')
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Limits concurrent requests, with a short bounded queue in front.
+
+    Must be used from a single event loop (no locking needed).
+
+    Args:
+        max_in_flight (int): Requests served concurrently
+        max_queue (int): Requests waiting for a slot at most
+        max_wait (float): Seconds a request may wait for a slot
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int = 0, max_wait: float = 0.0):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be >= 1, got {max_in_flight}")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue if max_wait > 0 else 0
+        self.max_wait = max_wait
+
+        self.in_flight = 0
+        self._waiters = deque()  # Futures of waiting requests
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {'queue_full': 0, 'timeout': 0}
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        """
+        Take a slot, waiting up to max_wait for one if needed.
+
+        Raises:
+            Overloaded: If the queue is full or no slot freed up in time
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected['queue_full'] += 1
+            raise Overloaded('queue_full')
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            # asyncio.wait() does not cancel the future on timeout, so a slot
+            # handed over at the last moment is not lost
+            await asyncio.wait([future], timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # The request itself went away (client disconnected)
+            if future.done():
+                self.release()  # Pass on the slot it was just given
+            else:
+                self._waiters.remove(future)
+                future.cancel()
+            self._record_wait(time.perf_counter() - started)
+            raise
+        if not future.done():
+            self._waiters.remove(future)
+            future.cancel()
+        self._record_wait(time.perf_counter() - started)
+
+        if future.cancelled():
+            self.rejected['timeout'] += 1
+            raise Overloaded('timeout')
+        # release() handed its slot over: in_flight already counts this request
+        self.admitted += 1
+
+    def release(self):
+        """
+        Free a slot: the oldest waiting request takes it, if any.
+        """
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _record_wait(self, seconds: float):
+        wait_ms = seconds * 1000
+        self.queue_wait_total += wait_ms
+        self.queue_wait_max = max(self.queue_wait_max, wait_ms)
+
+    def stats(self) -> dict:
+        """
+        Admission metrics since startup.
+        """
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'max_wait_ms': self.max_wait * 1000,
+            'in_flight': self.in_flight,
+            'queue_depth': len(self._waiters),
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected': dict(self.rejected),
+            'mean_queue_wait_ms': self.queue_wait_total / self.queued if self.queued else 0.0,
+            'max_queue_wait_ms': self.queue_wait_max,
+        }
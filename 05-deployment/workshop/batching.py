@@ -0,0 +1,166 @@
+"""
+Micro-Batching for Concurrent Prediction Requests
+
+Scoring one customer at a time wastes most of the work on per-call overhead.
+When many requests arrive at once, it is cheaper to stack them into one
+matrix and score them together. MicroBatcher does exactly that:
+
+1. A request calls `await batcher.submit(model, customer)` and waits
+2. Requests are collected until either
+   - the batching window (e.g. 2 ms) since the first request expires, or
+   - max_batch_size requests are waiting
+3. The whole batch is scored with one call, on whatever executor the
+   scoring function uses (see execution.py)
+4. Every waiting request receives its own probability
+
+Each request brings the model it must be scored with (see execution.py), so
+a batch that straddles a hot reload is split into one call per model.
+
+The window trades a little latency at low load for much higher throughput
+under load. stats() reports batch sizes and queue waits to tune it.
+
+Usage:
+    batcher = MicroBatcher(executor.predict, window_ms=2, max_batch_size=64)
+    prob = await batcher.submit(model, customer.model_dump())
+"""
+
+import asyncio  # Event loop, futures and timers
+import time  # For measuring queue wait
+
+
+# Upper bounds of the histogram buckets reported by stats()
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+def _bucket_counts(buckets):
+    # Cumulative counts like Prometheus: one per bound, plus +Inf
+    return {**{str(b): 0 for b in buckets}, '+Inf': 0}
+
+
+def _observe(counts, buckets, value):
+    for b in buckets:
+        if value <= b:
+            counts[str(b)] += 1
+    counts['+Inf'] += 1
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-customer requests into batched scoring calls.
+
+    Args:
+        score_batch: Async function (model, list[dict]) → list[float], awaited
+            once per batch and model
+        window_ms (float): How long to wait for more requests after the first
+        max_batch_size (int): Score immediately once this many are waiting
+    """
+
+    def __init__(self, score_batch, window_ms: float = 2.0, max_batch_size: int = 64):
+        self.score_batch = score_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._pending = []   # [(model, customer, future, enqueued_at), ...]
+        self._timer = None   # Scheduled flush for the current window
+        self._tasks = set()  # Running scoring tasks (keep references alive)
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.batch_size_hist = _bucket_counts(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = _bucket_counts(QUEUE_WAIT_BUCKETS_MS)
+
+    async def submit(self, model, customer: dict) -> float:
+        """
+        Queue one customer and wait for its churn probability under `model`.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((model, customer, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif len(self._pending) == 1:
+            # First request of a new window: start the timer
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """
+        Hand the pending requests to a scoring task and start a new window.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._score(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _score(self, batch):
+        started = time.perf_counter()
+        self._record(batch, started)
+
+        # Normally one group; two only if a reload happened inside the window
+        groups = {}
+        for entry in batch:
+            groups.setdefault(id(entry[0]), []).append(entry)
+
+        for entries in groups.values():
+            model = entries[0][0]
+            try:
+                probs = await self.score_batch(model, [c for _, c, _, _ in entries])
+            except Exception as e:
+                for _, _, future, _ in entries:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, _, future, _), prob in zip(entries, probs):
+                # A request may have been cancelled (client disconnected)
+                if not future.done():
+                    future.set_result(prob)
+
+    def _record(self, batch, started):
+        size = len(batch)
+        self.requests += size
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        _observe(self.batch_size_hist, BATCH_SIZE_BUCKETS, size)
+
+        for _, _, _, enqueued_at in batch:
+            wait_ms = (started - enqueued_at) * 1000
+            self.queue_wait_total += wait_ms
+            self.queue_wait_max = max(self.queue_wait_max, wait_ms)
+            _observe(self.queue_wait_hist, QUEUE_WAIT_BUCKETS_MS, wait_ms)
+
+    def stats(self) -> dict:
+        """
+        Batching metrics since startup.
+
+        Returns:
+            dict: Request/batch counts, batch size and queue wait summaries
+                  and cumulative histograms
+        """
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch_size': self.max_batch_size,
+            'requests': self.requests,
+            'batches': self.batches,
+            'pending': len(self._pending),
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'max_batch_seen': self.max_batch_seen,
+            'mean_queue_wait_ms': self.queue_wait_total / self.requests if self.requests else 0.0,
+            'max_queue_wait_ms': self.queue_wait_max,
+            'batch_size_histogram': dict(self.batch_size_hist),
+            'queue_wait_ms_histogram': dict(self.queue_wait_hist),
+        }
@@ -0,0 +1,512 @@
+#!/usr/bin/env python
+"""
+Load Benchmarks for the Churn Prediction Service
+
+Starts predict.py under uvicorn with different settings, sends /predict
+requests from a pool of client threads and reports throughput and latency.
+
+Benchmarks:
+    strategies - compare EXECUTION_STRATEGY=inline/threadpool/process at
+                 several concurrency levels
+    startup    - compare cold starts (to first /ping and first /predict)
+                 from the pickled pipeline (model.bin) and from the
+                 sklearn-free artifact (model.json)
+    metrics    - cost of the /metrics instrumentation: recording one
+                 observation, and /predict throughput and latency with
+                 METRICS=1 vs METRICS=0
+    admission  - overload the service with and without admission control:
+                 latency of the accepted requests and share rejected
+    float32    - score all of data-week-3.csv with the float64 pipeline and
+                 the compiled32 engine: checks that the probabilities agree
+                 within scoring.FLOAT32_TOLERANCE (exit status 1 if not),
+                 then compares batch time and memory with compiled
+    msgpack    - /predict/batch throughput with JSON vs MessagePack bodies
+                 and responses, for batch sizes from 1 to 10,000; the
+                 client's own encoding and decoding is part of the time
+    shadow     - /predict throughput and latency without shadow scoring
+                 and with a candidate model shadowing every request
+
+Usage:
+    python benchmark.py strategies
+    python benchmark.py strategies --concurrency 1 8 32 --requests 2000
+    python benchmark.py strategies --engine compiled --workers 2
+    python benchmark.py startup --runs 5
+    python benchmark.py metrics --concurrency 1 16 --requests 5000
+    python benchmark.py admission --concurrency 64 --max-in-flight 4
+    python benchmark.py float32 --batch-size 10000
+    python benchmark.py msgpack --sizes 1 100 10000 --customers 20000
+    python benchmark.py shadow --candidate model.json --concurrency 1 16
+
+Note:
+    The client runs on the same machine as the server, so absolute numbers
+    are pessimistic. Use them to compare settings, not as capacity planning.
+"""
+
+import argparse  # Command line options
+import json  # Request bodies for the msgpack comparison
+import os  # Environment for the server process
+import statistics  # Latency percentiles
+import subprocess  # Start the server
+import sys  # Python executable
+import tempfile  # Shadow log of the shadow benchmark
+import threading  # Per-thread HTTP sessions
+import time  # Timing
+import timeit  # Cost of a single metrics observation
+import tracemalloc  # Peak memory of a batch
+from concurrent.futures import ThreadPoolExecutor
+
+import requests  # HTTP client
+
+
+HOST = '127.0.0.1'
+PORT = 9797
+
+# The dataset the model was trained on
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..',
+                       '03-classification', 'churn-prediction-project', 'data-week-3.csv')
+
+# Same sample customer as test.py
+customer = {
+    'gender': 'female',
+    'seniorcitizen': 0,
+    'partner': 'yes',
+    'dependents': 'no',
+    'phoneservice': 'no',
+    'multiplelines': 'no_phone_service',
+    'internetservice': 'dsl',
+    'onlinesecurity': 'no',
+    'onlinebackup': 'yes',
+    'deviceprotection': 'no',
+    'techsupport': 'no',
+    'streamingtv': 'no',
+    'streamingmovies': 'no',
+    'contract': 'month-to-month',
+    'paperlessbilling': 'yes',
+    'paymentmethod': 'electronic_check',
+    'tenure': 1,
+    'monthlycharges': 29.85,
+    'totalcharges': 29.85
+}
+
+
+# ============================================================================
+# SERVER AND CLIENT HELPERS
+# ============================================================================
+
+def start_server(env: dict) -> subprocess.Popen:
+    """
+    Start `uvicorn predict:app` with extra environment variables and wait
+    until /ping answers.
+    """
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'predict:app',
+         '--host', HOST, '--port', str(PORT), '--log-level', 'warning'],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f'http://{HOST}:{PORT}/ping', timeout=1)
+            return process
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f'Server did not start with {env}')
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    process.wait(timeout=30)
+
+
+def run_load(path: str, concurrency: int, n_requests: int, **request_kwargs) -> dict:
+    """
+    Send n_requests POSTs from `concurrency` threads, each with its own
+    keep-alive session.
+
+    Returns:
+        dict: Throughput (req/s) and latency percentiles (ms)
+    """
+    url = f'http://{HOST}:{PORT}{path}'
+    local = threading.local()
+
+    def send(_):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        response = local.session.post(url, **request_kwargs)
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    # Warm up connections and the server before measuring
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(concurrency * 5)))
+
+        start = time.perf_counter()
+        latencies = list(pool.map(send, range(n_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies_ms = sorted(t * 1000 for t in latencies)
+    quantiles = statistics.quantiles(latencies_ms, n=100)
+    return {
+        'throughput': n_requests / elapsed,
+        'p50': quantiles[49],
+        'p99': quantiles[98],
+    }
+
+
+def print_row(label, concurrency, result):
+    print(f"{label:<24} {concurrency:>11} {result['throughput']:>10.0f} "
+          f"{result['p50']:>9.2f} {result['p99']:>9.2f}")
+
+
+def print_header(label):
+    print(f"{label:<24} {'concurrency':>11} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    print('-' * 67)
+
+
+def read_customers(path: str) -> list[dict]:
+    """
+    Read the raw churn CSV into Customer dicts, prepared like train.py does
+    (see featurestore.read_snapshot()).
+    """
+    from featurestore import read_snapshot
+    
+    return read_snapshot(path)[1]
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_strategies(args):
+    """
+    Compare execution strategies at several concurrency levels.
+    """
+    print_header('strategy')
+    for strategy in ('inline', 'threadpool', 'process'):
+        server = start_server({
+            'EXECUTION_STRATEGY': strategy,
+            'EXECUTION_WORKERS': str(args.workers),
+            'SCORING_ENGINE': args.engine,
+        })
+        try:
+            for concurrency in args.concurrency:
+                result = run_load('/predict', concurrency, args.requests, json=customer)
+                print_row(strategy, concurrency, result)
+        finally:
+            stop_server(server)
+
+
+def bench_startup(args):
+    """
+    Time from launching the server to the first /ping answer and to the
+    first /predict answer, and memory, for each way of loading the model.
+    """
+    modes = [
+        ('model.bin', 'sklearn'),
+        ('model.bin', 'table'),
+        ('model.json', 'table'),
+    ]
+    print(f"{'model':<12} {'engine':<8} {'ping s':>7} {'predict s':>10} {'RSS MB':>8}  sklearn")
+    print('-' * 60)
+    for model_path, engine in modes:
+        pings, predicts, stats = [], [], None
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            server = start_server({'MODEL_PATH': model_path, 'SCORING_ENGINE': engine})
+            pings.append(time.perf_counter() - started)
+            try:
+                # Waits for the models, which load in the background
+                requests.post(f'http://{HOST}:{PORT}/predict', json=customer).raise_for_status()
+                predicts.append(time.perf_counter() - started)
+                stats = requests.get(f'http://{HOST}:{PORT}/stats').json()['process']
+            finally:
+                stop_server(server)
+        print(f"{model_path:<12} {engine:<8} {statistics.median(pings):>7.2f} "
+              f"{statistics.median(predicts):>10.2f} {stats['startup_peak_rss_mb']:>8.0f}  "
+              f"{'imported' if stats['sklearn_imported'] else 'not imported'}")
+
+
+def bench_metrics(args):
+    """
+    What the per-request and per-stage metrics cost.
+    
+    /predict records 4 stages + up to 2 from the engine + the request itself,
+    so 7 observations per request is the in-process overhead; the server
+    runs then show whether that is visible end to end.
+    """
+    from metrics import Metrics
+    
+    metrics = Metrics()
+    n = 200_000
+    stage = timeit.timeit(lambda: metrics.observe_stage('parse', 0.00003), number=n) / n
+    request = timeit.timeit(lambda: metrics.observe_request('/predict', 200, 0.0004), number=n) / n
+    print(f"observe_stage:   {stage * 1e6:.2f} µs")
+    print(f"observe_request: {request * 1e6:.2f} µs")
+    print(f"per /predict:    ~{(6 * stage + request) * 1e6:.1f} µs (6 stages + request)")
+    print()
+    
+    results = {}
+    print_header('metrics')
+    for enabled in ('0', '1'):
+        server = start_server({'METRICS': enabled, 'SCORING_ENGINE': args.engine})
+        try:
+            for concurrency in args.concurrency:
+                result = run_load('/predict', concurrency, args.requests, json=customer)
+                results[enabled, concurrency] = result
+                print_row('on' if enabled == '1' else 'off', concurrency, result)
+        finally:
+            stop_server(server)
+    
+    print()
+    for concurrency in args.concurrency:
+        off, on = results['0', concurrency], results['1', concurrency]
+        print(f"concurrency {concurrency}: throughput {on['throughput'] / off['throughput'] - 1:+.1%}, "
+              f"p50 {on['p50'] - off['p50']:+.3f} ms")
+
+
+def bench_admission(args):
+    """
+    Latency of accepted requests under overload, with and without
+    ADMISSION_MAX_IN_FLIGHT. Rejected requests (503) are counted, not
+    retried; the client then backs off for --backoff-ms like a client
+    honoring Retry-After would (scaled down to keep the run short).
+    """
+    url = f'http://{HOST}:{PORT}/predict'
+    local = threading.local()
+    
+    def send(_):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        status = local.session.post(url, json=customer).status_code
+        elapsed = time.perf_counter() - start
+        if status == 503:
+            time.sleep(args.backoff_ms / 1000)
+        return status, elapsed
+    
+    print(f"{'admission':<24} {'concurrency':>11} {'ok/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'rejected':>9}")
+    print('-' * 77)
+    for max_in_flight in (0, args.max_in_flight):
+        server = start_server({
+            'ADMISSION_MAX_IN_FLIGHT': str(max_in_flight),
+            'ADMISSION_MAX_QUEUE': str(args.max_queue),
+            'ADMISSION_MAX_WAIT_MS': str(args.max_wait_ms),
+            'SCORING_ENGINE': args.engine,
+        })
+        try:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                list(pool.map(send, range(args.concurrency * 2)))
+                start = time.perf_counter()
+                results = list(pool.map(send, range(args.requests)))
+                elapsed = time.perf_counter() - start
+        finally:
+            stop_server(server)
+        
+        ok = sorted(t * 1000 for status, t in results if status == 200)
+        rejected = sum(status == 503 for status, _ in results)
+        quantiles = statistics.quantiles(ok, n=100)
+        label = f'max_in_flight={max_in_flight}' if max_in_flight else 'off'
+        print(f"{label:<24} {args.concurrency:>11} {len(ok) / elapsed:>10.0f} "
+              f"{quantiles[49]:>9.2f} {quantiles[98]:>9.2f} {rejected / len(results):>9.1%}")
+
+
+def bench_float32(args):
+    """
+    Accuracy and cost of float32 batch scoring (SCORING_ENGINE=compiled32).
+    
+    The reference is the float64 sklearn pipeline over the whole dataset;
+    compiled is shown too, as the rounding floor of a float64 dot product.
+    Memory is the peak NumPy allocation while scoring one batch.
+    """
+    from scoring import FLOAT32_TOLERANCE, load_model
+    
+    customers = read_customers(args.data)
+    reference = load_model(args.model, 'sklearn').engine.predict(customers)
+    
+    failed = False
+    print(f"{len(customers)} customers from {os.path.basename(args.data)}, "
+          f"tolerance {FLOAT32_TOLERANCE:g}")
+    print(f"{'engine':<12} {'max |diff|':>12} {'batch ms':>10} {'peak KB':>10}")
+    print('-' * 47)
+    for kind in ('compiled', 'compiled32'):
+        engine = load_model(args.model, kind).engine
+        diff = float(max(abs(engine.predict(customers) - reference)))
+        
+        batch = (customers * (args.batch_size // len(customers) + 1))[:args.batch_size]
+        engine.predict(batch)  # Allocates the per-thread buffer
+        seconds = min(timeit.repeat(lambda: engine.predict(batch), number=1, repeat=args.runs))
+        tracemalloc.start()
+        engine.predict(batch)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        print(f"{kind:<12} {diff:>12.2e} {seconds * 1000:>10.1f} {peak / 1024:>10.0f}")
+        failed = failed or diff > FLOAT32_TOLERANCE
+    
+    if failed:
+        print(f"✗ Probabilities differ from the float64 pipeline by more than {FLOAT32_TOLERANCE:g}")
+        sys.exit(1)
+    print("✓ Within tolerance")
+
+
+def bench_msgpack(args):
+    """
+    JSON vs MessagePack for batch scoring, both ends included: the client
+    encodes every request body and decodes every response, as a calling
+    service would. Sequential requests on one keep-alive connection.
+    
+    Needs msgpack on the client and in the server (uv sync --extra msgpack).
+    """
+    import msgpack
+    
+    customers = read_customers(args.data)
+    formats = {
+        'json': ('application/json', lambda obj: json.dumps(obj).encode(), json.loads),
+        'msgpack': ('application/msgpack', msgpack.packb, msgpack.unpackb),
+    }
+    url = f'http://{HOST}:{PORT}/predict/batch'
+    
+    print(f"{'batch':>6} {'format':<8} {'req/s':>9} {'customers/s':>12} {'p50 ms':>9} "
+          f"{'body KB':>9} {'speedup':>8}")
+    print('-' * 67)
+    server = start_server({'SCORING_ENGINE': args.engine, 'MAX_BATCH_SIZE': str(max(args.sizes))})
+    try:
+        session = requests.Session()
+        for size in args.sizes:
+            batch = (customers * (size // len(customers) + 1))[:size]
+            n_requests = max(args.min_requests, args.customers // size)
+            throughput = {}
+            for name, (media_type, dumps, loads) in formats.items():
+                headers = {'Content-Type': media_type, 'Accept': media_type}
+                
+                def send():
+                    start = time.perf_counter()
+                    body = dumps(batch)
+                    response = session.post(url, data=body, headers=headers)
+                    response.raise_for_status()
+                    assert len(loads(response.content)) == size
+                    return time.perf_counter() - start, len(body)
+                
+                for _ in range(3):
+                    send()  # Warm up
+                start = time.perf_counter()
+                results = [send() for _ in range(n_requests)]
+                elapsed = time.perf_counter() - start
+                
+                throughput[name] = n_requests / elapsed
+                p50 = statistics.median(t for t, _ in results) * 1000
+                speedup = f"{throughput[name] / throughput['json']:.2f}x" if name != 'json' else ''
+                print(f"{size:>6} {name:<8} {throughput[name]:>9.1f} {throughput[name] * size:>12.0f} "
+                      f"{p50:>9.2f} {results[0][1] / 1024:>9.1f} {speedup:>8}")
+    finally:
+        stop_server(server)
+
+
+def bench_shadow(args):
+    """
+    /predict latency without shadow scoring and with --fraction of the
+    requests also scored by a candidate model. The p99 should not move.
+    """
+    results = {}
+    print_header('shadow')
+    for fraction in (0.0, args.fraction):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {'SCORING_ENGINE': args.engine}
+            if fraction:
+                env.update({
+                    'SHADOW_MODEL_PATH': args.candidate,
+                    'SHADOW_ENGINE': args.candidate_engine,
+                    'SHADOW_FRACTION': str(fraction),
+                    'SHADOW_LOG': os.path.join(tmp, 'shadow.csv'),
+                })
+            server = start_server(env)
+            try:
+                # Waits for the models, which load in the background
+                requests.post(f'http://{HOST}:{PORT}/predict', json=customer).raise_for_status()
+                if fraction and requests.get(f'http://{HOST}:{PORT}/stats').json()['shadow'] is None:
+                    # The service starts without a candidate it cannot load
+                    print(f"✗ Shadow scoring is off: {args.candidate} did not load "
+                          f"with SHADOW_ENGINE={args.candidate_engine}")
+                    sys.exit(1)
+                for concurrency in args.concurrency:
+                    result = run_load('/predict', concurrency, args.requests, json=customer)
+                    results[fraction, concurrency] = result
+                    print_row(f'fraction={fraction}' if fraction else 'off', concurrency, result)
+                shadow = requests.get(f'http://{HOST}:{PORT}/stats').json()['shadow']
+            finally:
+                stop_server(server)
+        if shadow is not None:
+            print(f"{'':<24} shadow: {shadow['submitted']} queued, {shadow['scored']} scored "
+                  f"so far, {shadow['dropped']} dropped")
+    
+    print()
+    for concurrency in args.concurrency:
+        off, on = results[0.0, concurrency], results[args.fraction, concurrency]
+        print(f"concurrency {concurrency}: throughput {on['throughput'] / off['throughput'] - 1:+.1%}, "
+              f"p50 {on['p50'] - off['p50']:+.3f} ms, p99 {on['p99'] - off['p99']:+.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    strategies = subparsers.add_parser('strategies', help='Compare EXECUTION_STRATEGY settings')
+    strategies.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    strategies.add_argument('--requests', type=int, default=2000)
+    strategies.add_argument('--engine', default='sklearn')
+    strategies.add_argument('--workers', type=int, default=0)
+    strategies.set_defaults(func=bench_strategies)
+
+    startup = subparsers.add_parser('startup', help='Compare cold starts of model.bin and model.json')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    metrics = subparsers.add_parser('metrics', help='Measure the overhead of METRICS=1')
+    metrics.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    metrics.add_argument('--requests', type=int, default=5000)
+    metrics.add_argument('--engine', default='sklearn')
+    metrics.set_defaults(func=bench_metrics)
+
+    admission = subparsers.add_parser('admission', help='Overload with and without admission control')
+    admission.add_argument('--concurrency', type=int, default=64)
+    admission.add_argument('--requests', type=int, default=5000)
+    admission.add_argument('--max-in-flight', type=int, default=4)
+    admission.add_argument('--max-queue', type=int, default=8)
+    admission.add_argument('--max-wait-ms', type=float, default=20)
+    admission.add_argument('--backoff-ms', type=float, default=100)
+    admission.add_argument('--engine', default='sklearn')
+    admission.set_defaults(func=bench_admission)
+
+    float32 = subparsers.add_parser('float32', help='Check and time float32 batch scoring')
+    float32.add_argument('--data', default=DATASET)
+    float32.add_argument('--model', default='model.bin')
+    float32.add_argument('--batch-size', type=int, default=10000)
+    float32.add_argument('--runs', type=int, default=5)
+    float32.set_defaults(func=bench_float32)
+
+    msgpack = subparsers.add_parser('msgpack', help='Compare JSON and MessagePack batch throughput')
+    msgpack.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    msgpack.add_argument('--customers', type=int, default=20000, help='Customers sent per size and format')
+    msgpack.add_argument('--min-requests', type=int, default=20)
+    msgpack.add_argument('--data', default=DATASET)
+    msgpack.add_argument('--engine', default='compiled')
+    msgpack.set_defaults(func=bench_msgpack)
+
+    shadow = subparsers.add_parser('shadow', help='Measure the latency cost of shadow scoring')
+    shadow.add_argument('--candidate', default='model.json', help='Shadow model file')
+    shadow.add_argument('--fraction', type=float, default=1.0)
+    shadow.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    shadow.add_argument('--requests', type=int, default=5000)
+    shadow.add_argument('--engine', default='sklearn', help='Served model engine')
+    shadow.add_argument('--candidate-engine', default='compiled', help='Shadow model engine')
+    shadow.set_defaults(func=bench_shadow)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
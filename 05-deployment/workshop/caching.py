@@ -0,0 +1,128 @@
+"""
+Prediction Cache for Repeated Customers
+
+Callers often re-score the same customer with unchanged attributes. Since a
+prediction only depends on the customer's features and the model, it can be
+cached:
+
+- key:      the validated Customer fields in a fixed order, with numeric
+            values rounded to `precision` decimals (29.8500001 == 29.85)
+- bound:    at most `maxsize` entries, least recently used evicted first
+- TTL:      optional; entries older than `ttl` seconds are recomputed
+- model:    every lookup passes the version of the model serving the
+            request, and entries are stored per version, so a prediction of
+            one model is never served for another. retain() drops the
+            entries of versions that are no longer loaded
+
+Usage:
+    cache = PredictionCache(maxsize=10000, ttl=3600, precision=2)
+    key = cache.key(customer)
+    prob = cache.get(key, model_version)
+    if prob is None:
+        prob = engine.predict_one(customer)
+        cache.put(key, prob, model_version)
+"""
+
+import time  # For TTL expiry
+from collections import OrderedDict  # Keeps entries in LRU order
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of churn probabilities.
+
+    Args:
+        maxsize (int): Maximum number of cached customers
+        ttl (float): Seconds an entry stays valid; 0 means forever
+        precision (int): Decimals kept for numeric fields in the key
+    """
+
+    def __init__(self, maxsize: int, ttl: float = 0.0, precision: int = 2):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.precision = precision
+
+        self._entries = OrderedDict()  # (model_version, key) → (probability, stored_at)
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def key(self, customer: dict) -> tuple:
+        """
+        Canonical, hashable encoding of a validated customer.
+
+        Relies on the fixed field order of Customer.model_dump(); floats are
+        quantized so tiny differences in the payload share one entry.
+        """
+        precision = self.precision
+        return tuple(
+            round(value, precision) if isinstance(value, float) else value
+            for value in customer.values()
+        )
+
+    def get(self, key: tuple, model_version: str) -> float | None:
+        """
+        Cached probability for a key under a model version, or None on a miss.
+        """
+        key = (model_version, key)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        prob, stored_at = entry
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return prob
+
+    def put(self, key: tuple, prob: float, model_version: str):
+        """
+        Store a probability computed with the given model version.
+        """
+        key = (model_version, key)
+        self._entries[key] = (prob, time.monotonic())
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def retain(self, model_versions):
+        """
+        Drop the entries of every model version not in `model_versions`.
+        """
+        keep = set(model_versions)
+        stale = [key for key in self._entries if key[0] not in keep]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Cache metrics since startup.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl,
+            'precision': self.precision,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,97 @@
+"""
+Singleflight: One Computation for Identical Concurrent Requests
+
+Retrying clients often send the same customer several times within a few
+milliseconds: a timeout fires, the request is sent again, and the first
+one is still being scored. The prediction cache (caching.py) does not help
+here, since none of them has finished yet. A SingleFlight coalesces them
+instead:
+
+1. The first request for a key starts the computation (the "leader")
+2. Identical requests arriving while it runs join it (the "followers")
+   and wait for the same result instead of scoring the customer again
+3. When it finishes, every waiting request gets the probability (or the
+   error), and the key is forgotten: the next request computes afresh
+
+Nothing is stored beyond the lifetime of a computation, so this is safe
+with the cache off and does not change any result. The key includes the
+model version, so requests pinned to different models never share one.
+
+The computation runs as its own task: a leader whose client disconnects
+does not cancel it for the followers still waiting.
+
+stats() reports how many computations ran and how many requests joined
+one instead, i.e. the computations saved.
+
+Usage:
+    flights = SingleFlight()
+    prob = await flights.do((model.version, tuple(customer.values())),
+                            lambda: executor.predict_one(model, customer))
+"""
+
+import asyncio  # Tasks shared by identical requests
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent calls with the same key.
+
+    Must be used from a single event loop (no locking needed).
+    """
+
+    def __init__(self):
+        self._flights = {}  # key → task computing its result
+
+        # Metrics
+        self.computations = 0
+        self.joined = 0
+        self.max_joined = 0      # Most followers sharing one computation
+        self._followers = {}     # key → followers of its running computation
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key, compute):
+        """
+        Result of `compute()` for `key`, shared with identical concurrent calls.
+
+        Args:
+            key: Hashable identity of the computation
+            compute: Function returning an awaitable; only called by the
+                leader
+
+        Raises:
+            Whatever the shared computation raised
+        """
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._flights[key] = task
+            self._followers[key] = 0
+            self.computations += 1
+            task.add_done_callback(lambda task, key=key: self._land(key, task))
+        else:
+            self.joined += 1
+            self._followers[key] += 1
+        # shield(): a cancelled caller stops waiting, the computation goes on
+        return await asyncio.shield(task)
+
+    def _land(self, key, task):
+        del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved, even if every caller went away
+        self.max_joined = max(self.max_joined, self._followers.pop(key))
+
+    def stats(self) -> dict:
+        """
+        Singleflight metrics since startup.
+        """
+        requests = self.computations + self.joined
+        return {
+            'in_flight': len(self._flights),
+            'computations': self.computations,
+            'joined': self.joined,
+            'saved_ratio': self.joined / requests if requests else 0.0,
+            'max_joined': self.max_joined,
+        }
@@ -0,0 +1,360 @@
+"""
+Columnar Bulk Scoring: Arrow IPC, Parquet and JSON
+
+Batch pipelines already hold customers as columnar tables. Turning them into
+JSON dicts, only for the service to turn them back into a feature matrix,
+costs far more than the model itself. This module lets callers upload the
+table as-is:
+
+1. read_table():       Arrow IPC stream or Parquet bytes → pyarrow.Table
+2. table_columns():    each Customer field becomes one NumPy column;
+                       categorical columns are dictionary-encoded, so only
+                       the handful of distinct values is ever inspected
+3. validate_columns(): whole-column checks against the Customer schema
+                       (Literal sets, numeric bounds and int range, no nulls)
+4. LinearModel.encode_columns() (scoring.py) builds the feature matrix
+5. write_probabilities(): churn_probability column → Arrow IPC or Parquet
+
+/predict/batch also takes columns as plain JSON (or MessagePack): one array
+per Customer field instead of one object per customer, so the 19 key names
+are sent once, not once per row. dict_columns() turns them into the same
+NumPy columns as table_columns(), dictionary-encoding the Literal fields
+with np.unique; step 4 is then shared. Step 3 is done by Pydantic instead,
+with the Customer field types themselves (each distinct category once,
+numeric columns as one list each), so a value is accepted as a column
+exactly when it would be accepted in a Customer object.
+
+pyarrow is optional: install it with `uv sync --extra arrow`. It is only
+imported when a columnar request arrives - and so is NumPy, because
+predict.py needs this module's constants before the model is loaded.
+"""
+
+import functools  # Caching the per-field validators
+import io  # In-memory output buffer
+from typing import Annotated, Literal, get_args, get_origin  # Reading the Customer schema
+
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/vnd.apache.parquet'
+FORMATS = (ARROW_STREAM, PARQUET)
+
+
+class ColumnValidationError(ValueError):
+    """
+    Raised when uploaded columns do not match the Customer schema.
+
+    Attributes:
+        errors (list[dict]): Pydantic-style errors: type, loc, msg
+    """
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f'{len(errors)} invalid column(s)')
+        self.errors = errors
+
+
+def column_specs(model_cls) -> tuple[dict, dict]:
+    """
+    Column rules derived from a Pydantic model such as Customer.
+
+    Returns:
+        domains (dict): Literal field → tuple of allowed values
+        numeric (dict): Other field → (is_integer, minimum or None)
+    """
+    domains, numeric = {}, {}
+    for name, field in model_cls.model_fields.items():
+        if get_origin(field.annotation) is Literal:
+            domains[name] = get_args(field.annotation)
+        else:
+            minimum = next((m.ge for m in field.metadata if hasattr(m, 'ge')), None)
+            numeric[name] = (field.annotation is int, minimum)
+    return domains, numeric
+
+
+@functools.cache
+def field_adapters(model_cls) -> dict:
+    """
+    Pydantic validators with the types and constraints of a model's fields.
+
+    Returns:
+        dict: Field → (allowed values, TypeAdapter for one value) for
+              Literal fields, (None, TypeAdapter for a list of values) for
+              the others, so a whole column is validated in one call
+    """
+    from pydantic import TypeAdapter
+
+    adapters = {}
+    for name, field in model_cls.model_fields.items():
+        annotation = field.annotation
+        if field.metadata:
+            annotation = Annotated[(annotation, *field.metadata)]  # e.g. ge=0
+        if get_origin(field.annotation) is Literal:
+            adapters[name] = (get_args(field.annotation), TypeAdapter(annotation))
+        else:
+            adapters[name] = (None, TypeAdapter(list[annotation]))
+    return adapters
+
+
+def _error(field: str, error_type: str, msg: str) -> dict:
+    return {'type': error_type, 'loc': ['body', field], 'msg': msg}
+
+
+def validate_columns(columns: dict, domains: dict, numeric: dict) -> None:
+    """
+    Check every column as a whole.
+
+    Args:
+        columns (dict): Field → (codes, categories) for Literal fields,
+            np.ndarray for numeric fields (see LinearModel.encode_columns)
+        domains, numeric: Rules from column_specs()
+
+    Raises:
+        ColumnValidationError: With one entry per invalid column
+    """
+    import numpy as np
+
+    errors = []
+    for field, allowed in domains.items():
+        if field not in columns:
+            errors.append(_error(field, 'missing', 'Column required'))
+            continue
+        _, categories = columns[field]
+        invalid = [value for value in categories if value not in allowed]
+        if invalid:
+            errors.append(_error(
+                field, 'literal_error',
+                f'Values {invalid[:5]!r} not in {list(allowed)!r}'
+            ))
+
+    for field, (is_integer, minimum) in numeric.items():
+        if field not in columns:
+            errors.append(_error(field, 'missing', 'Column required'))
+            continue
+        values = columns[field]
+        if not np.all(np.isfinite(values)):
+            errors.append(_error(field, 'finite_number', 'Column contains missing or non-finite values'))
+        elif minimum is not None and values.size and values.min() < minimum:
+            errors.append(_error(field, 'greater_than_equal', f'Values must be >= {minimum}'))
+        elif is_integer and not np.all(values == np.floor(values)):
+            errors.append(_error(field, 'int_from_float', 'Values must be whole numbers'))
+        elif is_integer and values.size and np.abs(values).max() >= 2.0 ** 63:
+            # Like a Customer: a float becomes an int only within int64
+            errors.append(_error(field, 'int_parsing_size', 'Values must fit in a 64-bit integer'))
+
+    if errors:
+        raise ColumnValidationError(errors)
+
+
+def _dictionary_encode(values: list) -> tuple:
+    """
+    (codes, categories) for a list of scalar values.
+
+    Raises:
+        TypeError: If a value is a list or a dict
+    """
+    import numpy as np
+
+    try:
+        array = np.array(values)
+    except ValueError:
+        array = None  # Ragged: some values are lists
+    if array is not None and array.ndim == 1 and array.dtype.kind in 'USifb':
+        categories, codes = np.unique(array, return_inverse=True)
+        return codes.reshape(-1), categories.tolist()
+    # Mixed types (e.g. a None among strings) cannot be sorted: encode in
+    # first-seen order instead
+    index = {}
+    codes = np.array([index.setdefault(value, len(index)) for value in values], dtype=np.intp)
+    return codes, list(index)
+
+
+def dict_columns(data: dict, model_cls) -> tuple[dict, int]:
+    """
+    Turn a dict of arrays, one per field of model_cls (e.g. Customer), into
+    NumPy columns.
+
+    {'gender': ['female', 'male', ...], 'tenure': [1, 40, ...], ...}
+
+    Literal fields are dictionary-encoded with np.unique: the distinct
+    values become the categories, every row an integer code. Each category
+    is validated once; numeric columns are validated as one list each. Both
+    use the model's own field types (see field_adapters), so the rules -
+    int ranges, coercion of "1" or 1.0, bounds - are those of a model_cls
+    object. Keys that are not fields are ignored, as in a model_cls object.
+
+    Returns:
+        (dict, int): Columns for encode_columns(), and the number of rows
+
+    Raises:
+        ColumnValidationError: For missing or non-list columns, invalid
+            values (loc: field and row index, or field for categories),
+            or columns of different lengths
+    """
+    import numpy as np
+    from pydantic import ValidationError
+
+    if not any(isinstance(value, list) for value in data.values()):
+        # Most likely a single customer sent to the batch endpoint
+        raise ColumnValidationError([{
+            'type': 'list_type', 'loc': ['body'],
+            'msg': 'Input should be a list of customers or an object of columns',
+        }])
+
+    columns, errors, lengths = {}, [], {}
+    for field, (allowed, adapter) in field_adapters(model_cls).items():
+        if field not in data:
+            errors.append(_error(field, 'missing', 'Column required'))
+            continue
+        values = data[field]
+        if not isinstance(values, list):
+            errors.append(_error(field, 'list_type', 'Column should be a list'))
+            continue
+        lengths[field] = len(values)
+
+        if allowed is not None:
+            try:
+                codes, categories = _dictionary_encode(values)
+            except TypeError:
+                errors.append(_error(field, 'literal_error', 'Column contains lists or objects'))
+                continue
+            valid, invalid = [], []
+            for value in categories:
+                try:
+                    valid.append(adapter.validate_python(value))
+                except ValidationError:
+                    invalid.append(value)
+            if invalid:
+                errors.append(_error(
+                    field, 'literal_error',
+                    f'Values {invalid[:5]!r} not in {list(allowed)!r}'
+                ))
+            else:
+                columns[field] = (codes, valid)  # Canonical values, e.g. True → 1
+        else:
+            try:
+                columns[field] = np.array(adapter.validate_python(values), dtype=np.float64)
+            except ValidationError as e:
+                errors += [
+                    {'type': error['type'], 'loc': ['body', field, *error['loc']], 'msg': error['msg']}
+                    for error in e.errors(include_url=False)
+                ]
+            except OverflowError:
+                errors.append(_error(field, 'float_type', 'Column contains numbers too large for a float'))
+
+    n_rows = max(lengths.values(), default=0)
+    for field, length in lengths.items():
+        if length != n_rows:
+            errors.append(_error(field, 'length', f'Column has {length} values, others have {n_rows}'))
+
+    if errors:
+        raise ColumnValidationError(errors)
+    return columns, n_rows
+
+
+class TooManyRows(ValueError):
+    """
+    Raised when an uploaded table has more rows than allowed.
+
+    Attributes:
+        rows (int): Rows in the table
+    """
+
+    def __init__(self, rows: int, max_rows: int):
+        super().__init__(f'Table of {rows} rows exceeds the limit of {max_rows}')
+        self.rows = rows
+
+
+def read_table(body: bytes, content_type: str, max_rows: int | None = None):
+    """
+    Parse an Arrow IPC stream or a Parquet file.
+
+    A Parquet file's row count is read from its footer, before any column
+    is decoded. An Arrow IPC stream is read without copying or decoding
+    anything, so it is checked once read.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+        TooManyRows: If the table has more than max_rows rows
+        ValueError: If the body cannot be parsed
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        if content_type == PARQUET:
+            parquet = pq.ParquetFile(pa.BufferReader(body))
+            rows = parquet.metadata.num_rows
+            if max_rows is not None and rows > max_rows:
+                raise TooManyRows(rows, max_rows)
+            return parquet.read()
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowException as e:
+        raise ValueError(f'Cannot read {content_type} body: {e}') from e
+    if max_rows is not None and table.num_rows > max_rows:
+        raise TooManyRows(table.num_rows, max_rows)
+    return table
+
+
+def table_columns(table, domains: dict, numeric: dict) -> dict:
+    """
+    Turn the Customer columns of a pyarrow.Table into NumPy columns.
+
+    Literal fields are dictionary-encoded by Arrow: only the distinct values
+    become Python objects, every row is just an integer code.
+
+    Raises:
+        ColumnValidationError: For missing, null or non-numeric columns
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    columns, errors = {}, []
+    for field in list(domains) + list(numeric):
+        matches = table.schema.get_all_field_indices(field)
+        if not matches:
+            continue  # Reported by validate_columns()
+        if len(matches) > 1:
+            errors.append(_error(field, 'duplicate', f'Column appears {len(matches)} times'))
+            continue
+
+        column = table.column(matches[0])
+        if column.null_count:
+            errors.append(_error(field, 'missing', f'Column contains {column.null_count} null(s)'))
+            continue
+
+        if field in domains:
+            encoded = column.combine_chunks().dictionary_encode()
+            codes = encoded.indices.to_numpy(zero_copy_only=False)
+            columns[field] = (codes, encoded.dictionary.to_pylist())
+        elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            columns[field] = column.to_numpy().astype(np.float64, copy=False)
+        else:
+            errors.append(_error(field, 'float_type', f'Expected a numeric column, got {column.type}'))
+
+    try:
+        validate_columns(columns, domains, numeric)
+    except ColumnValidationError as e:
+        # Columns rejected above are "missing" from `columns`: keep only
+        # the more precise error for those
+        rejected = {tuple(error['loc']) for error in errors}
+        errors += [error for error in e.errors if tuple(error['loc']) not in rejected]
+
+    if errors:
+        raise ColumnValidationError(errors)
+    return columns
+
+
+def write_probabilities(probs: 'np.ndarray', content_type: str) -> bytes:
+    """
+    Serialize a churn_probability column in the requested format.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({'churn_probability': pa.array(probs, type=pa.float64())})
+    sink = io.BytesIO()
+    if content_type == PARQUET:
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
@@ -0,0 +1,278 @@
+"""
+Execution Strategies for Scoring
+
+Where does the CPU work of a prediction run? That choice matters more than it
+seems for a tiny linear model:
+
+- inline:     directly on the event loop. No thread hop at all - best on a
+              single CPU (e.g. the Fly.io shared-cpu-1x machine), where
+              threads add overhead but no parallelism
+- threadpool: on a bounded pool of threads. Keeps the event loop responsive
+              while slower engines (sklearn) run, but the GIL limits
+              throughput to roughly one core
+- process:    on a pool of worker processes, each with its own copy of the
+              model. Scales across cores, at the cost of pickling every
+              request and response between processes
+
+All strategies expose the same async interface, taking the model to score
+with (a scoring.LoadedModel) so a hot reload never changes the model under a
+request that is already running:
+    prob  = await executor.predict_one(model, customer)
+    probs = await executor.predict(model, customers)
+    probs, features, contributions = await executor.explain(model, customers, top_k)
+
+Usage:
+    executor = create_executor('threadpool', workers=4)
+    prob = await executor.predict_one(model, customer)
+"""
+
+import asyncio  # run_in_executor
+import multiprocessing  # Start method for worker processes
+import os  # CPU count
+from collections import OrderedDict  # Per-worker model versions, LRU order
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from scoring import load_model
+
+
+STRATEGIES = ('inline', 'threadpool', 'process')
+
+# Default thread pool size: the size of the anyio pool that synchronous
+# endpoints run on. Threads wait for the GIL rather than add throughput, but
+# one per CPU would mean a single thread on a 1-CPU machine, where one slow
+# sklearn call would hold up every other request
+THREADPOOL_WORKERS = 40
+
+
+def _predict_one(model, customer: dict) -> float:
+    return model.engine.predict_one(customer)
+
+
+def _predict(model, customers: list[dict]) -> list[float]:
+    # tolist() converts the whole NumPy array to Python floats at once
+    return model.engine.predict(customers).tolist() if customers else []
+
+
+def _explain(model, customers: list[dict], top_k: int) -> tuple[list, list, list]:
+    if not customers:
+        return [], [], []
+    probs, features, contributions = model.engine.explain(customers, top_k)
+    return probs.tolist(), features, contributions.tolist()
+
+
+class InlineExecutor:
+    """
+    Scores on the event loop itself.
+    """
+    name = 'inline'
+
+    def __init__(self):
+        self.workers = 0
+
+    async def predict_one(self, model, customer: dict) -> float:
+        return _predict_one(model, customer)
+
+    async def predict(self, model, customers: list[dict]) -> list[float]:
+        return _predict(model, customers)
+
+    async def explain(self, model, customers: list[dict], top_k: int) -> tuple[list, list, list]:
+        return _explain(model, customers, top_k)
+
+    async def prepare(self, model):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class ThreadPoolScoringExecutor:
+    """
+    Scores on a bounded pool of threads sharing the process's models.
+    """
+    name = 'threadpool'
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scoring')
+
+    async def predict_one(self, model, customer: dict) -> float:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _predict_one, model, customer)
+
+    async def predict(self, model, customers: list[dict]) -> list[float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _predict, model, customers)
+
+    async def explain(self, model, customers: list[dict], top_k: int) -> tuple[list, list, list]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _explain, model, customers, top_k)
+
+    async def prepare(self, model):
+        pass
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+# ----------------------------------------------------------------------------
+# Process pool: models cannot be shared with worker processes, so each worker
+# loads a model file the first time it is asked for that version, and keeps
+# the last few versions in this module-level cache
+# ----------------------------------------------------------------------------
+
+# Minimum number of versions each worker keeps loaded: the served models,
+# plus older ones that requests started before a reload may still ask for
+WORKER_MODEL_VERSIONS = 4
+
+_worker_models = OrderedDict()  # version → LoadedModel
+_worker_config = {}  # Set by _init_worker(): empty outside scoring workers
+
+
+def _init_worker(engine_kind: str, domains: dict, max_models: int):
+    _worker_config.update(engine_kind=engine_kind, domains=domains, max_models=max_models)
+
+
+def _worker_model(path: str, version: str):
+    model = _worker_models.get(version)
+    if model is None:
+        model = load_model(path, _worker_config['engine_kind'], domains=_worker_config['domains'])
+        if model.version != version:
+            raise RuntimeError(
+                f"{path} changed since it was loaded: expected version {version}, found {model.version}"
+            )
+        _worker_models[version] = model
+        if len(_worker_models) > _worker_config['max_models']:
+            _worker_models.popitem(last=False)
+    _worker_models.move_to_end(version)
+    return model
+
+
+def _worker_load(path: str, version: str) -> int:
+    _worker_model(path, version)
+    return os.getpid()
+
+
+def _worker_predict_one(path: str, version: str, customer: dict) -> float:
+    return _predict_one(_worker_model(path, version), customer)
+
+
+def _worker_predict(path: str, version: str, customers: list[dict]) -> list[float]:
+    return _predict(_worker_model(path, version), customers)
+
+
+def _worker_explain(path: str, version: str, customers: list[dict], top_k: int) -> tuple[list, list, list]:
+    return _explain(_worker_model(path, version), customers, top_k)
+
+
+class ProcessPoolScoringExecutor:
+    """
+    Scores on a pool of worker processes, each holding its own model copies.
+
+    Only the model's path and version travel with a request; workers load
+    (and check) the file themselves.
+    """
+    name = 'process'
+
+    def __init__(self, workers: int, engine_kind: str, domains: dict,
+                 max_models: int = WORKER_MODEL_VERSIONS):
+        self.workers = workers
+        # 'spawn' starts clean interpreters: forking a process that already
+        # runs an event loop and threads is not safe
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(engine_kind, domains, max_models),
+        )
+
+    def _load_tasks(self, model):
+        return [
+            self._pool.submit(_worker_load, model.path, model.version)
+            for _ in range(self.workers)
+        ]
+
+    def start(self, models: list):
+        """
+        Start the workers and load the models now, not on first request.
+        """
+        for model in models:
+            for future in self._load_tasks(model):
+                future.result()
+
+    async def prepare(self, model):
+        """
+        Load a new model version in the workers before it is swapped in.
+
+        Best effort: the pool decides which worker runs each task, so a
+        worker may still load the version lazily on its first request.
+        """
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in self._load_tasks(model)))
+
+    async def predict_one(self, model, customer: dict) -> float:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, _worker_predict_one, model.path, model.version, customer
+        )
+
+    async def predict(self, model, customers: list[dict]) -> list[float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, _worker_predict, model.path, model.version, customers
+        )
+
+    async def explain(self, model, customers: list[dict], top_k: int) -> tuple[list, list, list]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, _worker_explain, model.path, model.version, customers, top_k
+        )
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def is_scoring_worker() -> bool:
+    """
+    Whether this process is a ProcessPoolScoringExecutor worker, either
+    initialized or still re-importing the parent's main script.
+
+    Other child processes, e.g. a server started by a process manager with
+    multiprocessing, are not, and may start a pool of their own.
+    """
+    # _inheriting is set while 'spawn' bootstraps a child, the phase in which
+    # multiprocessing itself refuses to start new processes
+    bootstrapping = getattr(multiprocessing.current_process(), '_inheriting', False)
+    return bootstrapping or bool(_worker_config)
+
+
+def create_executor(strategy: str, models: list, workers: int = 0, domains: dict | None = None):
+    """
+    Build the executor for a strategy.
+
+    Args:
+        strategy (str): One of STRATEGIES
+        models (list): The scoring.LoadedModels served at startup; process
+            workers build the same engine kind and load them right away
+        workers (int): Pool size; 0 means THREADPOOL_WORKERS threads or
+            one process per CPU
+        domains (dict): Categorical domains for the 'table' engine (process)
+
+    Raises:
+        ValueError: If the strategy name is unknown
+    """
+    if strategy == 'inline':
+        return InlineExecutor()
+    if strategy == 'threadpool':
+        return ThreadPoolScoringExecutor(workers or THREADPOOL_WORKERS)
+    workers = workers or os.cpu_count() or 1
+    if strategy == 'process':
+        if is_scoring_worker():
+            # 'spawn' re-imports the main script (python predict.py) inside
+            # every worker: never start a nested pool from there
+            print("✗ EXECUTION_STRATEGY=process inside a scoring worker, scoring inline instead")
+            return InlineExecutor()
+        # Room for every served version, twice over while a reload is going on
+        max_models = max(WORKER_MODEL_VERSIONS, 2 * len(models))
+        executor = ProcessPoolScoringExecutor(workers, models[0].engine.name, domains, max_models)
+        executor.start(models)
+        return executor
+    raise ValueError(f"Unknown execution strategy {strategy!r}, expected one of {STRATEGIES}")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+"""
+Memory-Mapped Customer Feature Store
+
+data-week-3.csv keys every customer by customerID, yet /predict needs all 19
+features in every request. For customers the company already knows, the
+features can be encoded once, offline, and looked up by ID:
+
+1. build (offline):  python featurestore.py --data data-week-3.csv --model model.bin
+                     reads a customer snapshot, encodes every customer into
+                     the model's feature matrix and writes one file
+2. open (service):   FeatureStore.open() maps the file into memory with
+                     np.memmap: nothing is read or parsed up front, pages
+                     are loaded by the OS as they are touched and shared
+                     by every process that maps the same file
+3. lookup:           GET /predict/by-id/{customer_id} finds the row by
+                     binary search over the sorted IDs and scores it
+                     in place: no JSON payload, no validation, no encoding
+
+File layout (little-endian, sections 64-byte aligned):
+
+    b'CHURNFS1' | header length (uint64) | header (JSON) | pad
+    IDs:    rows × id_width bytes, sorted, NUL-padded   | pad
+    matrix: rows × n_features float64, in ID order
+
+The header names the features in column order (and their hash, as in
+GET /schema), so a store is never used with a model that encodes customers
+differently.
+
+Refresh: the builder writes a temporary file next to the target and moves it
+over it with os.replace(), an atomic rename. The service notices the new
+file (changed()) and opens it; requests still using the old mapping finish
+on it, since the old file stays readable until it is unmapped.
+
+Usage:
+    store = FeatureStore.open('customers.fstore')
+    row = store.find('7590-VHVEG')            # -1 if unknown
+    prob = model.engine.model.score_row(store.matrix[row])
+"""
+
+import argparse  # Command line of the builder
+import csv  # Reading the snapshot
+import hashlib  # Snapshot fingerprint
+import json  # Header
+import os  # Atomic replace, change detection
+import struct  # Fixed-size prefix
+import time  # Build timestamp
+
+import numpy as np  # Memory mapping
+
+from matrix import feature_hash  # Same fingerprint as GET /schema
+
+
+MAGIC = b'CHURNFS1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Columns of the raw CSV that are not Customer fields
+ID_COLUMN = 'customerid'
+NUMERIC_COLUMNS = {'seniorcitizen': int, 'tenure': int, 'monthlycharges': float, 'totalcharges': float}
+IGNORED_COLUMNS = {'churn'}
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def read_snapshot(path: str) -> tuple[list[str], list[dict]]:
+    """
+    Read a churn CSV into customer IDs and Customer dicts, prepared like
+    train.py does: lowercase names and values with '_' for spaces, numeric
+    columns as numbers, a blank totalcharges as 0.
+
+    Raises:
+        ValueError: If the file has no customerID column
+    """
+    ids, customers = [], []
+    with open(path, newline='') as f_in:
+        for row in csv.DictReader(f_in):
+            customer, customer_id = {}, None
+            for column, value in row.items():
+                field = column.lower().replace(' ', '_')
+                if field == ID_COLUMN:
+                    customer_id = value.strip()
+                elif field in NUMERIC_COLUMNS:
+                    try:
+                        customer[field] = NUMERIC_COLUMNS[field](value)
+                    except ValueError:
+                        customer[field] = 0
+                elif field not in IGNORED_COLUMNS:
+                    customer[field] = value.lower().replace(' ', '_')
+            if customer_id is None:
+                raise ValueError(f"{path} has no customerID column")
+            ids.append(customer_id)
+            customers.append(customer)
+    return ids, customers
+
+
+def write_store(path: str, ids: list[str], X: np.ndarray, feature_names: list[str],
+                metadata: dict | None = None) -> dict:
+    """
+    Write IDs and their encoded feature rows as a store, atomically.
+
+    The file is written under a temporary name in the same directory and
+    then renamed over `path`, so readers see either the old store or the
+    new one, never a partial file.
+
+    Args:
+        ids (list[str]): One customer ID per row of X
+        X (np.ndarray): Feature matrix, shape (len(ids), len(feature_names))
+        feature_names (list[str]): Column order of X
+        metadata (dict): Extra header fields (source, model version, ...)
+
+    Returns:
+        dict: The header that was written
+
+    Raises:
+        ValueError: For duplicate IDs or a matrix of the wrong shape
+    """
+    if X.shape != (len(ids), len(feature_names)):
+        raise ValueError(f"Matrix shape {X.shape} does not match {len(ids)} IDs x {len(feature_names)} features")
+    encoded = np.array([customer_id.encode() for customer_id in ids], dtype=bytes)
+    order = np.argsort(encoded, kind='stable')
+    encoded = encoded[order]
+    duplicates = encoded[1:][encoded[1:] == encoded[:-1]]
+    if len(duplicates):
+        raise ValueError(f"Duplicate customer IDs, e.g. {duplicates[0].decode()!r}")
+    matrix = np.ascontiguousarray(X[order], dtype='<f8')
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'rows': len(ids),
+        'id_width': encoded.dtype.itemsize,
+        'feature_names': list(feature_names),
+        'feature_hash': feature_hash(feature_names),
+        'snapshot': hashlib.sha256(encoded.tobytes() + matrix.tobytes()).hexdigest()[:12],
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        **(metadata or {}),
+    }
+    header_bytes = json.dumps(header).encode()
+    ids_offset = _align(len(MAGIC) + 8 + len(header_bytes))
+    matrix_offset = _align(ids_offset + encoded.nbytes)
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    try:
+        with open(tmp_path, 'wb') as f_out:
+            f_out.write(MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+            f_out.write(b'\0' * (ids_offset - f_out.tell()))
+            f_out.write(encoded.tobytes())
+            f_out.write(b'\0' * (matrix_offset - f_out.tell()))
+            f_out.write(matrix.tobytes())
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        os.replace(tmp_path, path)  # The atomic swap
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return header
+
+
+class FeatureStore:
+    """
+    A read-only, memory-mapped store of encoded customers.
+
+    Attributes:
+        path (str): Store file
+        header (dict): As written by write_store()
+        ids (np.ndarray): Sorted customer IDs (bytes), memory-mapped
+        matrix (np.ndarray): Feature rows in ID order, memory-mapped
+        feature_names (list[str]): Column order of matrix
+    """
+
+    def __init__(self, path: str, header: dict, ids: np.ndarray, matrix: np.ndarray, identity: tuple):
+        self.path = path
+        self.header = header
+        self.ids = ids
+        self.matrix = matrix
+        self.feature_names = header['feature_names']
+        self.opened_at = time.time()
+        self._identity = identity
+        self._fits = {}  # Model version → whether the rows use its features
+
+    @classmethod
+    def open(cls, path: str) -> 'FeatureStore':
+        """
+        Map a store file into memory.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not a store, or is truncated
+        """
+        identity = cls._stat(path)
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        if data[:len(MAGIC)].tobytes() != MAGIC:
+            raise ValueError(f"{path} is not a feature store (bad magic)")
+        (header_length,) = struct.unpack('<Q', data[len(MAGIC):len(MAGIC) + 8].tobytes())
+        header_start = len(MAGIC) + 8
+        header = json.loads(data[header_start:header_start + header_length].tobytes())
+        if header.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported store format {header.get('format_version')!r}")
+
+        rows, width, n_features = header['rows'], header['id_width'], len(header['feature_names'])
+        ids_offset = _align(header_start + header_length)
+        matrix_offset = _align(ids_offset + rows * width)
+        end = matrix_offset + rows * n_features * 8
+        if len(data) < end:
+            raise ValueError(f"{path} is truncated: {len(data)} bytes, expected {end}")
+
+        ids = data[ids_offset:ids_offset + rows * width].view(f'S{width}')
+        matrix = data[matrix_offset:end].view('<f8').reshape(rows, n_features)
+        return cls(path, header, ids, matrix, identity)
+
+    @staticmethod
+    def _stat(path: str) -> tuple:
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def changed(self) -> bool:
+        """
+        Whether `path` now names a different file (e.g. after an atomic swap).
+        """
+        try:
+            return self._stat(self.path) != self._identity
+        except OSError:
+            return False  # Gone for now: keep serving the mapped one
+
+    def fits(self, model_version: str, feature_names: list[str]) -> bool:
+        """
+        Whether the rows are encoded for a model's features, in its order.
+        Compared once per model version, then remembered.
+        """
+        fits = self._fits.get(model_version)
+        if fits is None:
+            fits = self._fits[model_version] = list(feature_names) == self.feature_names
+        return fits
+
+    def find(self, customer_id: str) -> int:
+        """
+        Row of a customer ID, or -1 if the store does not have it.
+        """
+        key = customer_id.encode()
+        if len(key) > self.ids.dtype.itemsize:
+            return -1
+        row = int(np.searchsorted(self.ids, key))
+        if row < len(self.ids) and self.ids[row] == key:
+            return row
+        return -1
+
+    def info(self) -> dict:
+        return {
+            'path': self.path,
+            'rows': self.header['rows'],
+            'snapshot': self.header['snapshot'],
+            'built_at': self.header['built_at'],
+            'source': self.header.get('source'),
+            'feature_hash': self.header['feature_hash'],
+            'opened_at': self.opened_at,
+            'size_mb': self.matrix.nbytes / 1e6,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a customer feature store for GET /predict/by-id')
+    parser.add_argument('--data', required=True, help='Customer snapshot CSV with a customerID column')
+    parser.add_argument('--model', default='model.bin', help='Model whose feature encoding to use')
+    parser.add_argument('--output', default='customers.fstore')
+    args = parser.parse_args()
+
+    from scoring import load_model
+
+    # The compiled engine encodes customers exactly like the pipeline's
+    # DictVectorizer, without building sparse matrices
+    model = load_model(args.model, 'compiled')
+    started = time.perf_counter()
+    ids, customers = read_snapshot(args.data)
+    X = model.engine.transform(customers)
+    header = write_store(args.output, ids, X, model.engine.model.feature_names, metadata={
+        'source': os.path.basename(args.data),
+        'model_version': model.version,
+    })
+    print(f"✓ {args.output}: {header['rows']} customers x {len(header['feature_names'])} features, "
+          f"snapshot {header['snapshot']}, {os.path.getsize(args.output) / 1e6:.1f} MB "
+          f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
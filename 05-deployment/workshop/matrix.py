@@ -0,0 +1,127 @@
+"""
+Raw Feature Matrix Scoring
+
+Some upstream jobs already hold customers as numeric arrays, one column per
+model feature in the order of the fitted DictVectorizer's feature_names_
+(see GET /schema). They can send that matrix as-is: the raw bytes of a
+little-endian float32 or float64 array, row after row, plus its shape in a
+header. The service wraps the bytes in a NumPy array without copying them
+and scores it directly: no JSON, no per-row parsing, no encoding.
+
+1. parse_shape():        'X-Matrix-Shape: 1000,45' → (1000, 45)
+2. read_matrix():        checks the column count (and optionally the
+                         feature order, by hash) against the model, the
+                         body length against the shape, and that every
+                         value is finite
+3. engine.score_matrix() (scoring.py) computes the probabilities
+4. write_probabilities(): little-endian float64 bytes, one per row
+
+NumPy is only imported when a matrix request arrives: predict.py needs this
+module's constants before the model is loaded.
+"""
+
+import hashlib  # Fingerprint of the feature order
+
+
+OCTET_STREAM = 'application/octet-stream'
+
+# Accepted element types, always little-endian
+DTYPES = {'float32': '<f4', 'float64': '<f8'}
+
+
+class MatrixValidationError(ValueError):
+    """
+    Raised when a matrix does not fit the model.
+
+    Attributes:
+        errors (list[dict]): Pydantic-style errors: type, loc, msg
+    """
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(f'{len(errors)} matrix error(s)')
+        self.errors = errors
+
+
+def feature_hash(feature_names: list[str]) -> str:
+    """
+    Short fingerprint of the feature order. Callers can send it back in
+    X-Feature-Hash so a reordered or retrained vocabulary is rejected
+    instead of silently mis-scored.
+    """
+    return hashlib.sha256('\n'.join(feature_names).encode()).hexdigest()[:16]
+
+
+def parse_shape(header: str) -> tuple[int, int]:
+    """
+    Parse 'rows,columns' (or 'rowsxcolumns').
+
+    Raises:
+        ValueError: If it is not two non-negative integers
+    """
+    parts = header.replace('x', ',').split(',')
+    try:
+        rows, cols = (int(part) for part in parts)
+    except ValueError:
+        raise ValueError(f"X-Matrix-Shape must be 'rows,columns', got {header!r}") from None
+    if rows < 0 or cols < 0:
+        raise ValueError(f"X-Matrix-Shape must not be negative, got {header!r}")
+    return rows, cols
+
+
+def read_matrix(body: bytes, shape: tuple[int, int], dtype: str,
+                feature_names: list[str], expected_hash: str | None = None):
+    """
+    Wrap a raw matrix body in a read-only NumPy array, without copying.
+
+    Args:
+        body (bytes): rows * columns values, row-major
+        shape (tuple): (rows, columns) from parse_shape()
+        dtype (str): 'float32' or 'float64'
+        feature_names (list[str]): The model's column order
+        expected_hash (str): feature_hash() the caller built its matrix for
+
+    Raises:
+        MatrixValidationError: Wrong column count or feature order, or
+            values that are NaN or infinite
+        ValueError: If the body length does not match the shape
+    """
+    import numpy as np
+
+    rows, cols = shape
+    errors = []
+    if cols != len(feature_names):
+        errors.append({
+            'type': 'feature_count', 'loc': ['header', 'x-matrix-shape'],
+            'msg': f'Expected {len(feature_names)} columns in the order of GET /schema, got {cols}',
+        })
+    if expected_hash is not None and expected_hash != feature_hash(feature_names):
+        errors.append({
+            'type': 'feature_order', 'loc': ['header', 'x-feature-hash'],
+            'msg': f'The model expects feature hash {feature_hash(feature_names)} (see GET /schema)',
+        })
+    if errors:
+        raise MatrixValidationError(errors)
+
+    itemsize = np.dtype(DTYPES[dtype]).itemsize
+    if len(body) != rows * cols * itemsize:
+        raise ValueError(
+            f'Body is {len(body)} bytes, a {rows}x{cols} {dtype} matrix is {rows * cols * itemsize}'
+        )
+
+    X = np.frombuffer(body, dtype=DTYPES[dtype]).reshape(rows, cols)
+    finite = np.isfinite(X).all(axis=1)
+    if not finite.all():
+        raise MatrixValidationError([
+            {'type': 'finite_number', 'loc': ['body', int(row)], 'msg': 'Row contains NaN or infinity'}
+            for row in np.flatnonzero(~finite)[:10]
+        ])
+    return X
+
+
+def write_probabilities(probs) -> bytes:
+    """
+    Churn probabilities as little-endian float64 bytes, in row order.
+    """
+    import numpy as np
+
+    return np.asarray(probs, dtype='<f8').tobytes()
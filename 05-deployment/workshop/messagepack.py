@@ -0,0 +1,102 @@
+"""
+MessagePack Requests and Responses
+
+Internal services call /predict at high rates, and encoding and parsing
+JSON is a visible share of CPU on both ends. MessagePack carries the same
+data (maps, strings, numbers, booleans) in a compact binary form that is
+cheaper to write and read. The prediction endpoints accept and return it
+next to JSON:
+
+- Request body:  Content-Type: application/msgpack (or application/x-msgpack,
+                 application/vnd.msgpack); anything else is read as JSON
+- Response body: negotiate() picks the format from the Accept header,
+                 and mirrors the request when Accept names neither
+
+The decoded body is validated against Customer exactly like JSON, so a
+MessagePack caller gets the same 422 errors.
+
+msgpack is optional: install it with `uv sync --extra msgpack`. It is only
+imported when a MessagePack request arrives.
+
+Usage:
+    if is_msgpack(request.headers.get('content-type', '')):
+        data = loads(await request.body())   # ValueError, ImportError
+    ...
+    content = dumps({'churn_probability': 0.66, 'churn': True})
+"""
+
+MSGPACK = 'application/msgpack'
+MEDIA_TYPES = (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+
+
+def _media_types(header: str) -> list[tuple[str, float]]:
+    """
+    'application/msgpack;q=0.9, */*' → [('application/msgpack', 0.9), ('*/*', 1.0)]
+    """
+    ranges = []
+    for part in header.split(','):
+        media_type, *params = part.split(';')
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((media_type.strip().lower(), q))
+    return ranges
+
+
+def is_msgpack(content_type: str) -> bool:
+    """
+    Whether a Content-Type header names MessagePack.
+    """
+    return content_type.split(';')[0].strip().lower() in MEDIA_TYPES
+
+
+def negotiate(accept: str, content_type: str) -> bool:
+    """
+    Whether the response should be MessagePack.
+
+    MessagePack if Accept ranks a MessagePack type above JSON; JSON if it
+    ranks JSON higher; otherwise (no Accept, */*) the same format as the
+    request body.
+    """
+    msgpack_q = json_q = 0.0
+    for media_type, q in _media_types(accept):
+        if media_type in MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == 'application/json':
+            json_q = max(json_q, q)
+    if msgpack_q != json_q:
+        return msgpack_q > json_q
+    return is_msgpack(content_type)
+
+
+def loads(body: bytes):
+    """
+    Decode one MessagePack object.
+
+    Raises:
+        ImportError: If msgpack is not installed
+        ValueError: If the body is not a single valid MessagePack object
+    """
+    import msgpack
+
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except (ValueError, TypeError, msgpack.UnpackException) as e:
+        raise ValueError(f'Cannot read MessagePack body: {e or type(e).__name__}') from e
+
+
+def dumps(obj) -> bytes:
+    """
+    Encode an object of dicts, lists, strings, numbers and booleans.
+
+    Raises:
+        ImportError: If msgpack is not installed
+    """
+    import msgpack
+
+    return msgpack.packb(obj)
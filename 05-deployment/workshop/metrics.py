@@ -0,0 +1,303 @@
+"""
+Request Metrics in Prometheus Format
+
+Where does the latency of /predict come from: parsing the JSON, validating
+the Customer, the DictVectorizer transform, predict_proba, or building the
+response? This module keeps the numbers needed to answer that, and serves
+them in the Prometheus text format on /metrics - without prometheus_client:
+
+- churn_requests_total{endpoint, status}:       answered requests
+- churn_request_errors_total{endpoint, status}: those with status >= 400
+                                                (500 for unhandled errors)
+- churn_request_duration_seconds{endpoint}:     latency histogram
+- churn_requests_in_flight:                     requests being served now
+- churn_stage_duration_seconds{stage}:          latency histogram per stage
+                                                of a prediction
+
+`endpoint` is the route template ('/models/{model_name}/predict'), never the
+raw URL, so the number of series stays bounded.
+
+Recording is cheap: a bisect into the bucket bounds and a few additions
+under a lock (stages may be observed from scoring threads). benchmark.py
+metrics measures what it costs end to end.
+
+Usage:
+    metrics = Metrics()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    with metrics.stage('parse'):
+        data = json.loads(body)
+    text = metrics.render()
+"""
+
+import threading  # Scoring threads observe stages too
+import time  # Timing
+from bisect import bisect_left  # Bucket lookup
+from contextlib import contextmanager  # stage()
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latency: from 100 µs to 10 s
+REQUEST_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Stages of a single prediction take microseconds: finer buckets at the low end
+STAGE_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025,
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1,
+)
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def route_template(scope: dict) -> str:
+    """
+    The route a request matched, e.g. '/models/{model_name}/predict', or
+    'unmatched' if none did (404).
+
+    Depending on the FastAPI version, scope['route'] of a router included
+    with a prefix may lack that prefix; then the template is rebuilt from the
+    path, replacing each path parameter's value by its name.
+    """
+    route = scope.get('route')
+    if route is None:
+        return 'unmatched'
+    path = getattr(route, 'path', '')
+    params = scope.get('path_params') or {}
+    if all(f'{{{name}' in path for name in params):
+        return path
+
+    names = {str(value): name for name, value in params.items()}
+    return '/'.join(
+        f'{{{names.pop(segment)}}}' if segment in names else segment
+        for segment in scope['path'].split('/')
+    )
+
+
+class Counter:
+    """
+    Monotonic count per label combination.
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}  # label values → count
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """
+    A value that goes up and down (no labels).
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def samples(self):
+        yield self.name, '', self.value
+
+
+class Collected:
+    """
+    A value kept by another component (a queue depth, a rejection count),
+    read each time the metrics are rendered.
+
+    Args:
+        kind (str): 'gauge' or 'counter'
+        collect: Callable returning a number, or a dict of label value → number
+        labelname (str): Label for the dict keys
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str, collect, labelname: str = ''):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.collect = collect
+        self.labelname = labelname
+
+    def samples(self):
+        value = self.collect()
+        if not isinstance(value, dict):
+            yield self.name, '', value
+            return
+        for label, number in sorted(value.items()):
+            yield self.name, _labels((self.labelname,), (label,)), number
+
+
+class Histogram:
+    """
+    Observations counted into fixed buckets, per label combination.
+
+    Counts are kept per bucket and only made cumulative (as Prometheus
+    expects) when rendered, so observe() touches a single bucket.
+
+    Args:
+        buckets (tuple): Increasing upper bounds; +Inf is added
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values → [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                yield self.name + '_bucket', _labels(self.labelnames, labels, f'le="{bound}"'), cumulative
+            yield self.name + '_sum', _labels(self.labelnames, labels), values[-1]
+            yield self.name + '_count', _labels(self.labelnames, labels), cumulative
+
+
+class Metrics:
+    """
+    The metrics of one prediction service.
+    """
+
+    def __init__(self):
+        self.requests = Counter(
+            'churn_requests_total', 'Requests answered', ('endpoint', 'status')
+        )
+        self.errors = Counter(
+            'churn_request_errors_total', 'Requests answered with status >= 400', ('endpoint', 'status')
+        )
+        self.latency = Histogram(
+            'churn_request_duration_seconds', 'Request latency', ('endpoint',), REQUEST_BUCKETS
+        )
+        self.in_flight = Gauge('churn_requests_in_flight', 'Requests being served')
+        self.stages = Histogram(
+            'churn_stage_duration_seconds', 'Latency of each stage of a prediction', ('stage',), STAGE_BUCKETS
+        )
+        self._all = [self.requests, self.errors, self.latency, self.in_flight, self.stages]
+
+    def add(self, metric):
+        """
+        Render another metric (e.g. a Collected) along with these.
+        """
+        self._all.append(metric)
+
+    def observe_request(self, endpoint: str, status: int, seconds: float):
+        self.requests.inc(endpoint, status)
+        if status >= 400:
+            self.errors.inc(endpoint, status)
+        self.latency.observe(seconds, endpoint)
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stages.observe(seconds, stage)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a block as one stage (also when it raises).
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.observe(time.perf_counter() - started, name)
+
+    def render(self) -> str:
+        """
+        Every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._all:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording count, latency, status and in-flight requests.
+
+    A plain ASGI wrapper rather than Starlette's BaseHTTPMiddleware: no extra
+    task per request, and streaming endpoints keep reading their body while
+    they respond. Latency runs until the last byte of the response is sent.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # If the app fails before it responds
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.in_flight.dec()
+            # The router has stored the matched route in the scope by now
+            metrics.observe_request(route_template(scope), status, time.perf_counter() - started)
@@ -19,13 +19,48 @@ Usage:
     uvicorn predict:app --host 0.0.0.0 --port 9696 --reload
 """
 
-import pickle  # For loading serialized model
+import time  # For timing startup and model reloads
+STARTED = time.perf_counter()  # Before the heavy imports below
+
+from profiling import StartupProfile  # Where start-up time goes
+startup = StartupProfile(STARTED)
+
+# Import the heavy libraries one at a time under a timer, so the report can
+# say what each costs; the regular imports below then find them loaded.
+# Only what /ping needs is imported here: NumPy and scikit-learn wait until
+# the models are loaded, in the background (see load_service)
+startup.import_modules('pydantic', 'pydantic')
+startup.import_modules('fastapi', 'fastapi')
+startup.import_modules('uvicorn', 'uvicorn')
+
+import asyncio  # For serializing model reloads
+import anyio  # Starlette's async backend, for DuplexStreamingResponse
+import json  # For request bodies and the startup report
+import os  # For reading service configuration from environment variables
+import sys  # For reporting which libraries got imported
+from contextlib import asynccontextmanager  # For startup/shutdown hooks
 from typing import Literal  # For restricting enum values
-from pydantic import BaseModel, Field, ConfigDict  # For request/response validation
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError  # For request/response validation
+from pydantic_core import to_json  # Fast JSON serialization of predictions
 
-from fastapi import FastAPI  # Web framework
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Path, Query, Request, Response  # Web framework
+from fastapi.concurrency import run_in_threadpool  # Run sync code off the event loop
+from fastapi.exceptions import RequestValidationError  # Standard 422 responses
+from fastapi.responses import PlainTextResponse, StreamingResponse  # For /metrics and NDJSON output
+import httpx  # In-process requests for the route warm-up
 import uvicorn  # ASGI server
 
+from admission import AdmissionController, Overloaded  # Load shedding
+from batching import MicroBatcher  # Coalesces concurrent /predict calls
+from caching import PredictionCache  # LRU cache of repeated customers
+from coalescing import SingleFlight  # Shares scoring between identical requests
+from shadow import ShadowScorer  # Candidate model on live traffic
+from registry import ModelRegistry, UnknownModelError  # Several model versions
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Collected, Metrics, MetricsMiddleware  # /metrics
+import columnar  # Arrow IPC / Parquet bulk scoring
+import messagepack  # MessagePack requests and responses
+import matrix  # Raw pre-encoded feature matrices
+
 
 # ============================================================================
 # PYDANTIC MODELS - Request/Response Validation
@@ -104,45 +139,885 @@ class PredictResponse(BaseModel):
     churn: bool = Field(..., description="Simple binary prediction")
 
 
+class FeatureContribution(BaseModel):
+    """
+    One feature's share of a churn prediction.
+    
+    Fields:
+        feature (str): Model feature, 'field=value' for categorical fields
+            (e.g. 'contract=month-to-month') or the field name for numbers
+        contribution (float): Its term in the logit (value * coefficient);
+            positive values push towards churn, negative away from it
+    """
+    feature: str
+    contribution: float
+
+
+class ExplainResponse(PredictResponse):
+    """
+    A prediction with the features that drove it.
+    
+    The logit is the model's intercept plus the contributions of all
+    features; the top ones are listed, largest absolute value first.
+    
+    Example:
+        {
+            "churn_probability": 0.664,
+            "churn": true,
+            "contributions": [
+                {"feature": "contract=month-to-month", "contribution": 0.487},
+                {"feature": "internetservice=dsl", "contribution": -0.356},
+                ...
+            ]
+        }
+    """
+    contributions: list[FeatureContribution] = Field(
+        ..., description="Top features by absolute logit contribution, largest first"
+    )
+
+
+# Validates the body of /predict/batch, which is read by hand (it may be
+# MessagePack) but must fail exactly like a list[Customer] parameter
+CustomerList = TypeAdapter(list[Customer])
+
+# OpenAPI schema of the columnar form of a /predict/batch body: one array
+# per Customer field (validated column by column, see columnar.dict_columns)
+CUSTOMER_COLUMNS_SCHEMA = {
+    "type": "object",
+    "title": "CustomerColumns",
+    "properties": {
+        name: {"type": "array", "items": field_schema}
+        for name, field_schema in Customer.model_json_schema()["properties"].items()
+    },
+    "required": list(Customer.model_fields),
+}
+
+# Allowed values of every Literal field, e.g. {'contract': ('month-to-month', ...)}
+# and (is_integer, minimum) of every numeric field, e.g. {'tenure': (True, 0)}
+# Used by the 'table' engine to precompute each (field, value) contribution,
+# and to validate whole columns in the columnar endpoints
+CATEGORICAL_DOMAINS, NUMERIC_FIELDS = columnar.column_specs(Customer)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Serialized sklearn pipeline loaded at startup. Point it to model.json (the
+# artifact exported by train.py) to boot without importing scikit-learn -
+# faster cold starts and less memory; needs SCORING_ENGINE=compiled, compiled32 or table
+MODEL_PATH = os.getenv('MODEL_PATH', 'model.bin')
+
+# Serve several model versions instead (see registry.py): every file in
+# MODEL_DIR matching MODEL_PATTERN is loaded, named after the file
+# ('model_C=0.1.bin' → 'model_C=0.1'). Requests choose one with
+# /models/{name}/predict... or an X-Model header; MODEL_DEFAULT names the
+# version used otherwise (default: the first name in sorted order).
+# Leave MODEL_DIR empty to serve only MODEL_PATH.
+MODEL_DIR = os.getenv('MODEL_DIR', '')
+MODEL_PATTERN = os.getenv('MODEL_PATTERN', '*.bin')
+MODEL_DEFAULT = os.getenv('MODEL_DEFAULT', '')
+
+# Largest number of customers accepted by /predict/batch in one request.
+# Bigger batches amortize HTTP/validation overhead better, but hold more
+# memory per request. Override with: MAX_BATCH_SIZE=50000 uvicorn predict:app
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '10000'))
+
+# /predict/stream scores NDJSON input in chunks of this many lines, so server
+# memory stays flat no matter how many customers are streamed
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', '1000'))
+
+# Longest NDJSON line /predict/stream accepts (a customer is ~600 bytes).
+# Longer lines get an inline error and are skipped without being buffered,
+# so a body without newlines cannot grow server memory without limit
+STREAM_MAX_LINE_BYTES = int(os.getenv('STREAM_MAX_LINE_BYTES', '65536'))
+
+# How predictions are computed (see scoring.py):
+# - sklearn:  pipeline.predict_proba() - the reference implementation
+# - compiled: direct dot product + sigmoid over the extracted coefficients
+# - compiled32: compiled, with batches scored in float32 through a reused
+#             feature buffer - half the memory traffic, same probabilities
+#             to 1e-6 (scoring.FLOAT32_TOLERANCE)
+# - table:    precomputed per-(field, value) contributions + 3 numeric terms
+SCORING_ENGINE = os.getenv('SCORING_ENGINE', 'sklearn')
+
+# Number of features listed per customer by /explain and by
+# /predict/batch?explain=true, unless the request asks for another top_k
+EXPLAIN_TOP_K = int(os.getenv('EXPLAIN_TOP_K', '5'))
+
+# Micro-batching of concurrent /predict calls (see batching.py).
+# Requests arriving within MICROBATCH_WINDOW_MS of each other (or up to
+# MICROBATCH_MAX_SIZE of them) are scored together in one call.
+# 0 disables micro-batching: every request is scored on its own.
+MICROBATCH_WINDOW_MS = float(os.getenv('MICROBATCH_WINDOW_MS', '0'))
+MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', '64'))
+
+# Where scoring runs (see execution.py):
+# - inline:     on the event loop (best on a single CPU)
+# - threadpool: on EXECUTION_WORKERS threads
+# - process:    on EXECUTION_WORKERS processes, each with its own model copy
+# EXECUTION_WORKERS=0 means 40 threads (as many as the anyio pool plain
+# `def` endpoints run on) or one process per CPU.
+EXECUTION_STRATEGY = os.getenv('EXECUTION_STRATEGY', 'threadpool')
+EXECUTION_WORKERS = int(os.getenv('EXECUTION_WORKERS', '0'))
+
+# In-process cache of /predict results (see caching.py).
+# CACHE_SIZE=0 disables it. Numeric fields are rounded to CACHE_PRECISION
+# decimals in the cache key; CACHE_TTL_SECONDS=0 means entries never expire.
+CACHE_SIZE = int(os.getenv('CACHE_SIZE', '0'))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '0'))
+CACHE_PRECISION = int(os.getenv('CACHE_PRECISION', '2'))
+
+# Identical /predict requests in flight at the same time (same model, same
+# validated Customer) share one scoring computation (see coalescing.py).
+# SINGLEFLIGHT=1 turns it on.
+SINGLEFLIGHT = os.getenv('SINGLEFLIGHT', '') not in ('', '0')
+
+# Shadow scoring (see shadow.py): a candidate model at SHADOW_MODEL_PATH also
+# scores SHADOW_FRACTION of the /predict requests, after they are answered,
+# in batches of up to SHADOW_BATCH_SIZE in an idle-priority worker process.
+# Served and candidate probabilities are appended to SHADOW_LOG (CSV).
+# Callers always get the served model's answer. Empty path: off.
+# SHADOW_ENGINE is the candidate's scoring engine (default: SCORING_ENGINE);
+# an exported model.json needs a NumPy engine such as compiled.
+SHADOW_MODEL_PATH = os.getenv('SHADOW_MODEL_PATH', '')
+SHADOW_ENGINE = os.getenv('SHADOW_ENGINE', '') or SCORING_ENGINE
+SHADOW_FRACTION = float(os.getenv('SHADOW_FRACTION', '0.1'))
+SHADOW_LOG = os.getenv('SHADOW_LOG', 'shadow.csv')
+SHADOW_BATCH_SIZE = int(os.getenv('SHADOW_BATCH_SIZE', '256'))
+SHADOW_FLUSH_SECONDS = float(os.getenv('SHADOW_FLUSH_SECONDS', '1'))
+SHADOW_MAX_QUEUE = int(os.getenv('SHADOW_MAX_QUEUE', '10000'))
+
+# GET /predict/by-id/{customer_id} scores known customers from a
+# memory-mapped feature store built offline by featurestore.py. The file is
+# checked every FEATURE_STORE_REFRESH_SECONDS and re-opened when it was
+# replaced (0: never). Empty path: no store, the endpoint answers 503.
+FEATURE_STORE_PATH = os.getenv('FEATURE_STORE_PATH', '')
+FEATURE_STORE_REFRESH_SECONDS = float(os.getenv('FEATURE_STORE_REFRESH_SECONDS', '5'))
+
+# Before GET /ready reports ready, the synthetic warm-up customers (every
+# value of every Literal field) go WARMUP_ROUNDS times through the whole
+# prediction path: JSON parsing, validation, the executor's threads or
+# worker processes, and response serialization. 0 skips it; the models are
+# still checked with a few predictions when they are loaded.
+WARMUP_ROUNDS = int(os.getenv('WARMUP_ROUNDS', '3'))
+
+# Admission control for the prediction endpoints (see admission.py).
+# At most ADMISSION_MAX_IN_FLIGHT requests are served at once; up to
+# ADMISSION_MAX_QUEUE more may wait ADMISSION_MAX_WAIT_MS for a free slot.
+# Everything beyond is rejected at once with 503 and Retry-After:
+# ADMISSION_RETRY_AFTER seconds. ADMISSION_MAX_IN_FLIGHT=0 admits everything.
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '0'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '64'))
+ADMISSION_MAX_WAIT_MS = float(os.getenv('ADMISSION_MAX_WAIT_MS', '50'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '1'))
+
+# STARTUP_PROFILE=1 prints a JSON report of where start-up time went (imports,
+# model loading, first request) once the first /predict has been answered.
+# The same report is always available under "startup" in GET /stats.
+STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', '') not in ('', '0')
+
+# Prometheus metrics on GET /metrics (see metrics.py): request counts, errors,
+# latency and in-flight requests for every endpoint, plus the latency of each
+# stage of /predict. Cheap enough to leave on; METRICS=0 turns them off.
+METRICS = os.getenv('METRICS', '1') not in ('', '0')
+
+# POST /admin/reload re-reads MODEL_PATH (or rescans MODEL_DIR) and swaps the
+# new models in without a restart. If ADMIN_TOKEN is set, callers must send it in X-Admin-Token.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+
 # ============================================================================
 # FASTAPI APPLICATION
 # ============================================================================
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs around the lifetime of the server: code after `yield` on shutdown.
+    """
+    # Load the models in the background: /ping answers as soon as the server
+    # is up, predictions wait until the models are ready
+    start_loading()
+    yield
+    if _store_watcher is not None:
+        _store_watcher.cancel()
+    if shadow is not None:
+        await shadow.stop()
+    if executor is not None:
+        executor.shutdown()
+
+
 # Initialize FastAPI application with title (shows in /docs)
 app = FastAPI(
     title="customer-churn-prediction",
     description="Predict customer churn probability",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Load trained model at startup
-# This happens once when the server starts, not on every request
-with open('model.bin', 'rb') as f_in:
-    pipeline = pickle.load(f_in)
-    print("✓ Model loaded successfully")
+# Created only when enabled, so the default path stays unchanged
+admission = None
+if ADMISSION_MAX_IN_FLIGHT > 0:
+    admission = AdmissionController(
+        ADMISSION_MAX_IN_FLIGHT,
+        max_queue=ADMISSION_MAX_QUEUE,
+        max_wait=ADMISSION_MAX_WAIT_MS / 1000,
+    )
 
 
-def predict_single(customer: dict) -> float:
+async def admit(request: Request):
     """
-    Make prediction for a single customer.
+    Hold an admission slot while a prediction request is served.
     
-    Args:
-        customer (dict): Customer features dict from Pydantic model
+    A streaming endpoint takes the slot over (request.state.admission_slot
+    set to False) and releases it once its body is sent: this dependency's
+    exit runs before the body is generated.
+    
+    Raises:
+        HTTPException 503: With Retry-After, if the service is at its limit
+    """
+    try:
+        await admission.acquire()
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service overloaded ({e.reason}), retry later",
+            headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+        )
+    request.state.admission_slot = True
+    try:
+        yield
+    finally:
+        if request.state.admission_slot:
+            admission.release()
+
+
+singleflight = SingleFlight() if SINGLEFLIGHT else None
+
+
+# Prediction endpoints, mounted below with and without a model name prefix
+router = APIRouter(dependencies=[Depends(admit)] if admission is not None else [])
+
+# Request metrics for every endpoint; stage timings are added by /predict
+# and by the scoring engines (when they run in this process)
+metrics = Metrics() if METRICS else None
+if metrics is not None:
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    if admission is not None:
+        metrics.add(Collected(
+            'churn_admission_in_flight', 'Prediction requests holding an admission slot',
+            'gauge', lambda: admission.in_flight,
+        ))
+        metrics.add(Collected(
+            'churn_admission_queue_depth', 'Prediction requests waiting for an admission slot',
+            'gauge', lambda: admission.queue_depth,
+        ))
+        metrics.add(Collected(
+            'churn_admission_rejected_total', 'Prediction requests rejected with 503',
+            'counter', lambda: admission.rejected, labelname='reason',
+        ))
+    if singleflight is not None:
+        metrics.add(Collected(
+            'churn_singleflight_computations_total', 'Predictions computed for /predict requests',
+            'counter', lambda: singleflight.computations,
+        ))
+        metrics.add(Collected(
+            'churn_singleflight_saved_total', 'Requests that shared an identical in-flight computation',
+            'counter', lambda: singleflight.joined,
+        ))
+    if SHADOW_MODEL_PATH:
+        metrics.add(Collected(
+            'churn_shadow_scored_total', 'Requests also scored by the shadow model',
+            'counter', lambda: shadow.scored if shadow is not None else 0,
+        ))
+        metrics.add(Collected(
+            'churn_shadow_dropped_total', 'Shadow samples dropped because the queue was full',
+            'counter', lambda: shadow.dropped if shadow is not None else 0,
+        ))
+        metrics.add(Collected(
+            'churn_shadow_disagreements_total', 'Shadow-scored requests with a different churn decision',
+            'counter', lambda: shadow.disagreements if shadow is not None else 0,
+        ))
+
+
+def synthetic_customers(n: int) -> list[dict]:
+    """
+    Valid made-up customers for warming up a model.
+    
+    Every Literal field cycles through its allowed values, so n >= 4 covers
+    every category the API accepts.
+    """
+    rows = []
+    for i in range(n):
+        row = {field: values[i % len(values)] for field, values in CATEGORICAL_DOMAINS.items()}
+        for field, (is_integer, _) in NUMERIC_FIELDS.items():
+            row[field] = i * 12 if is_integer else i * 25.5
+        rows.append(Customer(**row).model_dump())
+    return rows
+
+
+WARMUP_CUSTOMERS = synthetic_customers(8)
+
+
+def warm_up(model) -> float:
+    """
+    Run a few predictions through a freshly loaded model.
+    
+    The first calls pay for lazy initialization (NumPy/BLAS dispatch, sklearn
+    validation code paths); doing them here keeps that off real requests.
+    It also proves the model works before it is allowed to serve.
+    
+    Returns:
+        float: Seconds spent warming up
         
+    Raises:
+        ValueError: If the model produces anything but probabilities
+    """
+    started = time.perf_counter()
+    probs = [model.engine.predict_one(c) for c in WARMUP_CUSTOMERS]
+    probs += model.engine.predict(WARMUP_CUSTOMERS).tolist()
+    if not all(0.0 <= p <= 1.0 for p in probs):
+        raise ValueError(f"Model {model.version} returned invalid probabilities: {probs}")
+    return time.perf_counter() - started
+
+
+def load_and_warm_up(path: str):
+    from scoring import load_model  # NumPy is only needed from here on
+    
+    model = load_model(path, SCORING_ENGINE, domains=CATEGORICAL_DOMAINS)
+    warm_up(model)
+    return model
+
+
+async def warm_up_service(models) -> dict:
+    """
+    Send the warm-up customers through every step of a real prediction, for
+    each model: parse the JSON body, validate the Customer, score on the
+    executor (one at a time and as a batch), serialize the response.
+    
+    warm_up() only exercises the model in this process. The first real
+    requests would still pay for first-call allocations and lazy
+    initialization in Pydantic, the executor (thread start-up, each worker
+    process's own NumPy/sklearn) and the JSON serializer - several times the
+    steady-state latency. The cache and the micro-batcher are bypassed, so
+    no synthetic entries are left behind.
+    
     Returns:
-        float: Churn probability (0.0-1.0)
+        dict: Rounds, customers per round, total seconds, and the mean
+              milliseconds per customer of each round (the first round
+              shows the cold cost, the last the warm one)
         
-    Implementation:
-        1. pipeline.predict_proba() returns [[prob_no_churn, prob_churn]]
-        2. [0, 1] gets first prediction, churn column (second)
-        3. float() converts NumPy float to Python float
+    Raises:
+        ValueError: If a model returns anything but probabilities
     """
-    # Get probability from pipeline
-    # Shape: (1, 2) → [[prob_no_churn, prob_churn]]
-    result = pipeline.predict_proba(customer)[0, 1]
+    started = time.perf_counter()
+    bodies = [to_json(customer) for customer in WARMUP_CUSTOMERS]
+    request = Request({"type": "http", "headers": []})  # Negotiates JSON
+    round_ms = []
+    for _ in range(WARMUP_ROUNDS):
+        round_started = time.perf_counter()
+        for model in models:
+            for body in bodies:
+                features = validate_body(Customer, parse_body(body)).model_dump()
+                negotiated_response(request, prediction(await executor.predict_one(model, features)), model)
+            probs = await executor.predict(model, WARMUP_CUSTOMERS)
+            if not all(0.0 <= p <= 1.0 for p in probs):
+                raise ValueError(f"Model {model.version} returned invalid probabilities: {probs}")
+            negotiated_response(request, [prediction(prob) for prob in probs], model)
+        n_predictions = 2 * len(bodies) * len(models)
+        round_ms.append((time.perf_counter() - round_started) * 1000 / n_predictions)
     
-    # Convert NumPy float64 to Python float (for JSON serialization)
-    return float(result)
+    return {
+        "rounds": WARMUP_ROUNDS,
+        "customers": len(bodies),
+        "seconds": time.perf_counter() - started,
+        "round_ms_per_prediction": round_ms,
+    }
+
+
+async def warm_up_routes():
+    """
+    Send GET /schema through the app, with and without the /models/{name}
+    prefix, over httpx's in-process ASGI transport: the middleware, routing
+    and dependencies do their lazy set-up (FastAPI builds the route matching
+    of an included router on its first request) before a real request has
+    to wait for it.
+    
+    Nothing is scored or cached; /metrics counts the two requests like any
+    other.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+        for path in ("/schema", f"/models/{registry.default}/schema"):
+            (await client.get(path)).raise_for_status()
+
+
+def observe_stages(models):
+    """
+    Let the scoring engines report their stages to /metrics - after the
+    warm-up, so only real requests show up there.
+    """
+    if metrics is not None:
+        for model in models:
+            model.engine.observe = metrics.observe_stage
+
+
+def build_registry() -> ModelRegistry:
+    """
+    Load and warm up every configured model version.
+    """
+    if MODEL_DIR:
+        return ModelRegistry.from_directory(
+            MODEL_DIR, MODEL_PATTERN, load_and_warm_up, default=MODEL_DEFAULT or None
+        )
+    return ModelRegistry.from_paths([MODEL_PATH], load_and_warm_up)
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Peak resident memory of this process so far, in MB (None on Windows).
+    """
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1024
+
+
+# Created by load_service(). `registry` is the one reference a reload
+# replaces: every request looks up its model once and uses that LoadedModel
+# until it has answered
+registry = None
+executor = None
+batcher = None
+cache = None
+shadow = None
+feature_store = None
+STARTUP_SECONDS = None
+STARTUP_RSS_MB = None
+
+
+def load_service():
+    """
+    Load the trained models and start the executor.
+    
+    This happens once, in a worker thread right after the server starts,
+    not on every request and not while the module is imported.
+    """
+    global registry, executor, batcher, cache, shadow, feature_store, STARTUP_SECONDS, STARTUP_RSS_MB
+    
+    startup.import_modules('numpy', 'numpy')
+    model_files = MODEL_PATTERN if MODEL_DIR else MODEL_PATH
+    if SCORING_ENGINE == 'sklearn' or not model_files.endswith('.json'):
+        # Unpickling would import these anyway; time them on their own
+        startup.import_modules(
+            'sklearn', 'sklearn.pipeline', 'sklearn.feature_extraction', 'sklearn.linear_model'
+        )
+    
+    with startup.stage('model_load'):
+        new_registry = build_registry()
+    # Part of model_load: reading, unpickling and building the engines
+    startup.stages['unpickle'] = sum(m.load_seconds for m in new_registry.models.values())
+    print(f"✓ Models loaded successfully (default: {new_registry.default})")
+    
+    # Content hash of each model file: identifies exactly which model answers
+    for name, model in new_registry.models.items():
+        print(f"✓ Model {name}: version {model.version}, ~{new_registry.memory[name] / 1024:.0f} KB")
+    print(f"✓ Scoring engine: {new_registry.get().engine.name}")
+    
+    from execution import create_executor
+    with startup.stage('executor'):
+        new_executor = create_executor(
+            EXECUTION_STRATEGY,
+            list(new_registry.models.values()),
+            workers=EXECUTION_WORKERS,
+            domains=CATEGORICAL_DOMAINS,
+        )
+    print(f"✓ Execution strategy: {new_executor.name} ({new_executor.workers} workers)")
+    
+    # Created only when enabled, so the default path stays unchanged
+    if MICROBATCH_WINDOW_MS > 0:
+        batcher = MicroBatcher(
+            new_executor.predict,
+            window_ms=MICROBATCH_WINDOW_MS,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+        )
+        print(f"✓ Micro-batching: {MICROBATCH_WINDOW_MS} ms window, max {MICROBATCH_MAX_SIZE}")
+    
+    if CACHE_SIZE > 0:
+        cache = PredictionCache(CACHE_SIZE, ttl=CACHE_TTL_SECONDS, precision=CACHE_PRECISION)
+        print(f"✓ Prediction cache: {CACHE_SIZE} entries")
+    
+    if SHADOW_MODEL_PATH:
+        new_shadow = ShadowScorer(
+            SHADOW_MODEL_PATH,
+            log_path=SHADOW_LOG,
+            fraction=SHADOW_FRACTION,
+            batch_size=SHADOW_BATCH_SIZE,
+            flush_seconds=SHADOW_FLUSH_SECONDS,
+            max_queue=SHADOW_MAX_QUEUE,
+            engine_kind=SHADOW_ENGINE,
+            domains=CATEGORICAL_DOMAINS,
+        )
+        try:
+            with startup.stage('shadow'):
+                new_shadow.start()
+        except Exception as e:
+            # The candidate is optional: serve without it
+            print(f"✗ Shadow model failed to load, shadow scoring off: {e!r}")
+        else:
+            shadow = new_shadow
+            print(f"✓ Shadow scoring: {shadow.model_info['name']} "
+                  f"(version {shadow.model_info['version']}), {SHADOW_FRACTION:.0%} of /predict → {SHADOW_LOG}")
+    
+    if FEATURE_STORE_PATH:
+        try:
+            feature_store = open_feature_store(new_registry.models.values())
+        except (OSError, ValueError) as e:
+            # Predictions with features still work; the watcher retries
+            print(f"✗ Feature store not loaded: {e!r}")
+    
+    registry, executor = new_registry, new_executor
+    
+    # From the first line of this module to here. (Interpreter and uvicorn
+    # start-up come on top: see process_start_to_app_import in the report.)
+    STARTUP_SECONDS = startup.since_start()
+    STARTUP_RSS_MB = peak_rss_mb()
+    print(
+        f"✓ Ready: {STARTUP_SECONDS:.2f}s, peak RSS {STARTUP_RSS_MB or 0:.0f} MB, "
+        f"sklearn {'imported' if 'sklearn' in sys.modules else 'not imported'}"
+    )
+
+
+# service_ready is set once load_service() has finished, successfully or
+# not; predictions can be served from then on. service_warm is set once the
+# warm-up has finished too: only then does GET /ready answer 200
+service_ready = asyncio.Event()
+service_warm = asyncio.Event()
+service_error = None
+warmup_report = None
+_loading = None
+
+
+async def _load_in_background():
+    global service_error, warmup_report, _store_watcher
+    try:
+        await run_in_threadpool(load_service)
+    except Exception as e:
+        service_error = e
+        print(f"✗ Loading the models failed: {e!r}")
+    service_ready.set()
+    if service_error is not None:
+        return
+    
+    try:
+        with startup.stage('warmup'):
+            warmup_report = await warm_up_service(list(registry.models.values()))
+            await warm_up_routes()
+    except Exception as e:
+        # Real requests would fail the same way
+        service_error = e
+        print(f"✗ Warm-up failed: {e!r}")
+        return
+    observe_stages(registry.models.values())
+    print(f"✓ Warmed up: {warmup_report['seconds']:.2f}s, ms per prediction by round: "
+          f"{', '.join(f'{ms:.2f}' for ms in warmup_report['round_ms_per_prediction'])}")
+    service_warm.set()
+    
+    if FEATURE_STORE_PATH and FEATURE_STORE_REFRESH_SECONDS > 0:
+        _store_watcher = asyncio.get_running_loop().create_task(watch_feature_store())
+
+
+def open_feature_store(models):
+    """
+    Map FEATURE_STORE_PATH into memory (see featurestore.py) and check its
+    feature encoding against `models` once, not on every request.
+    """
+    from featurestore import FeatureStore  # NumPy is only needed from here on
+    
+    store = FeatureStore.open(FEATURE_STORE_PATH)
+    print(f"✓ Feature store: {store.header['rows']} customers, snapshot {store.header['snapshot']} "
+          f"({store.header['built_at']})")
+    for model in models:
+        if not store.fits(model.version, model.engine.model.feature_names):
+            print(f"✗ Feature store {store.header['snapshot']} was not built for model {model.name}: "
+                  f"/predict/by-id answers 409 for it")
+    return store
+
+
+# Re-opens the feature store after its file was swapped. Like a model
+# reload, this only replaces the `feature_store` reference: a request that
+# already picked up the old store finishes on its mapping
+_store_watcher = None
+feature_store_refreshes = 0
+
+
+async def watch_feature_store():
+    global feature_store, feature_store_refreshes
+    last_error = None
+    while True:
+        await asyncio.sleep(FEATURE_STORE_REFRESH_SECONDS)
+        if feature_store is not None and not feature_store.changed():
+            continue
+        try:
+            store = await run_in_threadpool(open_feature_store, registry.models.values())
+        except (OSError, ValueError) as e:
+            if repr(e) != last_error:  # Once per problem, not every few seconds
+                print(f"✗ Feature store not refreshed: {e!r}")
+                last_error = repr(e)
+            continue
+        last_error = None
+        feature_store = store
+        feature_store_refreshes += 1
+
+
+def start_loading():
+    """
+    Start load_service() in the background, once.
+    """
+    global _loading
+    if _loading is None:
+        _loading = asyncio.get_running_loop().create_task(_load_in_background())
+
+
+async def wait_until_loaded():
+    """
+    Wait for the models; starts loading them if the server did not (e.g. when
+    the app runs without its lifespan).
+    
+    Raises:
+        HTTPException 503: If loading the models failed
+    """
+    if not service_ready.is_set():
+        start_loading()
+        await service_ready.wait()
+    if service_error is not None:
+        raise HTTPException(status_code=503, detail=f"Models failed to load: {service_error!r}")
+
+
+# One reload at a time; requests are never blocked by it
+reload_lock = asyncio.Lock()
+reload_count = 0
+
+
+def model_headers(model) -> dict:
+    """
+    Response headers naming the model that computed a prediction.
+    """
+    return {"X-Model-Name": model.name, "X-Model-Version": model.version}
+
+
+def prediction(prob: float) -> dict:
+    """
+    One PredictResponse as a plain dict, ready for to_json().
+    
+    Returning a PredictResponse makes FastAPI validate it again and encode it
+    with the standard JSON encoder - a large share of the CPU time for a
+    two-field result. `prob` comes straight from the model and is a valid
+    probability by construction (warm_up() checks every model), so the
+    dict is written to bytes directly (see negotiated_response).
+    
+    The endpoints still declare PredictResponse as their return type, so the
+    OpenAPI schema is unchanged.
+    """
+    return {"churn_probability": prob, "churn": prob >= 0.5}
+
+
+def explanation(prob: float, features: list[str], contributions: list[float]) -> dict:
+    """
+    One ExplainResponse as a plain dict, ready for to_json().
+    """
+    return {
+        "churn_probability": prob,
+        "churn": prob >= 0.5,
+        "contributions": [
+            {"feature": feature, "contribution": contribution}
+            for feature, contribution in zip(features, contributions)
+        ],
+    }
+
+
+def json_response(content: bytes, model) -> Response:
+    """
+    Serialized JSON plus the headers naming the model that computed it.
+    """
+    return Response(content=content, media_type="application/json", headers=model_headers(model))
+
+
+def negotiated_response(request: Request, content, model) -> Response:
+    """
+    Results (dicts and lists, see prediction()) as JSON or MessagePack,
+    whichever the request negotiated (see messagepack.negotiate), plus the
+    model headers.
+    
+    Raises:
+        HTTPException 501: If MessagePack was asked for but msgpack is not
+            installed
+    """
+    headers = request.headers
+    if not messagepack.negotiate(headers.get("accept", ""), headers.get("content-type", "")):
+        return json_response(to_json(content), model)
+    try:
+        body = messagepack.dumps(content)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="msgpack is not installed: uv sync --extra msgpack")
+    return Response(content=body, media_type=messagepack.MSGPACK, headers=model_headers(model))
+
+
+async def model_name_path(model_name: str = Path(description="Loaded model version, see GET /models")):
+    """
+    Declares the {model_name} of /models/{model_name}/... (for validation and
+    the OpenAPI schema); selected_model() reads it from the path.
+    """
+    return model_name
+
+
+async def selected_model(request: Request, x_model: str | None = Header(default=None)):
+    """
+    The model version a request asked for: the {model_name} in
+    /models/{model_name}/predict..., else the X-Model header, else the default.
+    
+    The name is read from the path, not declared as a parameter: the same
+    router also serves /predict..., where it would become a query parameter.
+    
+    Waits for the models while the service is still starting.
+    
+    Raises:
+        HTTPException 404: If that version is not loaded
+        HTTPException 503: If the models failed to load
+    """
+    await wait_until_loaded()
+    try:
+        return registry.get(request.path_params.get("model_name") or x_model)
+    except UnknownModelError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown model {e.args[0]!r}, loaded: {sorted(registry.models)}"
+        )
+
+
+async def score_customer(model, features: dict) -> float:
+    """
+    Churn probability for one validated customer under `model`, using the
+    cache, singleflight, micro-batching and execution strategy configured
+    at startup.
+    """
+    if cache is not None:
+        key = cache.key(features)
+        prob = cache.get(key, model.version)
+        if prob is not None:
+            return prob
+    
+    if singleflight is not None:
+        # model_dump() lists the fields in a fixed order: equal customers
+        # give equal tuples
+        flight = (model.version, tuple(features.values()))
+        prob = await singleflight.do(flight, lambda: compute_probability(model, features))
+    else:
+        prob = await compute_probability(model, features)
+    
+    if cache is not None:
+        cache.put(key, prob, model.version)
+    return prob
+
+
+async def compute_probability(model, features: dict) -> float:
+    """
+    Score one customer, micro-batched or straight on the executor.
+    """
+    if batcher is not None:
+        # Wait for the current micro-batch to be scored
+        return await batcher.submit(model, features)
+    # Score with the configured execution strategy
+    return await executor.predict_one(model, features)
+
+
+def parse_body(body: bytes, content_type: str = ""):
+    """
+    Parse a request body, failing like FastAPI's own body parsing.
+    
+    The body is JSON unless content_type names MessagePack (see
+    messagepack.py). An empty body or a null counts as missing.
+    
+    Raises:
+        RequestValidationError: 422 if the body is missing or malformed
+        HTTPException 501: If it is MessagePack and msgpack is not installed
+    """
+    missing = RequestValidationError(
+        [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+    )
+    if not body:
+        raise missing
+    if messagepack.is_msgpack(content_type):
+        try:
+            data = messagepack.loads(body)
+        except ImportError:
+            raise HTTPException(status_code=501, detail="msgpack is not installed: uv sync --extra msgpack")
+        except ValueError as e:
+            raise RequestValidationError(
+                [{"type": "msgpack_invalid", "loc": ("body",), "msg": str(e), "input": {}}]
+            )
+    else:
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise RequestValidationError([{
+                "type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+                "input": {}, "ctx": {"error": e.msg},
+            }])
+    if data is None:
+        raise missing
+    return data
+
+
+def validate_body(schema, data):
+    """
+    Validate a parsed body against a Pydantic model (or a TypeAdapter, such
+    as CustomerList), with FastAPI's 422 errors.
+    
+    Raises:
+        RequestValidationError: 422 listing every invalid field under "body"
+    """
+    try:
+        if isinstance(schema, TypeAdapter):
+            return schema.validate_python(data, from_attributes=True)
+        return schema.model_validate(data, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ])
+
+
+def batch_too_large(n_rows: int) -> HTTPException:
+    """
+    The 413 for a batch of n_rows customers, more than MAX_BATCH_SIZE.
+    """
+    return HTTPException(
+        status_code=413,
+        detail=f"Batch of {n_rows} customers exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}"
+    )
+
+
+def check_batch_size(n_rows: int):
+    """
+    Reject a batch larger than MAX_BATCH_SIZE, before any row is validated.
+    
+    Raises:
+        HTTPException 413: If there are more than MAX_BATCH_SIZE rows
+    """
+    if n_rows > MAX_BATCH_SIZE:
+        raise batch_too_large(n_rows)
+
+
+def report_first_request(path: str):
+    """
+    Complete the start-up report with the first answered prediction.
+    """
+    if startup.first_request(path) and STARTUP_PROFILE:
+        print(json.dumps({"startup_profile": startup.report()}), flush=True)
 
 
 @app.get("/ping")
@@ -160,18 +1035,135 @@ def ping():
     return {"status": "ok"}
 
 
-@app.post("/predict")
-def predict(customer: Customer) -> PredictResponse:
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Prometheus metrics of this process (see metrics.py).
+    
+    Returns:
+        str: Text exposition format: churn_requests_total,
+             churn_request_errors_total, churn_request_duration_seconds,
+             churn_requests_in_flight and churn_stage_duration_seconds
+    
+    Raises:
+        HTTPException 404: If the service runs with METRICS=0
+    
+    Example:
+        GET http://localhost:9696/metrics
+        
+        Response:
+        churn_requests_total{endpoint="/predict",status="200"} 1042
+        churn_stage_duration_seconds_bucket{stage="validate",le="2.5e-05"} 1001
+        ...
+    """
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS=0)")
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/ready")
+async def ready(response: Response):
+    """
+    Readiness check: may this instance receive traffic?
+    
+    /ping only says the process is alive (liveness). /ready answers 200 once
+    the models are loaded and the warm-up has run, so a load balancer only
+    routes requests to instances that serve them at full speed.
+    
+    Returns:
+        dict: {"status": "ready", "warmup": {...}} with status 200, or
+              {"status": "loading" | "warming_up" | "failed"} with status 503
+    
+    Example:
+        GET http://localhost:9696/ready
+        
+        Response:
+        {"status": "ready", "warmup": {"rounds": 3, "customers": 8, "seconds": 0.03,
+         "round_ms_per_prediction": [1.21, 0.41, 0.39]}}
+    """
+    start_loading()
+    if service_error is not None:
+        response.status_code = 503
+        return {"status": "failed", "error": repr(service_error)}
+    if not service_warm.is_set():
+        response.status_code = 503
+        return {"status": "warming_up" if service_ready.is_set() else "loading"}
+    return {"status": "ready", "warmup": warmup_report}
+
+
+@app.get("/stats")
+async def stats():
+    """
+    Runtime statistics of the prediction service.
+    
+    Returns:
+        dict: Model version, scoring engine, execution strategy, plus
+              micro-batching (batch sizes, queue waits), cache
+              (hits, misses), singleflight (computations saved) and
+              shadow scoring (served vs candidate) metrics and the
+              feature store snapshot when those are enabled, the loaded
+              model versions and how many times they were reloaded,
+              startup time and memory of the process, with the full
+              start-up report and warm-up timings, and admission control
+              (in flight, queue depth, rejections) when enabled
+    """
+    await wait_until_loaded()
+    return {
+        "model_version": registry.get().version,
+        "engine": registry.get().engine.name,
+        "models": registry.describe(),
+        "reloads": reload_count,
+        "process": {
+            "startup_seconds": STARTUP_SECONDS,
+            "startup_peak_rss_mb": STARTUP_RSS_MB,
+            "peak_rss_mb": peak_rss_mb(),
+            "sklearn_imported": 'sklearn' in sys.modules,
+        },
+        "startup": startup.report(),
+        "warmup": warmup_report,
+        "execution": {"strategy": executor.name, "workers": executor.workers},
+        "microbatch": batcher.stats() if batcher is not None else None,
+        "cache": cache.stats() if cache is not None else None,
+        "singleflight": singleflight.stats() if singleflight is not None else None,
+        "shadow": shadow.stats() if shadow is not None else None,
+        "feature_store": (
+            {**feature_store.info(), "refreshes": feature_store_refreshes}
+            if feature_store is not None else None
+        ),
+        "admission": admission.stats() if admission is not None else None,
+    }
+
+
+@router.post(
+    "/predict",
+    # The body is read by hand (to time each stage): document it as before
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"$ref": "#/components/schemas/Customer"}},
+                messagepack.MSGPACK: {"schema": {"$ref": "#/components/schemas/Customer"}},
+            },
+        }
+    },
+)
+async def predict(request: Request, model=Depends(selected_model)) -> PredictResponse:
     """
     Make churn prediction for a customer.
     
-    Pydantic automatically:
-    - Validates all fields based on Customer model
-    - Returns 422 error if validation fails
-    - Converts JSON input to Python types
+    Pydantic validates all fields based on the Customer model and a 422
+    error is returned if validation fails, exactly as for a Customer
+    parameter. The body is parsed and validated here rather than by FastAPI
+    so each stage can be timed on its own for /metrics:
+    parse → validate → score (transform + predict_proba) → respond
+    
+    The body may be MessagePack instead of JSON (Content-Type:
+    application/msgpack), and so may the response (Accept:
+    application/msgpack; by default the response uses the request's
+    format). See messagepack.py.
     
     Args:
-        customer (Customer): Customer data (auto-validated by Pydantic)
+        request: Body with the customer data (JSON or MessagePack, see Customer)
         
     Returns:
         PredictResponse: Prediction probability and binary decision
@@ -193,17 +1185,724 @@ def predict(customer: Customer) -> PredictResponse:
             "churn": true
         }
     """
+    body = await request.body()
+    
+    started = time.perf_counter()
+    data = parse_body(body, request.headers.get("content-type", ""))
+    parsed = time.perf_counter()
+    
     # Convert Pydantic model to dict for pipeline
-    prob = predict_single(customer.model_dump())
+    features = validate_body(Customer, data).model_dump()
+    validated = time.perf_counter()
+    
+    # `model` is pinned for this request: a concurrent reload cannot change it
+    prob = await score_customer(model, features)
+    scored = time.perf_counter()
     
     # Return structured response with both probability and binary decision
-    # Binary decision: churn if probability >= 0.5
-    return PredictResponse(
-        churn_probability=prob,
-        churn=prob >= 0.5
+    # Binary decision: churn if probability >= 0.5 (a PredictResponse,
+    # serialized straight to bytes)
+    response = negotiated_response(request, prediction(prob), model)
+    
+    if shadow is not None and shadow.sample():
+        # Only queued here: the candidate scores it after this response, in
+        # a batch, in its own process
+        shadow.submit(model.version, features, prob)
+    
+    if metrics is not None:
+        metrics.observe_stage('parse', parsed - started)
+        metrics.observe_stage('validate', validated - parsed)
+        metrics.observe_stage('score', scored - validated)
+        metrics.observe_stage('respond', time.perf_counter() - scored)
+    
+    if startup.first_request_seconds is None:
+        report_first_request('/predict')
+    
+    return response
+
+
+@router.get("/predict/by-id/{customer_id}")
+async def predict_by_id(customer_id: str, request: Request, model=Depends(selected_model)) -> PredictResponse:
+    """
+    Churn prediction for a known customer, by ID.
+    
+    The customer's features were encoded offline into the memory-mapped
+    feature store (see featurestore.py), so the request carries no payload:
+    the row is found by binary search over the sorted IDs and scored in
+    place, on the event loop - a few microseconds, with no JSON parsing,
+    no validation and no encoding.
+    
+    Returns:
+        PredictResponse: As for POST /predict, plus an
+            X-Feature-Store-Snapshot header naming the snapshot used
+    
+    Raises:
+        HTTPException 404: If the customer is not in the store
+        HTTPException 409: If the store was built for another feature
+            encoding than the model's (rebuild it with that model)
+        HTTPException 503: If no feature store is loaded
+    
+    Example:
+        GET http://localhost:9696/predict/by-id/7590-VHVEG
+        
+        Response:
+        {"churn_probability": 0.664, "churn": true}
+    """
+    store = feature_store  # Pinned: a refresh cannot swap it mid-request
+    if store is None:
+        raise HTTPException(status_code=503, detail="No feature store loaded (set FEATURE_STORE_PATH)")
+    if not store.fits(model.version, model.engine.model.feature_names):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Feature store {store.header['snapshot']} was built for feature hash "
+                   f"{store.header['feature_hash']}, model {model.name} needs "
+                   f"{matrix.feature_hash(model.engine.model.feature_names)}",
+        )
+    row = store.find(customer_id)
+    if row < 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Customer {customer_id!r} not in feature store {store.header['snapshot']}",
+        )
+    
+    prob = model.engine.model.score_row(store.matrix[row])
+    response = negotiated_response(request, prediction(prob), model)
+    response.headers["X-Feature-Store-Snapshot"] = store.header['snapshot']
+    return response
+
+
+@router.post("/explain")
+async def explain(
+    customer: Customer,
+    model=Depends(selected_model),
+    top_k: int = Query(EXPLAIN_TOP_K, ge=1, description="Features to list"),
+) -> ExplainResponse:
+    """
+    Churn prediction for a customer, with the features that drove it.
+    
+    The model is linear, so every feature's contribution to the logit is
+    one of the products the score is summed from: no SHAP-style sampling,
+    the explanation comes out of the scoring pass itself. Not cached or
+    micro-batched.
+    
+    Args:
+        customer (Customer): Customer data, as for /predict
+        top_k (int): Number of features to list (query parameter)
+        
+    Returns:
+        ExplainResponse: Prediction plus the top_k contributions
+        
+    Example:
+        POST http://localhost:9696/explain?top_k=3
+        
+        Response:
+        {
+            "churn_probability": 0.664,
+            "churn": true,
+            "contributions": [
+                {"feature": "contract=month-to-month", "contribution": 0.487},
+                {"feature": "internetservice=dsl", "contribution": -0.356},
+                {"feature": "paymentmethod=electronic_check", "contribution": 0.273}
+            ]
+        }
+    """
+    probs, features, contributions = await executor.explain(model, [customer.model_dump()], top_k)
+    return json_response(to_json(explanation(probs[0], features[0], contributions[0])), model)
+
+
+@router.post(
+    "/predict/batch",
+    # The body is read by hand (it may be MessagePack or columnar)
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {
+                    "schema": {
+                        "oneOf": [
+                            {
+                                "type": "array",
+                                "items": {"$ref": "#/components/schemas/Customer"},
+                                "title": "Customers",
+                            },
+                            CUSTOMER_COLUMNS_SCHEMA,
+                        ]
+                    }
+                }
+                for media_type in ("application/json", messagepack.MSGPACK)
+            },
+        }
+    },
+)
+async def predict_batch_endpoint(
+    request: Request,
+    model=Depends(selected_model),
+    explain: bool = Query(False, description="Add the top contributing features per customer"),
+    top_k: int = Query(EXPLAIN_TOP_K, ge=1, description="Features to list with explain=true"),
+) -> list[PredictResponse]:
+    """
+    Make churn predictions for a batch of customers.
+    
+    Every customer is validated exactly like in /predict, then the whole
+    batch is scored with one pipeline call. Results come back in the same
+    order as the request, serialized in one call (see negotiated_response).
+    With explain=true, each result is an ExplainResponse instead, computed
+    for the whole batch in the same vectorized pass (see /explain).
+    
+    Like /predict, it takes and returns JSON or MessagePack.
+    
+    The customers may also come as columns: an object with one array per
+    Customer field, so key names are not repeated for every customer. Each
+    column is validated in one call, with the same rules as a Customer, and
+    encoded straight into the feature matrix (see columnar.py). The response is then columnar too:
+    {"churn_probability": [...], "churn": [...]} (plus "contributions").
+    
+    Args:
+        request: Body with up to MAX_BATCH_SIZE customers (list[Customer],
+            or one array per field)
+        explain (bool): Add top_k feature contributions per customer
+        top_k (int): Number of features to list
+        
+    Returns:
+        list[PredictResponse]: One prediction per customer, in request order
+        
+    Raises:
+        HTTPException 413: If the batch is larger than MAX_BATCH_SIZE
+        
+    Example:
+        POST http://localhost:9696/predict/batch
+        
+        Request body:
+        [
+            {"gender": "female", "tenure": 1, ...},
+            {"gender": "male", "tenure": 40, ...}
+        ]
+        
+        Response:
+        [
+            {"churn_probability": 0.847, "churn": true},
+            {"churn_probability": 0.093, "churn": false}
+        ]
+        
+        Columnar request body:
+        {"gender": ["female", "male"], "tenure": [1, 40], ...}
+        
+        Response:
+        {"churn_probability": [0.847, 0.093], "churn": [true, false]}
+    """
+    data = parse_body(await request.body(), request.headers.get("content-type", ""))
+    if isinstance(data, list):
+        check_batch_size(len(data))
+    elif isinstance(data, dict):
+        # Columns: the longest Customer field sets the row count
+        check_batch_size(max(
+            (len(data[field]) for field in Customer.model_fields if isinstance(data.get(field), list)),
+            default=0,
+        ))
+        try:
+            # Whole-column NumPy work: keep it off the event loop
+            results = await run_in_threadpool(_score_columns, model.engine, data, explain, top_k)
+        except columnar.ColumnValidationError as e:
+            raise RequestValidationError(e.errors)
+        return negotiated_response(request, results, model)
+    
+    customers = validate_body(CustomerList, data)
+    
+    features = [c.model_dump() for c in customers]
+    if explain:
+        probs, top_features, contributions = await executor.explain(model, features, top_k)
+        results = [explanation(*row) for row in zip(probs, top_features, contributions)]
+    else:
+        results = [prediction(prob) for prob in await executor.predict(model, features)]
+    return negotiated_response(request, results, model)
+
+
+def _score_columns(engine, data: dict, explain: bool, top_k: int) -> dict:
+    """
+    A columnar /predict/batch body in, columnar results out.
+    
+    Raises:
+        ColumnValidationError: If a column is missing or invalid
+    """
+    columns, n_rows = columnar.dict_columns(data, Customer)
+    if not n_rows:
+        return {"churn_probability": [], "churn": []}
+    
+    X = engine.model.encode_columns(columns, n_rows, dtype=engine.dtype)
+    if not explain:
+        probs = engine.score_matrix(X)
+        return {"churn_probability": probs.tolist(), "churn": (probs >= 0.5).tolist()}
+    
+    probs, features, contributions = engine.model.explain(X, top_k)
+    return {
+        "churn_probability": probs.tolist(),
+        "churn": (probs >= 0.5).tolist(),
+        "contributions": [
+            [{"feature": f, "contribution": c} for f, c in zip(row_features, row_contributions)]
+            for row_features, row_contributions in zip(features, contributions.tolist())
+        ],
+    }
+
+
+async def _never_receive():
+    await anyio.sleep_forever()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that may keep reading the request body while it sends.
+    
+    Starlette's StreamingResponse watches for client disconnects by reading
+    from the request channel, which would steal body chunks from
+    request.stream(). Here that watcher is given a channel that never
+    delivers a message; everything else (background tasks, error handling)
+    is Starlette's own.
+    
+    Given up: on servers older than ASGI 2.4, Starlette stops the response
+    as soon as the client disconnects. Here a disconnect surfaces from
+    request.stream() while the body is still being read, and after that
+    only when sending the next chunk fails.
+    
+    Args:
+        on_finish: Called once the response is over, sent or not
+    """
+    def __init__(self, content, status_code: int = 200, headers=None, media_type=None,
+                 background=None, on_finish=None):
+        super().__init__(content, status_code, headers, media_type, background)
+        self.on_finish = on_finish
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, _never_receive, send)
+        finally:
+            if self.on_finish is not None:
+                self.on_finish()
+
+
+async def _ndjson_lines(request: Request):
+    """
+    Yield complete lines from the request body as they arrive.
+    
+    A line longer than STREAM_MAX_LINE_BYTES is yielded as None and the rest
+    of it is skipped, so the buffer never holds more than one line's worth.
+    """
+    buffer = b''
+    skipping = False  # Inside an overlong line, up to its newline
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if skipping:
+                skipping = False  # The end of the overlong line
+                continue
+            yield line if len(line) <= STREAM_MAX_LINE_BYTES else None
+        if len(buffer) > STREAM_MAX_LINE_BYTES:
+            if not skipping:
+                yield None
+                skipping = True
+            buffer = b''
+    if buffer and not skipping:
+        yield buffer
+
+
+async def _score_ndjson(request: Request, model):
+    """
+    Validate and score NDJSON customers chunk by chunk, yielding NDJSON
+    results in input order. The whole stream is scored with `model`.
+    """
+    async def flush(chunk):
+        # chunk: [(line_no, features or None, errors or None), ...]
+        valid = [features for _, features, _ in chunk if features is not None]
+        probs = iter(await executor.predict(model, valid))
+        
+        out = []
+        for line_no, features, errors in chunk:
+            if features is None:
+                out.append({"line": line_no, "error": errors})
+            else:
+                prob = next(probs)
+                out.append({"line": line_no, "churn_probability": prob, "churn": prob >= 0.5})
+        return b''.join(to_json(item, fallback=str) + b'\n' for item in out)
+    
+    chunk = []
+    line_no = 0
+    async for line in _ndjson_lines(request):
+        line_no += 1
+        if line is None:
+            chunk.append((line_no, None, [{
+                "type": "too_long", "loc": [],
+                "msg": f"Line exceeds STREAM_MAX_LINE_BYTES={STREAM_MAX_LINE_BYTES}",
+            }]))
+        elif not line.strip():
+            continue
+        else:
+            try:
+                features = Customer.model_validate_json(line).model_dump()
+                chunk.append((line_no, features, None))
+            except ValidationError as e:
+                # Report the bad row inline and keep going. The input is left
+                # out: it may be bytes that are not valid UTF-8, and cannot
+                # be echoed back as JSON
+                chunk.append((line_no, None, e.errors(include_url=False, include_input=False)))
+        
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield await flush(chunk)
+            chunk = []
+    
+    if chunk:
+        yield await flush(chunk)
+
+
+@router.post(
+    "/predict/stream",
+    response_class=DuplexStreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"$ref": "#/components/schemas/Customer"}}
+            },
+        }
+    },
+)
+async def predict_stream(request: Request, model=Depends(selected_model)):
+    """
+    Score newline-delimited JSON customers as a stream.
+    
+    The request body is read incrementally; every STREAM_CHUNK_SIZE lines are
+    scored together and their results are streamed back immediately, so
+    neither the request nor the response is ever held in memory in full.
+    
+    Each output line carries the 1-based input line number. Lines that fail
+    validation produce an error entry instead of aborting the stream.
+    
+    Example:
+        curl -X POST http://localhost:9696/predict/stream \\
+            -H "Content-Type: application/x-ndjson" \\
+            --data-binary @customers.ndjson
+        
+        Response (application/x-ndjson):
+        {"line": 1, "churn_probability": 0.847, "churn": true}
+        {"line": 2, "error": [{"type": "literal_error", "loc": ["gender"], ...}]}
+        {"line": 3, "churn_probability": 0.093, "churn": false}
+    """
+    on_finish = None
+    if getattr(request.state, 'admission_slot', False):
+        # Keep the admission slot until every line is scored and sent
+        request.state.admission_slot = False
+        on_finish = admission.release
+    return DuplexStreamingResponse(
+        _score_ndjson(request, model),
+        media_type="application/x-ndjson",
+        headers=model_headers(model),
+        on_finish=on_finish,
+    )
+
+
+def _score_table(engine, body: bytes, content_type: str) -> bytes:
+    """
+    Arrow IPC / Parquet bytes in, churn_probability column bytes out.
+    """
+    table = columnar.read_table(body, content_type, max_rows=MAX_BATCH_SIZE)
+    columns = columnar.table_columns(table, CATEGORICAL_DOMAINS, NUMERIC_FIELDS)
+    X = engine.model.encode_columns(columns, table.num_rows, dtype=engine.dtype)
+    probs = engine.score_matrix(X)
+    return columnar.write_probabilities(probs, content_type)
+
+
+@router.post(
+    "/predict/bulk",
+    response_class=Response,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                columnar.ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+                columnar.PARQUET: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def predict_bulk(request: Request, model=Depends(selected_model)):
+    """
+    Score a columnar table of customers: Arrow IPC stream or Parquet file.
+    
+    The table must have one column per Customer field and at most
+    MAX_BATCH_SIZE rows. Columns are validated as a whole and encoded
+    straight into the feature matrix - no per-row dicts. The response has
+    the same format as the request, with a single churn_probability column
+    in row order.
+    
+    Requires pyarrow (uv sync --extra arrow).
+    
+    Raises:
+        HTTPException 415: Content-Type is not Arrow IPC stream or Parquet
+        HTTPException 400: The body cannot be parsed
+        HTTPException 413: The table has more than MAX_BATCH_SIZE rows
+        HTTPException 422: Columns are missing or violate the Customer schema
+        HTTPException 501: pyarrow is not installed
+    
+    Example:
+        curl -X POST http://localhost:9696/predict/bulk \\
+            -H "Content-Type: application/vnd.apache.parquet" \\
+            --data-binary @customers.parquet -o predictions.parquet
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type not in columnar.FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be one of {list(columnar.FORMATS)}"
+        )
+    
+    body = await request.body()
+    try:
+        # Parsing and encoding are CPU work: keep them off the event loop
+        content = await run_in_threadpool(_score_table, model.engine, body, content_type)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyarrow is not installed: uv sync --extra arrow")
+    except columnar.ColumnValidationError as e:
+        raise RequestValidationError(e.errors)
+    except columnar.TooManyRows as e:
+        raise batch_too_large(e.rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return Response(content=content, media_type=content_type, headers=model_headers(model))
+
+
+def _score_raw_matrix(engine, body: bytes, shape: tuple, dtype: str, expected_hash: str | None) -> bytes:
+    """
+    Raw matrix bytes in, churn probability bytes out.
+    """
+    X = matrix.read_matrix(body, shape, dtype, engine.model.feature_names, expected_hash)
+    if not len(X):
+        return b""
+    return matrix.write_probabilities(engine.score_matrix(X))
+
+
+@router.post(
+    "/predict/matrix",
+    response_class=Response,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {matrix.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def predict_matrix(
+    request: Request,
+    model=Depends(selected_model),
+    x_matrix_shape: str = Header(..., description="rows,columns"),
+    x_matrix_dtype: Literal["float32", "float64"] = Header("float64"),
+    x_feature_hash: str | None = Header(None, description="feature_hash from GET /schema"),
+):
+    """
+    Score a pre-encoded feature matrix: raw little-endian floats.
+    
+    For upstream jobs that already hold customers as numeric arrays, one
+    column per model feature in the order published by GET /schema. The
+    body is wrapped in a NumPy array without copying and scored directly:
+    no JSON, no per-row parsing or encoding.
+    
+    Headers:
+        X-Matrix-Shape: rows,columns (columns must match the model, rows
+            at most MAX_BATCH_SIZE)
+        X-Matrix-Dtype: float32 or float64 (default)
+        X-Feature-Hash: Optional; rejects the matrix if the model's feature
+            order is not the one the caller encoded for
+    
+    Returns:
+        Response: rows little-endian float64 churn probabilities, in row
+                  order (X-Matrix-Shape: rows)
+    
+    Raises:
+        HTTPException 415: Content-Type is not application/octet-stream
+        HTTPException 400: Bad shape header, or the body length does not
+            match the shape
+        HTTPException 413: More than MAX_BATCH_SIZE rows
+        HTTPException 422: Wrong column count or feature hash, or values
+            that are NaN or infinite
+    
+    Example:
+        X.astype('<f4').tofile('customers.bin')
+        curl -X POST http://localhost:9696/predict/matrix \
+            -H "Content-Type: application/octet-stream" \
+            -H "X-Matrix-Shape: 1000,45" -H "X-Matrix-Dtype: float32" \
+            --data-binary @customers.bin -o probabilities.bin
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type != matrix.OCTET_STREAM:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {matrix.OCTET_STREAM}")
+    try:
+        shape = matrix.parse_shape(x_matrix_shape)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    check_batch_size(shape[0])  # Before the body is even read
+    
+    body = await request.body()
+    try:
+        # A large matrix takes a while to check and score: keep it off the event loop
+        content = await run_in_threadpool(
+            _score_raw_matrix, model.engine, body, shape, x_matrix_dtype, x_feature_hash
+        )
+    except matrix.MatrixValidationError as e:
+        raise RequestValidationError(e.errors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return Response(
+        content=content,
+        media_type=matrix.OCTET_STREAM,
+        headers={**model_headers(model), "X-Matrix-Shape": str(shape[0])},
     )
 
 
+@router.get("/schema")
+async def schema(model=Depends(selected_model)):
+    """
+    The feature matrix a model expects, for POST /predict/matrix.
+    
+    Returns:
+        dict: Model name and version, the feature names in column order,
+              their feature_hash, and the accepted element types
+    
+    Example:
+        GET http://localhost:9696/schema
+        
+        Response:
+        {"model": "model", "version": "ac49bce3d43f", "n_features": 45,
+         "feature_names": ["contract=month-to-month", ..., "totalcharges"],
+         "feature_hash": "5f0c7e2ab1d94c3e", "dtypes": ["float32", "float64"],
+         "byte_order": "little"}
+    """
+    feature_names = model.engine.model.feature_names
+    return {
+        "model": model.name,
+        "version": model.version,
+        "n_features": len(feature_names),
+        "feature_names": feature_names,
+        "feature_hash": matrix.feature_hash(feature_names),
+        "dtypes": list(matrix.DTYPES),
+        "byte_order": "little",
+    }
+
+
+# The prediction endpoints are served twice: as /predict... for the default
+# model (or the one named in X-Model), and as /models/{model_name}/predict...
+app.include_router(router)
+app.include_router(router, prefix="/models/{model_name}", dependencies=[Depends(model_name_path)])
+
+
+@app.get("/models")
+async def models():
+    """
+    Loaded model versions.
+    
+    Returns:
+        dict: The default version name, and per version its file, content
+              hash, engine, load time and approximate memory retained
+    
+    Example:
+        GET http://localhost:9696/models
+        
+        Response:
+        {"default": "model_C=1.0",
+         "versions": {"model_C=0.1": {"version": "5c0e...", "memory_bytes": 41213, ...},
+                      "model_C=1.0": {"version": "ac49...", "memory_bytes": 41197, ...}}}
+    """
+    await wait_until_loaded()
+    return registry.describe()
+
+
+@app.post("/admin/reload")
+async def reload_model(response: Response, x_admin_token: str | None = Header(default=None)):
+    """
+    Load the model files again and swap them in without restarting.
+    
+    Steps:
+    1. Read, unpickle and build every engine in a worker thread (MODEL_PATH,
+       or every file of MODEL_DIR - including new ones), so requests keep
+       being served by the current models meanwhile
+    2. Warm each one up with synthetic customers (fails the reload if one
+       does not return valid probabilities)
+    3. Load them in the process-pool workers, if that strategy is used, and
+       run the warm-up through the whole prediction path (see /ready)
+    4. Replace the registry: requests that already started finish on the
+       old models, new requests get the new ones. Nothing is dropped.
+    
+    Cached predictions are stored per model version; those of versions that
+    are gone are dropped.
+    
+    Returns:
+        dict: Model versions before and after, by name, and the reload time.
+              The response also carries the default model's X-Model-Name and
+              X-Model-Version, and X-Model-Reload-Seconds headers.
+    
+    Raises:
+        HTTPException 403: ADMIN_TOKEN is set and X-Admin-Token differs
+        HTTPException 500: A model failed to load or warm up; the previous
+                           models keep serving
+    
+    Example:
+        # After retraining and copying the new model.bin in place
+        curl -X POST http://localhost:9696/admin/reload
+        
+        Response:
+        {"previous": {"model": "3f2a9c1e0b7d"}, "versions": {"model": "8d41e07a5c22"},
+         "changed": ["model"], "default": "model", "reload_seconds": 0.027}
+    """
+    global registry, reload_count
+    
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid X-Admin-Token")
+    
+    await wait_until_loaded()
+    async with reload_lock:
+        started = time.perf_counter()
+        try:
+            new_registry = await run_in_threadpool(build_registry)
+            for model in new_registry.models.values():
+                await executor.prepare(model)
+            await warm_up_service(list(new_registry.models.values()))
+            observe_stages(new_registry.models.values())
+        except Exception as e:
+            # Whatever went wrong (missing file, bad pickle, broken model),
+            # keep serving the models we have
+            raise HTTPException(
+                status_code=500,
+                detail=f"Reload failed, still serving {sorted(registry.models)}: {e!r}",
+            )
+        
+        # The swap itself: a single assignment on the event loop thread
+        previous, registry = registry, new_registry
+        reload_count += 1
+        reload_seconds = time.perf_counter() - started
+    
+    if cache is not None:
+        cache.retain(model.version for model in registry.models.values())
+    
+    before = {name: model.version for name, model in previous.models.items()}
+    after = {name: model.version for name, model in registry.models.items()}
+    changed = sorted(name for name in after if before.get(name) != after[name])
+    print(f"✓ Models reloaded in {reload_seconds:.3f}s, changed: {changed}")
+    
+    response.headers.update(model_headers(registry.get()))
+    response.headers["X-Model-Reload-Seconds"] = f"{reload_seconds:.4f}"
+    return {
+        "previous": before,
+        "versions": after,
+        "changed": changed,
+        "default": registry.default,
+        "reload_seconds": reload_seconds,
+    }
+
+
+# Building the Pydantic models, the app and its routes: everything this
+# module did apart from the timed imports
+startup.stages['app'] = startup.since_start() - sum(startup.imports.values())
+
+
 # ============================================================================
 # MAIN EXECUTION
 # ============================================================================
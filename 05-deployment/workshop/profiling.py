@@ -0,0 +1,124 @@
+"""
+Startup Profiling
+
+Where does the time go between starting the container and the first
+successful /predict? StartupProfile records it in one place:
+
+- imports:  seconds spent importing each heavy library (fastapi, pydantic,
+            numpy, sklearn, ...), timed one at a time
+- stages:   seconds spent in each startup step (building the app, loading
+            and warming up the models, starting the executor)
+- first_request: when the first prediction was answered, counted from the
+            start of predict.py and from the start of the process
+
+This module only uses the standard library, so it can be imported first and
+time everything else.
+
+Usage:
+    startup = StartupProfile()
+    startup.import_modules('fastapi', 'fastapi')
+    with startup.stage('model_load'):
+        ...
+    startup.first_request('/predict')
+    print(json.dumps(startup.report()))
+"""
+
+import importlib  # Timed imports
+import os  # Clock ticks per second
+import sys  # Already imported modules
+import time  # Timing
+from contextlib import contextmanager  # stage()
+
+
+def process_age() -> float | None:
+    """
+    Seconds since this process started (Linux only, else None).
+
+    Covers what happens before any Python code of ours runs: interpreter
+    start-up and the server importing the app.
+    """
+    try:
+        with open('/proc/self/stat') as f_in:
+            # Field 22 (starttime, in clock ticks since boot) - counted
+            # after the ')' closing the process name, which may contain spaces
+            start_ticks = int(f_in.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f_in:
+            uptime = float(f_in.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupProfile:
+    """
+    Timings of one process start-up.
+
+    Args:
+        started (float): time.perf_counter() when timing began; defaults to now
+    """
+
+    def __init__(self, started: float | None = None):
+        self.started = time.perf_counter() if started is None else started
+        self.process_age_at_start = process_age()
+        self.imports = {}
+        self.stages = {}
+        self.first_request_path = None
+        self.first_request_seconds = None
+
+    def import_modules(self, label: str, *modules: str):
+        """
+        Import modules under a timer, recorded as `label`.
+
+        Modules that are already imported cost nothing, so import libraries
+        before the ones that depend on them (pydantic before fastapi) to get
+        each library's own share.
+        """
+        started = time.perf_counter()
+        for name in modules:
+            if name not in sys.modules:
+                importlib.import_module(name)
+        self.imports[label] = self.imports.get(label, 0.0) + time.perf_counter() - started
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a block of start-up work.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def since_start(self) -> float:
+        return time.perf_counter() - self.started
+
+    def first_request(self, path: str) -> bool:
+        """
+        Record the first answered prediction. Returns True only the first time.
+        """
+        if self.first_request_seconds is not None:
+            return False
+        self.first_request_path = path
+        self.first_request_seconds = self.since_start()
+        return True
+
+    def report(self) -> dict:
+        """
+        Everything recorded so far, in seconds.
+        """
+        before = self.process_age_at_start
+        return {
+            'process_start_to_app_import': before,
+            'imports': dict(self.imports),
+            'stages': dict(self.stages),
+            'first_request': {
+                'path': self.first_request_path,
+                'since_app_import': self.first_request_seconds,
+                'since_process_start': (
+                    before + self.first_request_seconds
+                    if before is not None and self.first_request_seconds is not None
+                    else None
+                ),
+            },
+        }
@@ -0,0 +1,147 @@
+"""
+Model Registry: Several Model Versions in One Process
+
+train.py can produce several variants of the churn model (e.g. one per
+regularization strength C: model_C=0.1.bin, model_C=1.0.bin, ...). Running a
+container per variant wastes memory and cold starts; instead one service can
+load all of them and let each request pick one:
+
+- versions:  every file matching a pattern in a directory, named after the
+             file without its extension ('model_C=0.1')
+- default:   an alias for the version used when the request names none
+- memory:    each version reports roughly how many bytes loading it retained
+             (measured with tracemalloc while it was loaded)
+
+A registry is never modified once built: a reload builds a new one and
+replaces the reference, so a request that already picked its LoadedModel is
+never affected.
+
+Usage:
+    registry = ModelRegistry.from_directory('models', 'model*.bin', loader, default='model_C=1.0')
+    model = registry.get('model_C=0.1')   # or registry.get() for the default
+"""
+
+import glob  # Finding model files
+import os  # Paths
+import tracemalloc  # Measuring memory retained per model
+
+
+def measure_load(loader, path: str):
+    """
+    Call loader(path) and measure the memory it leaves allocated.
+
+    Returns:
+        (model, bytes): What the loader returned, and the growth of traced
+            Python/NumPy memory. Approximate: allocations made by other
+            threads at the same time are counted too.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        model = loader(path)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return model, max(retained, 0)
+
+
+class UnknownModelError(KeyError):
+    """
+    Raised when a request names a version that is not loaded.
+    """
+
+
+class ModelRegistry:
+    """
+    Named LoadedModels (see scoring.py) plus a default alias.
+
+    Args:
+        models (dict): Version name → LoadedModel
+        default (str): Name used when a request does not choose a version
+        memory (dict): Version name → bytes retained by loading it
+
+    Raises:
+        ValueError: If there are no models or the default is not one of them
+    """
+
+    def __init__(self, models: dict, default: str, memory: dict | None = None):
+        if not models:
+            raise ValueError("No model versions to serve")
+        if default not in models:
+            raise ValueError(f"Default model {default!r} not in {sorted(models)}")
+        self.models = models
+        self.default = default
+        self.memory = memory or {}
+
+    @classmethod
+    def from_paths(cls, paths: list[str], loader, default: str | None = None):
+        """
+        Load every path with loader(path) → LoadedModel.
+
+        The default is `default` if given, else the first name in sorted order.
+        The name 'default' itself is reserved as the alias.
+
+        Every path is loaded once. Import the modules the loader needs (e.g.
+        sklearn) beforehand, or the first version's memory figure includes
+        them; it still includes the caches its first load fills (a few
+        hundred KB at most).
+
+        Raises:
+            ValueError: If two files load under the same name (e.g.
+                model.bin and model.json are both 'model')
+        """
+        paths = sorted(paths)
+        models, memory, sources = {}, {}, {}
+        for path in paths:
+            model, retained = measure_load(loader, path)
+            if model.name in sources:
+                raise ValueError(
+                    f"{sources[model.name]!r} and {path!r} are both model {model.name!r}: "
+                    f"serve only one of them"
+                )
+            sources[model.name] = path
+            models[model.name] = model
+            memory[model.name] = retained
+        return cls(models, default or next(iter(models), None), memory)
+
+    @classmethod
+    def from_directory(cls, directory: str, pattern: str, loader, default: str | None = None):
+        """
+        Load every file in `directory` matching the glob `pattern`.
+        """
+        paths = glob.glob(os.path.join(directory, pattern))
+        if not paths:
+            raise ValueError(f"No model files matching {pattern!r} in {directory!r}")
+        return cls.from_paths(paths, loader, default)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def get(self, name: str | None = None):
+        """
+        The LoadedModel for a version name or alias; the default if None.
+
+        Raises:
+            UnknownModelError: If no such version is loaded
+        """
+        if name is None or name == 'default':
+            name = self.default
+        try:
+            return self.models[name]
+        except KeyError:
+            raise UnknownModelError(name) from None
+
+    def describe(self) -> dict:
+        """
+        Loaded versions with their file, engine and memory use.
+        """
+        return {
+            'default': self.default,
+            'versions': {
+                name: {**model.info(), 'memory_bytes': self.memory.get(name)}
+                for name, model in self.models.items()
+            },
+        }
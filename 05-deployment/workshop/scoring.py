@@ -0,0 +1,665 @@
+"""
+Scoring Engines for Churn Prediction
+
+The trained model is a DictVectorizer + LogisticRegression pipeline, i.e. a
+linear model over 45 one-hot/numeric features. This module provides
+interchangeable "engines" that turn customer dicts into churn probabilities:
+
+- sklearn:  pipeline.predict_proba() - the reference implementation
+- compiled: vocabulary, coefficients and intercept are extracted from the
+            pipeline once, then scored with a plain dot product + sigmoid
+- compiled32: compiled, but batches are encoded into a reused float32
+            buffer and scored in float32 (see FLOAT32_TOLERANCE)
+- table:    every (categorical field, value) pair has a fixed logit
+            contribution, so it is precomputed; scoring is table lookups
+            plus a short dot product over the numeric fields
+
+All engines expose the same interface:
+    engine.predict_one(customer)  → float
+    engine.predict(customers)     → np.ndarray of probabilities
+    engine.score_matrix(X)        → np.ndarray of probabilities for a
+                                    matrix from model.encode_columns()
+    engine.dtype                  → float type score_matrix() expects
+    engine.explain(customers, k)  → probabilities plus the k features with
+                                    the largest logit contributions
+
+Engines that encode customers into a feature matrix before scoring it
+(sklearn always, compiled for batches) can report how long each half took:
+set engine.observe to a callable(stage, seconds) and it is called with
+'transform' and 'predict_proba' on every prediction (see metrics.py).
+
+Usage:
+    from scoring import load_engine
+    engine = load_engine(pipeline, 'compiled')
+    engine.predict_one({'gender': 'female', 'tenure': 1, ...})
+
+    # Or straight from a model file, with its version and load time
+    model = load_model('model.bin', 'compiled')
+    model.engine.predict_one(...)
+
+    # Or from the sklearn-free artifact written by train.py (model.json +
+    # model.npz): only NumPy is needed, scikit-learn is never imported
+    model = load_model('model.json', 'table', domains=...)
+"""
+
+import hashlib  # For fingerprinting model files
+import io  # For reading .npz artifacts from memory
+import json  # For artifact manifests
+import math  # For the scalar sigmoid in the single-row fast path
+import os  # For naming models after their file
+import pickle  # For loading serialized pipelines
+import threading  # Per-thread feature buffers
+import time  # For timing model loads
+
+import numpy as np  # Vectorized scoring
+
+
+# DictVectorizer joins categorical field and value with this separator:
+# {'contract': 'one_year'} → feature 'contract=one_year'
+SEPARATOR = '='
+
+# Identifies the sklearn-free artifact layout (LinearModel.save_artifact).
+# Bump ARTIFACT_VERSION whenever the layout changes incompatibly.
+ARTIFACT_FORMAT = 'churn-linear-model'
+ARTIFACT_VERSION = 1
+
+# Largest difference between a float32 and a float64 churn probability for
+# the same customer. Checked over the whole of data-week-3.csv by
+# `python benchmark.py float32`.
+FLOAT32_TOLERANCE = 1e-6
+
+
+def sigmoid(z):
+    """
+    Logistic function for NumPy arrays, as used by LogisticRegression.
+
+    Written as exp(-logaddexp(0, -z)) so large |z| never overflows.
+    """
+    return np.exp(-np.logaddexp(0.0, -z))
+
+
+def _sigmoid_scalar(z: float) -> float:
+    """
+    Numerically stable logistic function for a single Python float.
+    """
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+class LinearModel:
+    """
+    Parameters of a fitted DictVectorizer + LogisticRegression pipeline.
+
+    Attributes:
+        feature_names (list[str]): Column order of the feature matrix
+        vocabulary (dict[str, int]): Feature name → column index
+        coef (np.ndarray): Weight per column, shape (n_features,)
+        intercept (float): Bias term of the logit
+    """
+
+    def __init__(self, feature_names, coef, intercept):
+        self.feature_names = list(feature_names)
+        self.vocabulary = {name: i for i, name in enumerate(self.feature_names)}
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        # For looking up the names of many columns at once
+        self._names = np.array(self.feature_names, dtype=object)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Extract the linear model from a fitted sklearn pipeline.
+
+        Args:
+            pipeline: make_pipeline(DictVectorizer(), LogisticRegression())
+        """
+        dv = pipeline.steps[0][1]
+        model = pipeline.steps[-1][1]
+        return cls(dv.feature_names_, model.coef_[0], model.intercept_[0])
+
+    def save_artifact(self, prefix: str, metadata: dict | None = None) -> str:
+        """
+        Write the model as <prefix>.npz (arrays) + <prefix>.json (manifest).
+
+        The .npz holds plain arrays only (no pickled objects), so loading it
+        needs NumPy and nothing else. The manifest records the format
+        version and the SHA-256 of the .npz, which load_artifact() checks.
+
+        Args:
+            prefix (str): Output path without extension, e.g. 'model'
+            metadata (dict): Extra manifest entries (library versions, ...)
+
+        Returns:
+            str: Path of the manifest, the file to serve with MODEL_PATH
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            feature_names=np.array(self.feature_names, dtype=str),
+            coef=self.coef,
+            intercept=np.array([self.intercept]),
+        )
+        data = buffer.getvalue()
+
+        npz_path, manifest_path = f'{prefix}.npz', f'{prefix}.json'
+        with open(npz_path, 'wb') as f_out:
+            f_out.write(data)
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_VERSION,
+            'arrays': os.path.basename(npz_path),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'n_features': self.n_features,
+            **(metadata or {}),
+        }
+        with open(manifest_path, 'w') as f_out:
+            json.dump(manifest, f_out, indent=2)
+            f_out.write('\n')
+        return manifest_path
+
+    @classmethod
+    def load_artifact(cls, manifest_path: str) -> tuple['LinearModel', str]:
+        """
+        Read an artifact written by save_artifact().
+
+        Returns:
+            (LinearModel, str): The model and the SHA-256 of its arrays
+
+        Raises:
+            ValueError: Unknown format or version, or the arrays do not match
+                the checksum in the manifest
+        """
+        with open(manifest_path) as f_in:
+            manifest = json.load(f_in)
+
+        found = (manifest.get('format'), manifest.get('format_version'))
+        if found != (ARTIFACT_FORMAT, ARTIFACT_VERSION):
+            raise ValueError(
+                f"{manifest_path} is {found}, expected {(ARTIFACT_FORMAT, ARTIFACT_VERSION)}"
+            )
+
+        npz_path = os.path.join(os.path.dirname(manifest_path), manifest['arrays'])
+        with open(npz_path, 'rb') as f_in:
+            data = f_in.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != manifest['sha256']:
+            raise ValueError(f"{npz_path} does not match the checksum in {manifest_path}")
+
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            model = cls(arrays['feature_names'].tolist(), arrays['coef'], arrays['intercept'][0])
+        return model, digest
+
+    def score_row(self, x: np.ndarray) -> float:
+        """
+        Churn probability of one encoded row (e.g. a view into a
+        memory-mapped matrix): a dot product and a scalar sigmoid, no
+        intermediate arrays.
+        """
+        return _sigmoid_scalar(float(np.dot(x, self.coef)) + self.intercept)
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    def explain(self, X: np.ndarray, top_k: int) -> tuple[np.ndarray, list, np.ndarray]:
+        """
+        Churn probabilities of a feature matrix, with each row's top_k
+        features by absolute logit contribution.
+
+        The logit of a linear model is intercept + Σ x_j * w_j, so the
+        contributions x_j * w_j are the same products the score is summed
+        from: explaining a batch costs one (n, n_features) multiply plus a
+        partial sort per row, all vectorized.
+
+        Args:
+            X (np.ndarray): Feature matrix, shape (n, n_features)
+            top_k (int): Features to keep per row (capped at n_features)
+
+        Returns:
+            (np.ndarray, list, np.ndarray): Probabilities, shape (n,); feature
+                names, n lists of top_k; their contributions, shape
+                (n, top_k), largest |contribution| first. A positive
+                contribution pushes the customer towards churn.
+        """
+        contributions = X * self.coef
+        probs = sigmoid(contributions.sum(axis=1) + self.intercept)
+
+        k = min(top_k, self.n_features)
+        magnitude = np.abs(contributions)
+        # The k largest per row, in no particular order...
+        top = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+        # ...then sorted, largest first
+        order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        return probs, self._names[top].tolist(), np.take_along_axis(contributions, top, axis=1)
+
+    def encode_columns(self, columns: dict, n_rows: int, dtype=np.float64) -> np.ndarray:
+        """
+        Encode whole columns into a dense (n_rows, n_features) feature matrix,
+        without building a dict per row.
+
+        Args:
+            columns (dict): Field name → either
+                - np.ndarray of numbers (numeric fields), or
+                - (codes, categories): dictionary-encoded values, where
+                  categories[codes[i]] is the value of row i
+            n_rows (int): Number of rows
+            dtype: Float type of the matrix
+
+        Same encoding as DictVectorizer: string categories become one-hot
+        'field=value' columns, numeric categories and arrays go to 'field'.
+        """
+        vocabulary = self.vocabulary
+        X = np.zeros((n_rows, self.n_features), dtype=dtype)
+        rows = np.arange(n_rows)
+
+        for field, column in columns.items():
+            if not isinstance(column, tuple):
+                col = vocabulary.get(field)
+                if col is not None:
+                    X[:, col] = column
+                continue
+
+            codes, categories = column
+            if all(isinstance(value, str) for value in categories):
+                # Column index of each category; -1 for values unseen in training
+                targets = np.array(
+                    [vocabulary.get(f'{field}{SEPARATOR}{value}', -1) for value in categories],
+                    dtype=np.intp,
+                )
+                cols = targets[codes]
+                known = cols >= 0
+                X[rows[known], cols[known]] = 1.0
+            else:
+                col = vocabulary.get(field)
+                if col is not None:
+                    X[:, col] = np.asarray(categories, dtype=dtype)[codes]
+        return X
+
+
+class SklearnEngine:
+    """
+    Reference engine: delegates everything to the sklearn pipeline.
+    """
+    name = 'sklearn'
+    dtype = np.float64
+    observe = None  # Optional callable(stage, seconds)
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.model = LinearModel.from_pipeline(pipeline)
+
+    def _predict_proba(self, customers) -> np.ndarray:
+        """
+        pipeline.predict_proba(), one step at a time when stages are observed.
+        """
+        observe = self.observe
+        if observe is None:
+            return self.pipeline.predict_proba(customers)
+
+        started = time.perf_counter()
+        X = self.pipeline.steps[0][1].transform(customers)
+        transformed = time.perf_counter()
+        probs = self.pipeline.steps[-1][1].predict_proba(X)
+        observe('transform', transformed - started)
+        observe('predict_proba', time.perf_counter() - transformed)
+        return probs
+
+    def predict_one(self, customer: dict) -> float:
+        # Shape: (1, 2) → [[prob_no_churn, prob_churn]]
+        return float(self._predict_proba(customer)[0, 1])
+
+    def predict(self, customers: list[dict]) -> np.ndarray:
+        # Shape: (n, 2) → churn column for every row
+        return self._predict_proba(customers)[:, 1]
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """
+        Churn probabilities for an already encoded feature matrix, using the
+        pipeline's own LogisticRegression.
+        """
+        return self.pipeline.steps[-1][1].predict_proba(X)[:, 1]
+
+    def explain(self, customers: list[dict], top_k: int):
+        """
+        See LinearModel.explain(); encoded by the pipeline's DictVectorizer.
+        """
+        X = self.pipeline.steps[0][1].transform(customers)
+        if hasattr(X, 'toarray'):
+            X = X.toarray()  # DictVectorizer returns a sparse matrix by default
+        return self.model.explain(X, top_k)
+
+
+class CompiledEngine:
+    """
+    Dot-product engine: no DictVectorizer, no sparse matrices, no sklearn
+    input validation at request time.
+
+    Encoding follows DictVectorizer exactly:
+    - string values become one-hot columns named 'field=value'
+    - numeric values go to the column named 'field'
+    - features not seen during training are ignored
+    """
+    name = 'compiled'
+    dtype = np.float64
+    observe = None  # Optional callable(stage, seconds), batches only
+
+    def __init__(self, model: LinearModel):
+        self.model = model
+        # Plain Python floats for the single-row loop: a dict lookup is much
+        # cheaper than indexing a NumPy array element by element
+        self._weights = {
+            name: float(w) for name, w in zip(model.feature_names, model.coef)
+        }
+
+    def transform(self, customers: list[dict], out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Encode customers into a dense (n, n_features) feature matrix.
+
+        Args:
+            customers (list[dict]): Customers to encode
+            out (np.ndarray): Matrix of shape (n, n_features) to overwrite
+                instead of allocating a new one; its dtype is kept
+        """
+        vocabulary = self.model.vocabulary
+        if out is None:
+            X = np.zeros((len(customers), self.model.n_features))
+        else:
+            X = out
+            X.fill(0.0)
+        for row, customer in enumerate(customers):
+            for field, value in customer.items():
+                if isinstance(value, str):
+                    col = vocabulary.get(f'{field}{SEPARATOR}{value}')
+                    value = 1.0
+                else:
+                    col = vocabulary.get(field)
+                if col is not None:
+                    X[row, col] = value
+        return X
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """
+        Churn probabilities for an already encoded feature matrix.
+        """
+        return sigmoid(X @ self.model.coef + self.model.intercept)
+
+    def _logit(self, customer: dict) -> float:
+        weights = self._weights
+        z = self.model.intercept
+        for field, value in customer.items():
+            if isinstance(value, str):
+                z += weights.get(f'{field}{SEPARATOR}{value}', 0.0)
+            else:
+                z += weights.get(field, 0.0) * value
+        return z
+
+    def predict_one(self, customer: dict) -> float:
+        return _sigmoid_scalar(self._logit(customer))
+
+    def explain(self, customers: list[dict], top_k: int):
+        """
+        See LinearModel.explain().
+        """
+        return self.model.explain(self.transform(customers), top_k)
+
+    def predict(self, customers: list[dict]) -> np.ndarray:
+        if not customers:
+            return np.empty(0)
+        observe = self.observe
+        if observe is None:
+            return self.score_matrix(self.transform(customers))
+
+        started = time.perf_counter()
+        X = self.transform(customers)
+        transformed = time.perf_counter()
+        probs = self.score_matrix(X)
+        observe('transform', transformed - started)
+        observe('predict_proba', time.perf_counter() - transformed)
+        return probs
+
+
+class Float32Engine(CompiledEngine):
+    """
+    Compiled engine that scores batches in float32.
+
+    A batch spends its time writing and reading the feature matrix, and
+    float64 doubles that traffic without making a churn probability any
+    more useful. Batches are encoded CHUNK_ROWS customers at a time into one
+    contiguous float32 buffer, allocated once per thread and reused for
+    every chunk of every batch (so concurrent requests never share one).
+    The dot product runs in float32; the intercept and the sigmoid in
+    float64.
+
+    Single customers keep the float64 scalar path of CompiledEngine.
+    Probabilities agree with the float64 pipeline within FLOAT32_TOLERANCE.
+    """
+    name = 'compiled32'
+    dtype = np.float32
+
+    # 1024 rows x 45 features x 4 bytes = 180 KB: the buffer stays in cache
+    CHUNK_ROWS = 1024
+
+    def __init__(self, model: LinearModel):
+        super().__init__(model)
+        self._coef = model.coef.astype(np.float32)
+        self._local = threading.local()
+
+    def _buffer(self) -> np.ndarray:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = np.zeros((self.CHUNK_ROWS, self.model.n_features), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer
+
+    def score_matrix(self, X: np.ndarray) -> np.ndarray:
+        """
+        Churn probabilities for an already encoded feature matrix.
+        """
+        logits = (X @ self._coef).astype(np.float64)
+        return sigmoid(logits + self.model.intercept)
+
+    def predict(self, customers: list[dict]) -> np.ndarray:
+        n = len(customers)
+        buffer = self._buffer()
+        logits = np.empty(n)
+        transform_seconds = 0.0
+        started = time.perf_counter()
+        for start in range(0, n, self.CHUNK_ROWS):
+            chunk = customers[start:start + self.CHUNK_ROWS]
+            encoding = time.perf_counter()
+            X = self.transform(chunk, out=buffer[:len(chunk)])
+            transform_seconds += time.perf_counter() - encoding
+            # The float32 dot products, upcast as they are stored
+            logits[start:start + len(chunk)] = X @ self._coef
+        probs = sigmoid(logits + self.model.intercept)
+
+        observe = self.observe
+        if observe is not None and n:
+            observe('transform', transform_seconds)
+            observe('predict_proba', time.perf_counter() - started - transform_seconds)
+        return probs
+
+
+class TableEngine(CompiledEngine):
+    """
+    Lookup-table engine for customers whose categorical fields come from
+    small, known sets of values.
+
+    At load time each (field, value) pair is turned into its logit
+    contribution, e.g. ('contract', 'two_year') → coef['contract=two_year'].
+    The intercept is folded into the base logit, so a prediction is:
+
+        logit = base + Σ table[field][value] + Σ weight[field] * value
+                       (categorical fields)    (numeric fields)
+
+    Customers with values outside the tables fall back to the compiled
+    encoding, which gives the same result DictVectorizer would.
+    """
+    name = 'table'
+
+    def __init__(self, model: LinearModel, domains: dict[str, tuple]):
+        """
+        Args:
+            model (LinearModel): Extracted pipeline parameters
+            domains (dict[str, tuple]): Allowed values per categorical field,
+                e.g. {'contract': ('month-to-month', 'one_year', 'two_year')}
+        """
+        super().__init__(model)
+        weights = self._weights
+
+        self._tables = {}
+        for field, values in domains.items():
+            table = {}
+            for value in values:
+                if isinstance(value, str):
+                    table[value] = weights.get(f'{field}{SEPARATOR}{value}', 0.0)
+                else:
+                    # Numeric literals (e.g. seniorcitizen: 0/1) are a single
+                    # numeric column in DictVectorizer
+                    table[value] = weights.get(field, 0.0) * value
+            self._tables[field] = table
+
+        # Everything that is not a categorical field is numeric:
+        # tenure, monthlycharges, totalcharges
+        self._numeric = [
+            (name, w) for name, w in weights.items()
+            if SEPARATOR not in name and name not in self._tables
+        ]
+
+    def _logit(self, customer: dict) -> float:
+        z = self.model.intercept
+        try:
+            for field, table in self._tables.items():
+                z += table[customer[field]]
+            for field, weight in self._numeric:
+                z += weight * customer[field]
+        except KeyError:
+            # Unknown value or missing field: use the generic encoding
+            return super()._logit(customer)
+        return z
+
+    def predict(self, customers: list[dict]) -> np.ndarray:
+        logits = np.fromiter(
+            (self._logit(c) for c in customers), dtype=np.float64, count=len(customers)
+        )
+        return sigmoid(logits)
+
+
+ENGINES = ('sklearn', 'compiled', 'compiled32', 'table')
+
+
+def load_engine(pipeline, kind: str = 'sklearn', domains: dict[str, tuple] | None = None):
+    """
+    Build a scoring engine for a fitted pipeline.
+
+    Args:
+        pipeline: Fitted DictVectorizer + LogisticRegression pipeline
+        kind (str): One of ENGINES
+        domains (dict[str, tuple]): Allowed values per categorical field,
+            required by the 'table' engine
+
+    Raises:
+        ValueError: If the engine name is unknown
+    """
+    if kind == 'sklearn':
+        return SklearnEngine(pipeline)
+    if kind not in ENGINES:
+        raise ValueError(f"Unknown scoring engine {kind!r}, expected one of {ENGINES}")
+    return linear_engine(LinearModel.from_pipeline(pipeline), kind, domains)
+
+
+def linear_engine(model: LinearModel, kind: str, domains: dict[str, tuple] | None = None):
+    """
+    Build a 'compiled', 'compiled32' or 'table' engine from extracted
+    parameters; these never touch sklearn.
+
+    Raises:
+        ValueError: For any other engine name
+    """
+    if kind == 'compiled':
+        return CompiledEngine(model)
+    if kind == 'compiled32':
+        return Float32Engine(model)
+    if kind == 'table':
+        if domains is None:
+            raise ValueError("The 'table' engine needs the categorical domains")
+        return TableEngine(model, domains)
+    raise ValueError(f"Engine {kind!r} cannot score an exported model, use 'compiled', 'compiled32' or 'table'")
+
+
+class LoadedModel:
+    """
+    A scoring engine together with the model file it was built from.
+
+    Everything needed to answer a request hangs off one object, so the
+    service can swap models by replacing a single reference: a request that
+    already picked up a LoadedModel finishes on it, even during a reload.
+
+    Attributes:
+        path (str): Model file
+        version (str): First 12 hex digits of the file's SHA-256
+        engine: Scoring engine built from the pipeline
+        loaded_at (float): Unix time the model was loaded
+        load_seconds (float): Time spent reading, unpickling and building
+    """
+
+    def __init__(self, path: str, version: str, engine, load_seconds: float):
+        self.path = path
+        self.version = version
+        self.engine = engine
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+
+    @property
+    def name(self) -> str:
+        """
+        File name without extension: 'models/model_C=1.0.bin' → 'model_C=1.0'
+        """
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    def info(self) -> dict:
+        return {
+            'name': self.name,
+            'version': self.version,
+            'path': self.path,
+            'engine': self.engine.name,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+        }
+
+
+def load_model(path: str, kind: str = 'sklearn', domains: dict[str, tuple] | None = None) -> LoadedModel:
+    """
+    Read a model file and build its scoring engine.
+
+    Args:
+        path (str): Model file written by train.py: a pickled pipeline, or a
+            pickled (DictVectorizer, LogisticRegression) tuple, or the .json
+            manifest of an exported artifact (no sklearn needed)
+        kind, domains: As for load_engine()
+
+    Returns:
+        LoadedModel: The engine, tagged with the file's content hash (for an
+            artifact: the hash of its arrays)
+    """
+    started = time.perf_counter()
+    if path.endswith('.json'):
+        model, digest = LinearModel.load_artifact(path)
+        engine = linear_engine(model, kind, domains)
+        return LoadedModel(path, digest[:12], engine, time.perf_counter() - started)
+
+    with open(path, 'rb') as f_in:
+        model_bytes = f_in.read()
+
+    version = hashlib.sha256(model_bytes).hexdigest()[:12]
+    pipeline = pickle.loads(model_bytes)
+    if isinstance(pipeline, tuple):
+        # 05-deployment/code/train.py saves (dv, model) instead of a pipeline
+        from sklearn.pipeline import make_pipeline
+        pipeline = make_pipeline(*pipeline)
+    engine = load_engine(pipeline, kind, domains=domains)
+    return LoadedModel(path, version, engine, time.perf_counter() - started)
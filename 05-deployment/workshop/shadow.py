@@ -0,0 +1,259 @@
+"""
+Shadow Scoring of a Candidate Model
+
+Offline metrics only go so far: before a retrained model.bin replaces the
+served one, it should see live traffic. In shadow mode a candidate model
+scores a sample of the real /predict requests next to the served model,
+and both probabilities are logged for comparison. Callers only ever get
+the served model's answer.
+
+Shadow scoring must not slow down the requests it samples, nor any other:
+
+1. submit():  the request handler appends (customer, served probability)
+              to a bounded queue - O(1), no scoring, no I/O. A full queue
+              drops the sample instead of waiting
+2. _run():    a background task takes up to batch_size samples at a time
+              (or whatever arrived within flush_seconds)
+3. worker:    the batch goes to a dedicated process, where the candidate
+              scores it and appends it to the log. The process has its
+              own GIL and runs at idle CPU priority, so under load the
+              served model always gets the CPU first (and a backlog
+              builds up, then drops samples, instead).
+              Customers travel as value tuples, which pickle in half the
+              time of dicts
+
+The log is plain CSV, one line per sampled request:
+
+    time,served_version,shadow_version,served,shadow
+    1760512345.123,3f2a9c1e0b7d,8d41e07a5c22,0.663820,0.658412
+
+stats() keeps a running comparison: how many were scored or dropped, the
+mean and maximum absolute difference, and how often the churn decisions
+(probability >= 0.5) disagree.
+
+Usage:
+    shadow = ShadowScorer('candidate.bin', log_path='shadow.csv', fraction=0.1)
+    shadow.start()                        # Loads the candidate in the worker
+    if shadow.sample():
+        shadow.submit(model.version, customer, prob)
+    ...
+    await shadow.stop()
+"""
+
+import asyncio  # Background batching task
+import multiprocessing  # Start method for the worker process
+import os  # nice() and file size
+import random  # Sampling
+import time  # Timestamps in the log
+from collections import deque  # Bounded queue of samples
+from concurrent.futures import ProcessPoolExecutor
+
+
+LOG_HEADER = 'time,served_version,shadow_version,served,shadow\n'
+
+
+# ----------------------------------------------------------------------------
+# Worker process: holds the candidate model and the open log file
+# ----------------------------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker():
+    # Only use CPU the served model leaves idle: SCHED_IDLE on Linux (any
+    # normal task preempts it at once), else the lowest nice priority
+    if hasattr(os, 'SCHED_IDLE'):
+        os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+    elif hasattr(os, 'nice'):
+        os.nice(19)
+
+
+def _worker_load(path: str, engine_kind: str, domains: dict, log_path: str) -> dict:
+    from scoring import load_model
+
+    _worker['model'] = load_model(path, engine_kind, domains=domains)
+    new_file = not os.path.exists(log_path) or os.path.getsize(log_path) == 0
+    _worker['log'] = open(log_path, 'a')
+    if new_file:
+        _worker['log'].write(LOG_HEADER)
+        _worker['log'].flush()
+    return _worker['model'].info()
+
+
+def _worker_score(fields: tuple, samples: list[tuple]) -> dict:
+    """
+    Score (time, served_version, customer values, served_prob) samples, log
+    them, and return the batch's comparison totals.
+    """
+    import numpy as np
+
+    model, log = _worker['model'], _worker['log']
+    times, versions, rows, served = zip(*samples)
+    served = np.asarray(served)
+    shadow = model.engine.predict([dict(zip(fields, values)) for values in rows])
+
+    log.writelines(
+        f'{t:.3f},{version},{model.version},{p:.6f},{s:.6f}\n'
+        for t, version, p, s in zip(times, versions, served.tolist(), shadow.tolist())
+    )
+    log.flush()
+
+    diff = np.abs(shadow - served)
+    return {
+        'scored': len(samples),
+        'abs_diff_sum': float(diff.sum()),
+        'abs_diff_max': float(diff.max()),
+        'disagreements': int(((shadow >= 0.5) != (served >= 0.5)).sum()),
+    }
+
+
+class ShadowScorer:
+    """
+    Scores a sample of served requests with a candidate model, in batches,
+    off the request path.
+
+    Must be used from a single event loop (no locking needed).
+
+    Args:
+        path (str): Candidate model file (model.bin or model.json)
+        log_path (str): CSV file the comparisons are appended to
+        fraction (float): Share of requests sampled, 0 to 1
+        batch_size (int): Samples scored together at most
+        flush_seconds (float): How long a partial batch may wait
+        max_queue (int): Samples waiting at most; more are dropped
+        engine_kind, domains: As for scoring.load_model()
+    """
+
+    def __init__(self, path: str, log_path: str, fraction: float = 0.1,
+                 batch_size: int = 256, flush_seconds: float = 1.0, max_queue: int = 10000,
+                 engine_kind: str = 'sklearn', domains: dict | None = None):
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"fraction must be between 0 and 1, got {fraction}")
+        self.path = path
+        self.log_path = log_path
+        self.fraction = fraction
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_queue = max_queue
+        self.model_info = None
+
+        self._queue = deque()  # (time, served_version, customer values, served_prob)
+        self._fields = None    # Customer field names, in model_dump() order
+        self._full = asyncio.Event()  # A whole batch is waiting
+        self._stopping = False
+        self._task = None
+        # 'spawn' starts a clean interpreter, as in execution.py
+        self._pool = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        self._load_args = (path, engine_kind, domains, log_path)
+
+        # Metrics
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+        self.abs_diff_sum = 0.0
+        self.abs_diff_max = 0.0
+        self.disagreements = 0
+
+    def start(self):
+        """
+        Start the worker and load the candidate now (blocking).
+
+        Raises:
+            Whatever loading the candidate raised
+        """
+        try:
+            self.model_info = self._pool.submit(_worker_load, *self._load_args).result()
+        except Exception:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def sample(self) -> bool:
+        """
+        Whether to shadow the current request.
+        """
+        return random.random() < self.fraction
+
+    def submit(self, served_version: str, customer: dict, prob: float):
+        """
+        Queue one served prediction for shadow scoring. Never waits.
+        """
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        if self._fields is None:
+            self._fields = tuple(customer)
+        self._queue.append((time.time(), served_version, tuple(customer.values()), prob))
+        self.submitted += 1
+        if len(self._queue) >= self.batch_size:
+            self._full.set()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+            except TimeoutError:
+                pass
+            self._full.clear()
+            await self._drain()
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            n = min(self.batch_size, len(self._queue))
+            batch = [self._queue.popleft() for _ in range(n)]
+            try:
+                totals = await loop.run_in_executor(self._pool, _worker_score, self._fields, batch)
+            except Exception as e:
+                # A broken candidate must not take the service down with it
+                self.errors += 1
+                self.last_error = repr(e)
+                continue
+            self.batches += 1
+            self.scored += totals['scored']
+            self.abs_diff_sum += totals['abs_diff_sum']
+            self.abs_diff_max = max(self.abs_diff_max, totals['abs_diff_max'])
+            self.disagreements += totals['disagreements']
+
+    async def stop(self):
+        """
+        Score what is still queued, then stop the worker.
+        """
+        if self._task is not None:
+            # Let _run() finish the batch it may be scoring: cancelling it
+            # would lose the samples already taken off the queue
+            self._stopping = True
+            self._full.set()
+            await self._task
+            self._task = None
+        await self._drain()
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """
+        Shadow scoring metrics since startup.
+        """
+        return {
+            'model': self.model_info,
+            'log': self.log_path,
+            'fraction': self.fraction,
+            'queued': len(self._queue),
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'scored': self.scored,
+            'batches': self.batches,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'mean_abs_diff': self.abs_diff_sum / self.scored if self.scored else 0.0,
+            'max_abs_diff': self.abs_diff_max,
+            'disagreements': self.disagreements,
+            'disagreement_rate': self.disagreements / self.scored if self.scored else 0.0,
+        }
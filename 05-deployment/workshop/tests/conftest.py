@@ -0,0 +1,77 @@
+"""
+Shared fixtures for the service tests.
+
+The service is imported and started in-process with FastAPI's TestClient,
+serving model.bin with the default settings. Run from the workshop folder:
+
+    uv run pytest
+"""
+
+import copy
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+# predict.py reads model.bin (and the rest of its settings) relative to the
+# working directory, like `python predict.py` does
+WORKSHOP = Path(__file__).resolve().parent.parent
+os.chdir(WORKSHOP)
+sys.path.insert(0, str(WORKSHOP))
+
+import predict  # noqa: E402
+
+
+CUSTOMER = {
+    'gender': 'female',
+    'seniorcitizen': 0,
+    'partner': 'yes',
+    'dependents': 'no',
+    'phoneservice': 'no',
+    'multiplelines': 'no_phone_service',
+    'internetservice': 'dsl',
+    'onlinesecurity': 'no',
+    'onlinebackup': 'yes',
+    'deviceprotection': 'no',
+    'techsupport': 'no',
+    'streamingtv': 'no',
+    'streamingmovies': 'no',
+    'contract': 'month-to-month',
+    'paperlessbilling': 'yes',
+    'paymentmethod': 'electronic_check',
+    'tenure': 1,
+    'monthlycharges': 29.85,
+    'totalcharges': 29.85,
+}
+
+
+@pytest.fixture(scope='session')
+def client():
+    """
+    A TestClient for the app, once the models are loaded and warmed up.
+    """
+    with TestClient(predict.app) as client:
+        deadline = time.monotonic() + 60
+        while client.get('/ready').status_code != 200:
+            assert time.monotonic() < deadline, 'Service did not become ready'
+            time.sleep(0.05)
+        yield client
+
+
+@pytest.fixture
+def customer() -> dict:
+    """
+    A valid customer (the one from test.py), safe to modify.
+    """
+    return copy.deepcopy(CUSTOMER)
+
+
+def columns(customers: list[dict]) -> dict:
+    """
+    The columnar form of a /predict/batch body: one list per field.
+    """
+    return {field: [customer[field] for customer in customers] for field in CUSTOMER}
@@ -0,0 +1,111 @@
+"""
+AdmissionController (admission.py): a concurrency limit with a short
+bounded queue in front.
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import predict
+from admission import AdmissionController, Overloaded
+
+
+def test_rejects_when_queue_is_full():
+    admission = AdmissionController(max_in_flight=1, max_queue=0)
+
+    async def main():
+        await admission.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire()
+        return rejected.value.reason
+
+    assert asyncio.run(main()) == 'queue_full'
+    assert admission.stats()['rejected'] == {'queue_full': 1, 'timeout': 0}
+
+
+def test_rejects_after_max_wait():
+    admission = AdmissionController(max_in_flight=1, max_queue=1, max_wait=0.01)
+
+    async def main():
+        await admission.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire()
+        return rejected.value.reason
+
+    assert asyncio.run(main()) == 'timeout'
+    assert admission.queue_depth == 0
+    assert admission.in_flight == 1
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    admission = AdmissionController(max_in_flight=1, max_queue=2, max_wait=1.0)
+    order = []
+
+    async def request(name):
+        await admission.acquire()
+        order.append(name)
+        await asyncio.sleep(0.01)
+        admission.release()
+
+    async def main():
+        await asyncio.gather(request('a'), request('b'), request('c'))
+
+    asyncio.run(main())
+
+    assert order == ['a', 'b', 'c']
+    assert admission.in_flight == 0
+    assert admission.stats()['admitted'] == 3
+    assert admission.stats()['queued'] == 2
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    admission = AdmissionController(max_in_flight=1, max_queue=1, max_wait=1.0)
+
+    async def main():
+        await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        admission.release()
+
+    asyncio.run(main())
+
+    assert (admission.in_flight, admission.queue_depth) == (0, 0)
+
+
+def test_max_in_flight_must_be_positive():
+    with pytest.raises(ValueError):
+        AdmissionController(max_in_flight=0)
+
+
+def test_stream_holds_its_slot_until_the_last_line(client, monkeypatch, customer):
+    # predict.py only attaches admit() at import, when admission is enabled:
+    # mount the stream endpoint with it on an app of its own
+    admission = AdmissionController(max_in_flight=1)
+    monkeypatch.setattr(predict, 'admission', admission)
+    monkeypatch.setattr(predict, 'STREAM_CHUNK_SIZE', 1)
+    in_flight = []
+    predict_batch = predict.executor.predict
+
+    async def recording_predict(model, customers):
+        in_flight.append(admission.in_flight)
+        return await predict_batch(model, customers)
+
+    monkeypatch.setattr(predict.executor, 'predict', recording_predict)
+    app = FastAPI()
+    app.add_api_route('/predict/stream', predict.predict_stream, methods=['POST'],
+                      dependencies=[Depends(predict.admit)])
+
+    with TestClient(app) as stream_client:
+        response = stream_client.post('/predict/stream', content=(json.dumps(customer) + '\n') * 3)
+
+    assert len(response.text.splitlines()) == 3
+    assert in_flight == [1, 1, 1]  # Scored while holding the slot
+    assert admission.in_flight == 0
+    assert admission.stats()['admitted'] == 1
@@ -0,0 +1,43 @@
+"""
+/predict/batch with a list of customers, and its size limit.
+"""
+
+import predict
+
+
+def customers(customer) -> list[dict]:
+    return [
+        customer,
+        {**customer, 'tenure': 40, 'contract': 'two_year', 'gender': 'male'},
+        {**customer, 'internetservice': 'fiber_optic', 'monthlycharges': 99.5},
+    ]
+
+
+def test_batch_matches_single_predictions(client, customer):
+    batch = customers(customer)
+
+    response = client.post('/predict/batch', json=batch)
+
+    assert response.status_code == 200
+    assert response.json() == [client.post('/predict', json=c).json() for c in batch]
+
+
+def test_empty_batch(client):
+    assert client.post('/predict/batch', json=[]).json() == []
+
+
+def test_invalid_customer_in_batch(client, customer):
+    batch = customers(customer)
+    batch[1]['tenure'] = -1
+
+    response = client.post('/predict/batch', json=batch)
+
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['loc'] == ['body', 1, 'tenure']
+
+
+def test_oversized_batch_is_413(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'MAX_BATCH_SIZE', 2)
+
+    assert client.post('/predict/batch', json=customers(customer)).status_code == 413
+    assert client.post('/predict/batch', json=customers(customer)[:2]).status_code == 200
@@ -0,0 +1,70 @@
+"""
+MicroBatcher (batching.py): concurrent /predict calls scored as one batch.
+"""
+
+import asyncio
+
+from batching import MicroBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    async def score_batch(model, customers):
+        calls.append((model, len(customers)))
+        return [customer['x'] / 10 for customer in customers]
+
+    batcher = MicroBatcher(score_batch, window_ms=5, max_batch_size=64)
+
+    async def main():
+        return await asyncio.gather(*(batcher.submit('m', {'x': x}) for x in range(5)))
+
+    assert asyncio.run(main()) == [0.0, 0.1, 0.2, 0.3, 0.4]
+    assert calls == [('m', 5)]
+    assert (batcher.stats()['requests'], batcher.stats()['batches']) == (5, 1)
+
+
+def test_full_batch_is_scored_without_waiting():
+    sizes = []
+
+    async def score_batch(model, customers):
+        sizes.append(len(customers))
+        return [0.5] * len(customers)
+
+    # A window far longer than the test: only max_batch_size can flush
+    batcher = MicroBatcher(score_batch, window_ms=60_000, max_batch_size=2)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit('m', {}) for _ in range(4))), 1)
+
+    assert asyncio.run(main()) == [0.5] * 4
+    assert sizes == [2, 2]
+
+
+def test_scoring_error_reaches_every_request_in_the_batch():
+    async def score_batch(model, customers):
+        raise RuntimeError('boom')
+
+    batcher = MicroBatcher(score_batch, window_ms=1)
+
+    async def main():
+        return await asyncio.gather(batcher.submit('m', {}), batcher.submit('m', {}), return_exceptions=True)
+
+    assert [type(e) for e in asyncio.run(main())] == [RuntimeError, RuntimeError]
+
+
+def test_models_are_scored_separately():
+    calls = []
+
+    async def score_batch(model, customers):
+        calls.append((model, len(customers)))
+        return [0.5] * len(customers)
+
+    batcher = MicroBatcher(score_batch, window_ms=5)
+
+    async def main():
+        await asyncio.gather(batcher.submit('a', {}), batcher.submit('b', {}), batcher.submit('a', {}))
+
+    asyncio.run(main())
+
+    assert sorted(calls) == [('a', 2), ('b', 1)]
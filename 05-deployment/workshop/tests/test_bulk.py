@@ -0,0 +1,86 @@
+"""
+/predict/bulk: Arrow IPC and Parquet tables in, the same format out.
+"""
+
+import io
+
+import pytest
+
+import predict
+
+
+ARROW = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/vnd.apache.parquet'
+
+
+@pytest.fixture
+def customers(customer) -> list[dict]:
+    return [{**customer, 'tenure': tenure, 'monthlycharges': 20.0 + tenure} for tenure in range(0, 72, 8)]
+
+
+def expected(client, customers) -> list[float]:
+    return [result['churn_probability'] for result in client.post('/predict/batch', json=customers).json()]
+
+
+def table_bytes(rows: list[dict], content_type: str) -> bytes:
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pylist(rows)
+    sink = io.BytesIO()
+    if content_type == PARQUET:
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
+
+
+def read_probabilities(body: bytes, content_type: str) -> list[float]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if content_type == PARQUET:
+        table = pq.read_table(pa.BufferReader(body))
+    else:
+        table = pa.ipc.open_stream(body).read_all()
+    return table['churn_probability'].to_pylist()
+
+
+@pytest.mark.parametrize('content_type', [ARROW, PARQUET])
+def test_bulk_matches_batch(client, customers, content_type):
+    response = client.post('/predict/bulk', content=table_bytes(customers, content_type),
+                           headers={'Content-Type': content_type})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == content_type
+    assert read_probabilities(response.content, content_type) == pytest.approx(expected(client, customers))
+
+
+@pytest.mark.parametrize('content_type', [ARROW, PARQUET])
+def test_bulk_rejects_oversized_table(client, monkeypatch, customers, content_type):
+    monkeypatch.setattr(predict, 'MAX_BATCH_SIZE', 2)
+
+    response = client.post('/predict/bulk', content=table_bytes(customers, content_type),
+                           headers={'Content-Type': content_type})
+
+    assert response.status_code == 413
+
+
+def test_bulk_rejects_invalid_columns(client, customers):
+    for customer in customers:
+        del customer['contract']
+        customer['tenure'] = -1
+
+    response = client.post('/predict/bulk', content=table_bytes(customers, ARROW),
+                           headers={'Content-Type': ARROW})
+
+    assert response.status_code == 422
+    errors = {error['loc'][1]: error['type'] for error in response.json()['detail']}
+    assert errors == {'contract': 'missing', 'tenure': 'greater_than_equal'}
+
+
+def test_bulk_rejects_bad_body_or_type(client):
+    assert client.post('/predict/bulk', content=b'nope', headers={'Content-Type': 'text/csv'}).status_code == 415
+    pytest.importorskip('pyarrow')
+    assert client.post('/predict/bulk', content=b'nope', headers={'Content-Type': PARQUET}).status_code == 400
@@ -0,0 +1,70 @@
+"""
+PredictionCache (caching.py): LRU eviction, TTL, model versions, and its
+use by /predict.
+"""
+
+import caching
+import predict
+from caching import PredictionCache
+
+
+def test_hit_and_miss():
+    cache = PredictionCache(10)
+    key = cache.key({'tenure': 1, 'monthlycharges': 29.851})
+
+    assert cache.get(key, 'v1') is None
+    cache.put(key, 0.25, 'v1')
+
+    assert cache.get(key, 'v1') == 0.25
+    assert cache.get(cache.key({'tenure': 1, 'monthlycharges': 29.849}), 'v1') == 0.25  # Same at 2 decimals
+    assert cache.get(key, 'v2') is None  # Another model version
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(2)
+    cache.put(('a',), 0.1, 'v1')
+    cache.put(('b',), 0.2, 'v1')
+    cache.get(('a',), 'v1')  # 'b' is now the oldest
+    cache.put(('c',), 0.3, 'v1')
+
+    assert cache.get(('b',), 'v1') is None
+    assert cache.get(('a',), 'v1') == 0.1
+    assert cache.evictions == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(caching.time, 'monotonic', lambda: now[0])
+    cache = PredictionCache(10, ttl=60)
+    cache.put(('a',), 0.1, 'v1')
+
+    now[0] += 60
+    assert cache.get(('a',), 'v1') == 0.1
+    now[0] += 1
+    assert cache.get(('a',), 'v1') is None
+    assert cache.expirations == 1
+    assert cache.stats()['size'] == 0
+
+
+def test_retain_drops_other_versions():
+    cache = PredictionCache(10)
+    cache.put(('a',), 0.1, 'v1')
+    cache.put(('a',), 0.2, 'v2')
+
+    cache.retain(['v2'])
+
+    assert cache.get(('a',), 'v1') is None
+    assert cache.get(('a',), 'v2') == 0.2
+    assert cache.invalidations == 1
+
+
+def test_predict_uses_the_cache(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'cache', PredictionCache(10))
+
+    first = client.post('/predict', json=customer).json()
+    second = client.post('/predict', json=customer).json()
+
+    assert second == first
+    stats = client.get('/stats').json()['cache']
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
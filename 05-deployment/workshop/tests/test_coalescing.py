@@ -0,0 +1,85 @@
+"""
+SingleFlight (coalescing.py): identical concurrent calls share one
+computation.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import predict
+from coalescing import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 0.5
+
+    async def main():
+        return await asyncio.gather(*(flight.do('a', compute) for _ in range(5)), flight.do('b', compute))
+
+    assert asyncio.run(main()) == [0.5] * 6
+    assert len(calls) == 2
+    assert flight.stats() == {
+        'in_flight': 0, 'computations': 2, 'joined': 4, 'saved_ratio': 4 / 6, 'max_joined': 4,
+    }
+
+
+def test_errors_are_shared_and_not_kept():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    async def main():
+        return await asyncio.gather(flight.do('a', fail), flight.do('a', fail), return_exceptions=True)
+
+    assert [type(e) for e in asyncio.run(main())] == [RuntimeError, RuntimeError]
+    assert flight.in_flight == 0
+
+    async def succeed():
+        return 1.0
+
+    assert asyncio.run(flight.do('a', succeed)) == 1.0  # The failure was not cached
+
+
+def test_cancelled_caller_does_not_cancel_the_computation():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return 0.5
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('a', compute))
+        follower = asyncio.ensure_future(flight.do('a', compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == 0.5
+
+
+def test_concurrent_identical_requests_share_one_computation(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'cache', None)
+    monkeypatch.setattr(predict, 'singleflight', SingleFlight())
+    compute_probability = predict.compute_probability
+
+    async def slow_compute_probability(model, features):
+        await asyncio.sleep(0.2)  # Long enough for every request to arrive
+        return await compute_probability(model, features)
+
+    monkeypatch.setattr(predict, 'compute_probability', slow_compute_probability)
+
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda _: client.post('/predict', json=customer), range(8)))
+
+    assert [response.status_code for response in responses] == [200] * 8
+    assert len({response.content for response in responses}) == 1
+    stats = client.get('/stats').json()['singleflight']
+    assert (stats['computations'], stats['joined']) == (1, 7)
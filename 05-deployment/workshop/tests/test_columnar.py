@@ -0,0 +1,101 @@
+"""
+Columnar /predict/batch bodies must be validated exactly like Customer rows.
+"""
+
+import pytest
+
+import predict
+from conftest import columns
+
+
+# (field, value) pairs a Customer rejects
+INVALID = [
+    ('tenure', 1e20),             # Beyond int64 (int_parsing_size)
+    ('tenure', 1.5),              # Not a whole number
+    ('tenure', -1),               # Below ge=0
+    ('tenure', 'one'),
+    ('tenure', None),
+    ('monthlycharges', -0.5),
+    ('monthlycharges', 'a lot'),
+    ('totalcharges', [1.0]),
+    ('gender', 'x'),
+    ('gender', None),
+    ('seniorcitizen', 2),
+    ('seniorcitizen', '1'),       # Literal[0, 1] takes no strings
+]
+
+# (field, value) pairs a Customer coerces
+COERCED = [
+    ('tenure', '12'),
+    ('tenure', 12.0),
+    ('tenure', True),
+    ('monthlycharges', '29.85'),
+    ('totalcharges', 30),
+    ('seniorcitizen', 1.0),
+    ('seniorcitizen', True),
+]
+
+
+@pytest.mark.parametrize('field, value', INVALID)
+def test_invalid_value_rejected_as_row_and_as_column(client, customer, field, value):
+    customer[field] = value
+    as_row = client.post('/predict/batch', json=[customer])
+    as_column = client.post('/predict/batch', json=columns([customer]))
+
+    assert as_row.status_code == 422
+    assert as_column.status_code == 422
+    row_errors = {(error['loc'][2], error['type']) for error in as_row.json()['detail']}
+    column_errors = {(error['loc'][1], error['type']) for error in as_column.json()['detail']}
+    assert column_errors == row_errors
+
+
+@pytest.mark.parametrize('field, value', COERCED)
+def test_coerced_value_accepted_as_row_and_as_column(client, customer, field, value):
+    customer[field] = value
+    as_row = client.post('/predict/batch', json=[customer])
+    as_column = client.post('/predict/batch', json=columns([customer]))
+
+    assert as_row.status_code == 200
+    assert as_column.status_code == 200
+    assert as_column.json()['churn_probability'] == pytest.approx([as_row.json()[0]['churn_probability']])
+
+
+def test_columns_match_rows(client, customer):
+    customers = [customer, {**customer, 'tenure': 40, 'contract': 'two_year', 'gender': 'male'}]
+    as_rows = client.post('/predict/batch', json=customers).json()
+    as_columns = client.post('/predict/batch', json=columns(customers)).json()
+
+    assert as_columns['churn_probability'] == pytest.approx([row['churn_probability'] for row in as_rows])
+    assert as_columns['churn'] == [row['churn'] for row in as_rows]
+
+
+def test_column_problems_are_reported_per_field(client, customer):
+    body = columns([customer, customer])
+    del body['contract']
+    body['partner'] = ['yes']
+    body['phoneservice'] = 'no'
+
+    response = client.post('/predict/batch', json=body)
+
+    assert response.status_code == 422
+    errors = {error['loc'][1]: error['type'] for error in response.json()['detail']}
+    assert errors == {'contract': 'missing', 'partner': 'length', 'phoneservice': 'list_type'}
+
+
+def test_single_customer_object_is_rejected(client, customer):
+    response = client.post('/predict/batch', json=customer)
+
+    assert response.status_code == 422
+    assert response.json()['detail'][0]['type'] == 'list_type'
+
+
+def test_empty_columns(client):
+    assert client.post('/predict/batch', json=columns([])).json() == {'churn_probability': [], 'churn': []}
+
+
+def test_oversized_columns_are_413_before_validation(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'MAX_BATCH_SIZE', 2)
+
+    response = client.post('/predict/batch', json=columns([{**customer, 'gender': 'x'}] * 3))
+
+    assert response.status_code == 413
@@ -0,0 +1,41 @@
+"""
+Execution strategies (execution.py): where /predict scoring runs.
+"""
+
+import pytest
+
+import predict
+from execution import THREADPOOL_WORKERS, create_executor
+
+
+def test_inline_and_threadpool_executors(client, customer):
+    model = predict.registry.get()
+
+    inline = create_executor('inline', [model])
+    threadpool = create_executor('threadpool', [model], workers=2)
+    try:
+        assert (inline.name, threadpool.name, threadpool.workers) == ('inline', 'threadpool', 2)
+        assert client.portal.call(threadpool.predict, model, [customer]) == \
+            client.portal.call(inline.predict, model, [customer])
+    finally:
+        threadpool.shutdown()
+
+
+def test_default_thread_pool_does_not_shrink_with_the_cpu_count(monkeypatch):
+    monkeypatch.setattr('os.cpu_count', lambda: 1)
+
+    threadpool = create_executor('threadpool', [])
+    threadpool.shutdown()
+
+    assert threadpool.workers == THREADPOOL_WORKERS > 1
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        create_executor('gpu', [])
+
+
+def test_stats_report_the_strategy(client):
+    execution = client.get('/stats').json()['execution']
+
+    assert execution['strategy'] == predict.executor.name
@@ -0,0 +1,26 @@
+"""
+/explain and /predict/batch?explain=true: per-feature contributions.
+"""
+
+
+def test_explain(client, customer):
+    response = client.post('/explain?top_k=3', json=customer)
+    plain = client.post('/predict', json=customer).json()
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result['churn_probability'] == plain['churn_probability']
+    assert len(result['contributions']) == 3
+
+
+def test_explain_rejects_invalid_top_k(client, customer):
+    assert client.post('/explain?top_k=0', json=customer).status_code == 422
+
+
+def test_batch_explain(client, customer):
+    customers = [customer, {**customer, 'tenure': 40}]
+
+    response = client.post('/predict/batch?explain=true&top_k=2', json=customers)
+
+    assert response.status_code == 200
+    assert [len(result['contributions']) for result in response.json()] == [2, 2]
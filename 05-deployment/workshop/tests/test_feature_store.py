@@ -0,0 +1,82 @@
+"""
+GET /predict/by-id/{customer_id} against a memory-mapped feature store.
+"""
+
+import time
+
+import pytest
+
+import predict
+import scoring
+from featurestore import FeatureStore, write_store
+
+
+@pytest.fixture
+def customers(customer) -> list[dict]:
+    return [customer, {**customer, 'tenure': 40, 'contract': 'two_year'}]
+
+
+@pytest.fixture
+def store(tmp_path, customers):
+    def build(feature_names=None, rows=customers):
+        engine = scoring.load_model('model.bin', 'compiled').engine
+        path = str(tmp_path / 'features.store')
+        write_store(path, ['0001-A', '0002-B'], engine.transform(rows),
+                    feature_names or engine.model.feature_names)
+        return FeatureStore.open(path)
+    return build
+
+
+def test_by_id_matches_predict(client, monkeypatch, store, customers):
+    features = store()
+    monkeypatch.setattr(predict, 'feature_store', features)
+
+    for customer_id, customer in zip(['0001-A', '0002-B'], customers):
+        response = client.get(f'/predict/by-id/{customer_id}')
+
+        assert response.status_code == 200
+        assert response.json() == pytest.approx(client.post('/predict', json=customer).json())
+        assert response.headers['X-Feature-Store-Snapshot'] == features.header['snapshot']
+
+
+def test_unknown_id_is_404(client, monkeypatch, store):
+    monkeypatch.setattr(predict, 'feature_store', store())
+
+    assert client.get('/predict/by-id/9999-Z').status_code == 404
+    assert client.get(f"/predict/by-id/{'x' * 100}").status_code == 404
+
+
+def test_store_for_another_encoding_is_409(client, monkeypatch, store):
+    names = predict.registry.get().engine.model.feature_names
+    monkeypatch.setattr(predict, 'feature_store', store(feature_names=names[::-1]))
+
+    assert client.get('/predict/by-id/0001-A').status_code == 409
+
+
+def test_no_store_is_503(client, monkeypatch):
+    monkeypatch.setattr(predict, 'feature_store', None)
+
+    assert client.get('/predict/by-id/0001-A').status_code == 503
+
+
+def test_replaced_snapshot_is_picked_up(client, monkeypatch, store, customers):
+    features = store()
+    monkeypatch.setattr(predict, 'FEATURE_STORE_PATH', features.path)
+    monkeypatch.setattr(predict, 'FEATURE_STORE_REFRESH_SECONDS', 0.01)
+    monkeypatch.setattr(predict, 'feature_store', predict.open_feature_store(predict.registry.models.values()))
+    expected = [client.post('/predict', json=customer).json() for customer in customers]
+    assert client.get('/predict/by-id/0001-A').json() == pytest.approx(expected[0])
+
+    watcher = client.portal.start_task_soon(predict.watch_feature_store)
+    try:
+        # A new snapshot, swapped in atomically, with the two customers' rows exchanged
+        replaced = store(rows=customers[::-1])
+        deadline = time.monotonic() + 10
+        while client.get('/predict/by-id/0001-A').headers['X-Feature-Store-Snapshot'] != replaced.header['snapshot']:
+            assert time.monotonic() < deadline, 'The new snapshot was not picked up'
+            time.sleep(0.01)
+    finally:
+        watcher.cancel()
+
+    assert client.get('/predict/by-id/0001-A').json() == pytest.approx(expected[1])
+    assert client.get('/predict/by-id/0002-B').json() == pytest.approx(expected[0])
@@ -0,0 +1,72 @@
+"""
+/predict/matrix: raw pre-encoded feature rows, and the /schema they follow.
+"""
+
+import numpy as np
+import pytest
+
+import predict
+import scoring
+from matrix import feature_hash
+
+
+@pytest.fixture
+def customers(customer) -> list[dict]:
+    return [{**customer, 'tenure': tenure, 'monthlycharges': 20.0 + tenure} for tenure in range(0, 72, 8)]
+
+
+def expected(client, customers) -> list[float]:
+    return [result['churn_probability'] for result in client.post('/predict/batch', json=customers).json()]
+
+
+def encoded(customers) -> np.ndarray:
+    # The same one-hot encoding the service applies, in the column order of GET /schema
+    return scoring.load_model('model.bin', 'compiled').engine.transform(customers)
+
+
+def test_schema(client):
+    schema = client.get('/schema').json()
+
+    assert schema['n_features'] == len(schema['feature_names'])
+    assert schema['feature_hash'] == feature_hash(schema['feature_names'])
+
+
+def post_matrix(client, X, dtype='float64', **headers):
+    return client.post('/predict/matrix', content=X.astype(dtype).tobytes(), headers={
+        'Content-Type': 'application/octet-stream',
+        'X-Matrix-Shape': f'{X.shape[0]},{X.shape[1]}',
+        'X-Matrix-Dtype': dtype,
+        **headers,
+    })
+
+
+@pytest.mark.parametrize('dtype', ['float64', 'float32'])
+def test_matrix_matches_batch(client, customers, dtype):
+    schema = client.get('/schema').json()
+
+    response = post_matrix(client, encoded(customers), dtype, **{'X-Feature-Hash': schema['feature_hash']})
+
+    assert response.status_code == 200
+    assert response.headers['X-Matrix-Shape'] == str(len(customers))
+    tolerance = 1e-6 if dtype == 'float32' else 1e-12
+    assert np.frombuffer(response.content, '<f8') == pytest.approx(expected(client, customers), abs=tolerance)
+
+
+def test_matrix_rejections(client, customers):
+    X = encoded(customers)
+    nan = X.copy()
+    nan[1, 0] = np.nan
+    wrong_hash = {'X-Feature-Hash': feature_hash(['something', 'else'])}
+
+    assert post_matrix(client, X[:, :-1]).status_code == 422
+    assert post_matrix(client, X, **wrong_hash).status_code == 422
+    assert post_matrix(client, nan).status_code == 422
+    assert post_matrix(client, X, **{'X-Matrix-Shape': 'a,b'}).status_code == 400
+    assert post_matrix(client, X, **{'X-Matrix-Shape': f'{len(X) + 1},{X.shape[1]}'}).status_code == 400
+    assert post_matrix(client, X, **{'Content-Type': 'application/json'}).status_code == 415
+
+
+def test_matrix_rejects_oversized_shape(client, monkeypatch, customers):
+    monkeypatch.setattr(predict, 'MAX_BATCH_SIZE', 2)
+
+    assert post_matrix(client, encoded(customers)).status_code == 413
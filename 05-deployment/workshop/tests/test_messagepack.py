@@ -0,0 +1,52 @@
+"""
+MessagePack bodies for /predict and /predict/batch, negotiated like JSON.
+"""
+
+import pytest
+
+import predict
+from conftest import columns
+
+
+msgpack = pytest.importorskip('msgpack')
+
+MSGPACK = {'Content-Type': 'application/msgpack'}
+
+
+def test_msgpack_matches_json(client, customer):
+    customers = [customer, {**customer, 'tenure': 40, 'contract': 'two_year'}]
+
+    for path, body in [('/predict', customer), ('/predict/batch', customers),
+                       ('/predict/batch', columns(customers))]:
+        as_json = client.post(path, json=body)
+        as_msgpack = client.post(path, content=msgpack.packb(body), headers=MSGPACK)
+
+        assert as_msgpack.headers['Content-Type'] == 'application/msgpack'
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+
+
+def test_msgpack_errors_match_json(client, customer):
+    customer['tenure'] = 'one'
+
+    as_json = client.post('/predict', json=customer)
+    as_msgpack = client.post('/predict', content=msgpack.packb(customer), headers=MSGPACK)
+    garbage = client.post('/predict', content=b'\xc1', headers=MSGPACK)
+
+    assert as_msgpack.status_code == as_json.status_code == 422
+    assert as_msgpack.json() == as_json.json()
+    assert garbage.status_code == 422
+
+
+def test_msgpack_response_for_json_request(client, customer):
+    response = client.post('/predict', json=customer, headers={'Accept': 'application/msgpack'})
+
+    assert msgpack.unpackb(response.content) == client.post('/predict', json=customer).json()
+
+
+def test_oversized_batch_is_413_before_validation(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'MAX_BATCH_SIZE', 2)
+    # Invalid customers: a 422 would mean they were validated first
+    invalid = [{**customer, 'gender': 'x'}] * 3
+
+    assert client.post('/predict/batch', content=msgpack.packb(invalid), headers=MSGPACK).status_code == 413
+    assert client.post('/predict/batch', json=invalid).status_code == 413
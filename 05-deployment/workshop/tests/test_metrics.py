@@ -0,0 +1,22 @@
+"""
+GET /metrics: Prometheus request counters and per-stage latency histograms.
+"""
+
+
+def test_metrics(client, customer):
+    client.post('/predict', json=customer)
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    text = response.text
+    assert 'churn_requests_total{endpoint="/predict",status="200"}' in text
+    assert 'churn_stage_duration_seconds_bucket{stage="validate"' in text
+
+
+def test_metrics_count_errors(client, customer):
+    del customer['tenure']
+    client.post('/predict', json=customer)
+
+    assert 'churn_requests_total{endpoint="/predict",status="422"}' in client.get('/metrics').text
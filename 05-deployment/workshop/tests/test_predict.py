@@ -0,0 +1,40 @@
+"""
+/predict responses and errors, as serialized by the service.
+"""
+
+import json
+
+import predict
+
+
+def test_predict(client, customer):
+    response = client.post('/predict', json=customer)
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/json'
+    result = json.loads(response.content)
+    assert list(result) == ['churn_probability', 'churn']
+    assert 0.0 <= result['churn_probability'] <= 1.0
+    assert result['churn'] == (result['churn_probability'] >= 0.5)
+    assert response.headers['X-Model-Version'] == predict.registry.get().version
+
+
+def test_predict_rejects_invalid_customer(client, customer):
+    customer['gender'] = 'x'
+    del customer['tenure']
+
+    response = client.post('/predict', json=customer)
+
+    assert response.status_code == 422
+    errors = {tuple(error['loc']): error['type'] for error in response.json()['detail']}
+    assert errors == {('body', 'gender'): 'literal_error', ('body', 'tenure'): 'missing'}
+
+
+def test_predict_rejects_malformed_or_missing_body(client):
+    malformed = client.post('/predict', content=b'{"gender":', headers={'Content-Type': 'application/json'})
+    missing = client.post('/predict')
+
+    assert malformed.status_code == 422
+    assert malformed.json()['detail'][0]['type'] == 'json_invalid'
+    assert missing.status_code == 422
+    assert missing.json()['detail'][0]['type'] == 'missing'
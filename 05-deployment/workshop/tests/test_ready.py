@@ -0,0 +1,20 @@
+"""
+Liveness (/ping) and readiness (/ready), and the warm-up that gates it.
+"""
+
+import predict
+
+
+def test_ping_and_ready(client):
+    assert client.get('/ping').json() == {'status': 'ok'}
+
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json()['status'] == 'ready'
+
+
+def test_stats_report_the_warm_up(client):
+    stats = client.get('/stats').json()
+
+    assert stats['model_version'] == predict.registry.get().version
+    assert stats['warmup']['rounds'] == predict.WARMUP_ROUNDS
@@ -0,0 +1,50 @@
+"""
+Several model versions served from one process (registry.py).
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import predict
+from registry import ModelRegistry
+
+
+def test_model_selected_by_path_or_header(client, customer):
+    name = predict.registry.default
+    by_path = client.post(f'/models/{name}/predict', json=customer)
+    by_header = client.post('/predict', json=customer, headers={'X-Model': name})
+
+    assert by_path.status_code == by_header.status_code == 200
+    assert by_path.headers['X-Model-Name'] == by_header.headers['X-Model-Name'] == name
+    assert by_path.json() == by_header.json()
+
+
+def test_unknown_model_is_404(client, customer):
+    assert client.post('/models/nope/predict', json=customer).status_code == 404
+    assert client.post('/predict', json=customer, headers={'X-Model': 'nope'}).status_code == 404
+
+
+def test_model_name_is_not_a_query_parameter(client, customer):
+    response = client.post('/predict?model_name=nope', json=customer)
+    openapi = client.get('/openapi.json').json()
+
+    assert response.status_code == 200
+    parameters = openapi['paths']['/predict']['post'].get('parameters', [])
+    assert 'model_name' not in {parameter['name'] for parameter in parameters}
+
+
+def test_models(client):
+    models = client.get('/models').json()
+
+    assert models['default'] == predict.registry.default
+    assert set(models['versions']) == set(predict.registry.models)
+    assert models['versions'][models['default']]['version'] == predict.registry.get().version
+
+
+def test_two_files_with_one_name_are_rejected():
+    def loader(path):
+        return SimpleNamespace(name=path.rsplit('/', 1)[-1].split('.')[0])
+
+    with pytest.raises(ValueError, match="'models/model.bin' and 'models/model.json'"):
+        ModelRegistry.from_paths(['models/model.json', 'models/model.bin'], loader)
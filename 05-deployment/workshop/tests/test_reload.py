@@ -0,0 +1,23 @@
+"""
+POST /admin/reload: models are swapped in without dropping requests.
+"""
+
+import predict
+
+
+def test_reload_keeps_serving(client, customer):
+    before = client.post('/predict', json=customer).json()
+
+    response = client.post('/admin/reload')
+
+    assert response.status_code == 200
+    assert response.json()['changed'] == []
+    assert client.post('/predict', json=customer).json() == before
+
+
+def test_reload_checks_admin_token(client, monkeypatch):
+    monkeypatch.setattr(predict, 'ADMIN_TOKEN', 'secret')
+
+    assert client.post('/admin/reload').status_code == 403
+    assert client.post('/admin/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.post('/admin/reload', headers={'X-Admin-Token': 'secret'}).status_code == 200
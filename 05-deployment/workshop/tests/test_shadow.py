@@ -0,0 +1,43 @@
+"""
+ShadowScorer (shadow.py): a candidate model scores sampled /predict
+traffic in a worker process and logs the comparison.
+"""
+
+import pytest
+
+import predict
+from shadow import ShadowScorer
+
+
+def test_predict_is_shadow_scored(client, monkeypatch, tmp_path, customer):
+    log = tmp_path / 'shadow.csv'
+    # The served model as its own candidate: every comparison must agree
+    scorer = ShadowScorer('model.bin', str(log), fraction=1.0, batch_size=2, engine_kind='compiled')
+    scorer.start()
+    monkeypatch.setattr(predict, 'shadow', scorer)
+
+    served = [client.post('/predict', json={**customer, 'tenure': tenure}).json() for tenure in range(3)]
+    client.portal.call(scorer.stop)
+
+    stats = scorer.stats()
+    assert (stats['submitted'], stats['scored'], stats['errors']) == (3, 3, 0)
+    assert stats['disagreements'] == 0
+    assert stats['mean_abs_diff'] == pytest.approx(0.0, abs=1e-6)
+
+    header, *lines = log.read_text().splitlines()
+    assert header == 'time,served_version,shadow_version,served,shadow'
+    assert [float(line.split(',')[3]) for line in lines] == pytest.approx(
+        [result['churn_probability'] for result in served], abs=1e-6
+    )
+
+
+def test_missing_candidate_fails_to_start(tmp_path):
+    scorer = ShadowScorer(str(tmp_path / 'missing.bin'), str(tmp_path / 'shadow.csv'))
+
+    with pytest.raises(FileNotFoundError):
+        scorer.start()
+
+
+def test_fraction_must_be_a_share():
+    with pytest.raises(ValueError):
+        ShadowScorer('model.bin', 'shadow.csv', fraction=1.5)
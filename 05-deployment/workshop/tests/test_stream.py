@@ -0,0 +1,63 @@
+"""
+/predict/stream: NDJSON in, NDJSON out, bad lines reported inline.
+"""
+
+import json
+
+import predict
+
+
+def stream(client, body):
+    response = client.post('/predict/stream', content=body,
+                           headers={'Content-Type': 'application/x-ndjson'})
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def ndjson(*items) -> bytes:
+    return b''.join(json.dumps(item).encode() + b'\n' for item in items)
+
+
+def test_stream_matches_batch(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'STREAM_CHUNK_SIZE', 2)  # Several chunks
+    customers = [{**customer, 'tenure': tenure} for tenure in range(5)]
+
+    results = stream(client, ndjson(*customers))
+    batch = client.post('/predict/batch', json=customers).json()
+
+    assert [result['line'] for result in results] == [1, 2, 3, 4, 5]
+    assert [result['churn_probability'] for result in results] == [r['churn_probability'] for r in batch]
+
+
+def test_invalid_line_is_reported_inline(client, customer):
+    results = stream(client, ndjson(customer, {**customer, 'gender': 'x'}) + b'\n' + ndjson(customer))
+
+    assert [result['line'] for result in results] == [1, 2, 4]  # The blank line 3 is skipped
+    assert results[1]['error'][0]['type'] == 'literal_error'
+    assert results[0]['churn_probability'] == results[2]['churn_probability']
+
+
+def test_invalid_utf8_does_not_end_the_stream(client, customer):
+    body = ndjson(customer) + b'{"gender": \n\xff\xfe\n' + ndjson(customer)
+
+    results = stream(client, body)
+
+    assert [result['line'] for result in results] == [1, 2, 3, 4]
+    assert 'error' in results[1] and 'error' in results[2]
+    assert 'churn_probability' in results[3]
+
+
+def test_overlong_line_is_skipped(client, monkeypatch, customer):
+    monkeypatch.setattr(predict, 'STREAM_MAX_LINE_BYTES', 1000)
+
+    def body():
+        yield ndjson(customer)
+        for _ in range(10):
+            yield b'x' * 500  # One 5000-byte line, in pieces
+        yield b'\n' + ndjson(customer)
+
+    results = stream(client, body())
+
+    assert [result['line'] for result in results] == [1, 2, 3]
+    assert results[1]['error'][0]['type'] == 'too_long'
+    assert 'churn_probability' in results[2]
@@ -7,15 +7,19 @@ This script:
 2. Preprocesses and prepares features
 3. Trains a logistic regression model
 4. Saves the trained model to disk
+5. Exports a sklearn-free copy of it for fast cold starts
 
 Usage:
     python train.py
     
 Output:
-    model.bin - Serialized sklearn Pipeline (DictVectorizer + LogisticRegression)
+    model.bin  - Serialized sklearn Pipeline (DictVectorizer + LogisticRegression)
+    model.npz  - Feature names, coefficients and intercept as plain arrays
+    model.json - Manifest of model.npz: format version, checksum, versions
 """
 
 import pickle  # For serializing the trained model
+from datetime import datetime, timezone  # Export timestamp
 import pandas as pd  # Data manipulation
 import numpy as np  # Numerical operations
 import sklearn  # Version checking
@@ -25,6 +29,8 @@ from sklearn.feature_extraction import DictVectorizer  # Convert dicts to numeri
 from sklearn.linear_model import LogisticRegression   # Classification model
 from sklearn.pipeline import make_pipeline            # Combine preprocessing + model
 
+from scoring import LinearModel  # Sklearn-free model export
+
 
 # Print version information for debugging and reproducibility
 print(f'pandas=={pd.__version__}')
@@ -159,6 +165,35 @@ def save_model(pipeline, output_file):
         pickle.dump(pipeline, f_out)
 
 
+def export_model(pipeline, prefix):
+    """
+    Export the trained model without any sklearn objects.
+    
+    A logistic regression over DictVectorizer features is fully described
+    by its feature names, coefficients and intercept. Those are written as
+    plain NumPy arrays, so the service can load them with NumPy alone and
+    skip importing scikit-learn and unpickling the pipeline at startup.
+    
+    Args:
+        pipeline (sklearn.pipeline.Pipeline): Trained model to export
+        prefix (str): Output path without extension (e.g., 'model')
+        
+    Returns:
+        str: Path of the manifest, e.g. 'model.json'
+        
+    Saves:
+        <prefix>.npz  - feature_names, coef and intercept arrays
+        <prefix>.json - Format version, checksum of the .npz and the library
+                        versions installed at export
+        Served with: MODEL_PATH=model.json SCORING_ENGINE=table
+    """
+    metadata = {
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sklearn_version': sklearn.__version__,
+        'numpy_version': np.__version__,
+    }
+    return LinearModel.from_pipeline(pipeline).save_artifact(prefix, metadata)
+
 
 # Main execution
 if __name__ == '__main__':
@@ -171,5 +206,9 @@ if __name__ == '__main__':
     # Step 3: Save to disk for production deployment
     save_model(pipeline, 'model.bin')
     
+    # Step 4: Export the sklearn-free artifact for fast cold starts
+    manifest = export_model(pipeline, 'model')
+    
     # Confirm successful training
-    print('Model saved to model.bin')
\ No newline at end of file
+    print('Model saved to model.bin')
+    print(f'Model exported to {manifest} + model.npz')
\ No newline at end of file